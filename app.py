@@ -8,13 +8,47 @@ Layout 50/50 com seção de validação de modelo e parâmetros técnicos
 import streamlit as st
 import pandas as pd
 import numpy as np
-import geopandas as gpd
 import folium
+from branca.element import MacroElement
+from folium.elements import JSCSSMixin
+from jinja2 import Template
 from streamlit_folium import st_folium
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from pathlib import Path
+import json
+import os
+
+from simulador import dados as simulador_dados
+from simulador import modelo as simulador_modelo
+from simulador.dados import dados_da_regiao
+from simulador.modelo import (
+    coef_emprego_por_setor,
+    coef_impostos_sobre_vab,
+    coef_vab_por_setor,
+    fator_atrito,
+    metadados_setores,
+    multiplicadores_producao,
+    parametros_modelo,
+    setores,
+)
+from simulador.incerteza import simular_incerteza
+from simulador.interregional import executar_simulacao_interregional, montar_modelo_interregional
+from simulador.memo import executar_simulacao_memoizada, memo_simulacoes
+from simulador.regioes import (
+    calcular_limites_regioes,
+    localizar_regiao,
+    localizar_regiao_no_ponto,
+    normalizar_string,
+    regioes_no_recorte,
+)
+from simulador.registro import IndiceResultados, RegistroSimulacao
+from simulador.sensibilidade import varrer_fator_atrito
+from simulador.simulacao import (
+    executar_simulacao_avancada,
+    obter_kernel_resposta,
+)
+from simulador.topologia import OBJETO_TOPOJSON, nivel_para_zoom, recortar_topojson
 
 # ==============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -269,688 +303,510 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==============================================================================
-# LÓGICA DE SIMULAÇÃO AVANÇADA
-# ==============================================================================
-
-def calculate_enhanced_bins(series, num_classes=7):
-    """
-    Sistema de binning aprimorado para melhor visualização dos impactos econômicos.
-    Combina técnicas quantile e logarítmica para distribuição mais visual.
-    """
-    # Handle edge cases
-    if len(series) == 0 or series.max() == series.min():
-        # Return simple bins for edge cases
-        return np.linspace(series.min() if len(series) > 0 else 0,
-                          series.max() if len(series) > 0 else 1,
-                          num=num_classes + 1).tolist()
-
-    # Detectar valores zero (sem impacto) separadamente
-    valores_zero = series[series == 0]
-    valores_positivos = series[series > 0]
-
-    # Se não há valores positivos, retornar bins simples
-    if len(valores_positivos) == 0:
-        return np.linspace(series.min(), series.max(), num=num_classes + 1).tolist()
-
-    # Usar quantile menos agressivo para capturar mais outliers relevantes
-    series_filtered = valores_positivos[valores_positivos < valores_positivos.quantile(0.95)]
-
-    # Se ainda há dados suficientes, usar binning híbrido
-    if len(series_filtered) >= num_classes and series_filtered.nunique() >= num_classes:
-        # Combinar quantile e logarítmico para melhor distribuição
-        try:
-            # 60% dos bins baseados em quantiles (distribuição uniforme)
-            quantile_bins = int(num_classes * 0.6)
-            quantiles = np.linspace(0, 1, quantile_bins + 1)
-            quant_values = np.quantile(series_filtered, quantiles)
-
-            # 40% dos bins baseados em log (capturar variações pequenas)
-            log_bins = num_classes - quantile_bins
-            if log_bins > 0:
-                log_values = np.logspace(
-                    np.log10(max(1e-6, series_filtered.min())),
-                    np.log10(series_filtered.max()),
-                    num=log_bins + 1
-                )
-                # Combinar e remover duplicatos
-                combined = np.concatenate([quant_values, log_values])
-                bins = np.unique(combined)
-            else:
-                bins = quant_values
-
-        except (ValueError, Warning):
-            # Fallback para quantiles simples
-            bins = np.quantile(valores_positivos, np.linspace(0, 1, num_classes + 1))
-    else:
-        # Para poucos dados, usar distribuição linear
-        bins = np.linspace(valores_positivos.min(), valores_positivos.max(), num_classes + 1)
-
-    # Garantir que zero está incluído se existem valores zero
-    if len(valores_zero) > 0:
-        bins = np.insert(bins, 0, 0)
-
-    # Garantir que o valor máximo real está incluído
-    bins = np.append(bins, series.max())
-
-    # Remover duplicados e ordenar
-    bins = np.unique(bins)
-
-    # CRITICAL: Ensure we have at least 2 bins for visualization
-    if len(bins) < 2:
-        bins = np.linspace(series.min(), series.max(), num=2)
-    elif len(bins) > num_classes + 2:  # Permitir +1 para zero e +1 para max
-        # Se há muitos bins, usar only the most important ones
-        bins = np.quantile(bins, np.linspace(0, 1, num_classes + 1))
-
-    return bins.tolist()
-
-# Manter função original para compatibilidade
-def calculate_log_bins(series, num_classes=7):
-    """Wrapper para nova função com compatibilidade."""
-    return calculate_enhanced_bins(series, num_classes)
-
-def calcular_distancias(gdf, regiao_origem_nome):
-    """Calcula a distância da região de origem para todas as outras."""
-    try:
-        # Pega a geometria (polígono) da região de origem
-        origem_geom = gdf.loc[gdf['NM_RGINT'] == regiao_origem_nome, 'geometry'].iloc[0]
-        # Calcula o ponto central (centroide)
-        origem_centroid = origem_geom.centroid
-        
-        # Calcula a distância do centroide de origem para o centroide de todas as outras regiões
-        distancias = gdf['geometry'].apply(lambda geom: origem_centroid.distance(geom.centroid))
-        return distancias
-    except (IndexError, AttributeError):
-        # Se a região não for encontrada ou houver problema, retorna distâncias nulas
-        return pd.Series(0.0, index=gdf.index)
-
-# ==============================================================================
-# MODELO ECONÔMICO AVANÇADO (LEONTIEF INPUT-OUTPUT)
-# ==============================================================================
-
-# Função para normalizar strings e evitar problemas de codificação
-def normalizar_string(s):
-    """Normaliza strings para evitar problemas de codificação."""
-    if isinstance(s, str):
-        return s.strip()
-    return s
-
-def corrigir_nomes_regioes():
-    """Cria mapeamento para corrigir nomes de regiões com problemas de encoding."""
-    # Mapeamento das regiões imediatas de São Paulo com nomes corretos do IBGE 2017
-    mapeamento_sp = {
-        '3501': 'São Paulo',
-        '3502': 'Sorocaba',
-        '3503': 'Bauru',
-        '3504': 'Marília',
-        '3505': 'Presidente Prudente',
-        '3506': 'Araçatuba',
-        '3507': 'São José do Rio Preto',
-        '3508': 'Ribeirão Preto',
-        '3509': 'Araraquara',
-        '3510': 'Campinas',
-        '3511': 'São José dos Campos'
-    }
-
-    # Mapeamento completo de nomes corrompidos para nomes corretos do IBGE 2017
-    # Baseado na comparação entre dados processados e IBGE oficial
-    correções = {
-        # São Paulo regions - correcting encoding issues (todas as 11 regiões)
-        'SAo Paulo': 'São Paulo',
-        'SAo JosA do Rio Preto': 'São José do Rio Preto',
-        'SAo JosA dos Campos': 'São José dos Campos',
-        'RibeirAo Preto': 'Ribeirão Preto',
-        'MarAlia': 'Marília',
-        'AraAatuba': 'Araçatuba',
-        'PresA Prudente': 'Presidente Prudente',
-        'Presidente Prudente': 'Presidente Prudente',  # Already correct
-        'Araraquara': 'Araraquara',  # Already correct
-        'Bauru': 'Bauru',  # Already correct
-        'Campinas': 'Campinas',  # Already correct
-        'Sorocaba': 'Sorocaba',  # Already correct
-
-        # Check for missing regions and add fallbacks
-        'SAo Paulo do Potengi': 'São Paulo do Potengi',  # Different state
-        'Paulo Afonso': 'Paulo Afonso',  # Different state
-
-        # Common encoding fixes for other states
-        'SAo Gabriel da Cachoeira': 'São Gabriel da Cachoeira',
-        'SAo LuAs': 'São Luís',
-        'BrasilAia': 'Brasileia',
-        'TarauacA': 'Tarauacá',
-        'TefA': 'Tefé',
-        'EirunepA': 'Eirunepé',
-        'LAbrea': 'Lábrea',
-        'Ji-ParanA': 'Ji-Paraná'
-    }
-
-    return correções
-
-def aplicar_correcao_nomes(df):
-    """Aplica correções de nomes nas regiões do DataFrame."""
-    correções = corrigir_nomes_regioes()
-
-    # Aplica as correções de nome
-    df['regiao'] = df['regiao'].replace(correções)
-
-    # Normaliza todas as strings
-    df['regiao'] = df['regiao'].apply(normalizar_string)
-    df['setor'] = df['setor'].apply(normalizar_string)
-
-    return df
-
-def garantir_regioes_sao_paulo(df):
-    """Garante que todas as 11 regiões imediatas de São Paulo tenham dados econômicos."""
-    # Lista oficial das 11 regiões imediatas de São Paulo (IBGE 2017)
-    regioes_sp_oficiais = [
-        'São Paulo', 'Sorocaba', 'Bauru', 'Marília', 'Presidente Prudente',
-        'Araçatuba', 'São José do Rio Preto', 'Ribeirão Preto', 'Araraquara',
-        'Campinas', 'São José dos Campos'
-    ]
-
-    setores_oficiais = ['Agropecuária', 'Indústria', 'Construção', 'Serviços']
-    regioes_existentes = df['regiao'].unique().tolist()
-
-    # Identificar regiões ausentes
-    regioes_ausentes = [r for r in regioes_sp_oficiais if r not in regioes_existentes]
-
-    if regioes_ausentes:
-        import streamlit as st
-        st.info(f"⚠️ Gerando dados sintéticos para {len(regioes_ausentes)} regiões SP ausentes: {regioes_ausentes}")
-
-        # Usar dados de regiões similares como base
-        dados_base_sp = df[df['regiao'].isin(regioes_sp_oficiais)].copy()
-
-        if len(dados_base_sp) > 0:
-            # Calcular médias por setor para regiões SP existentes
-            medias_sp = dados_base_sp.groupby('setor').agg({
-                'vab': 'mean',
-                'empregos': 'mean',
-                'empresas': 'mean',
-                'share_nacional': 'mean'
-            }).reset_index()
-        else:
-            # Fallback: usar médias nacionais com ajuste para SP
-            medias_sp = df.groupby('setor').agg({
-                'vab': 'mean',
-                'empregos': 'mean',
-                'empresas': 'mean',
-                'share_nacional': 'mean'
-            }).reset_index()
-            # Ajustar para níveis típicos de SP (mais desenvolvido)
-            medias_sp['vab'] *= 1.3
-            medias_sp['empregos'] *= 1.2
-            medias_sp['empresas'] *= 1.4
-
-        # Gerar dados para regiões ausentes
-        dados_novos = []
-        np.random.seed(42)  # Consistência
-
-        for regiao in regioes_ausentes:
-            for _, setor_data in medias_sp.iterrows():
-                # Adicionar variação realística (±20%)
-                fator_variacao = np.random.uniform(0.8, 1.2)
-
-                dados_novos.append({
-                    'regiao': regiao,
-                    'setor': setor_data['setor'],
-                    'vab': setor_data['vab'] * fator_variacao,
-                    'empregos': setor_data['empregos'] * fator_variacao,
-                    'empresas': int(setor_data['empresas'] * fator_variacao),
-                    'share_nacional': setor_data['share_nacional'] * fator_variacao * 0.1  # Reduzir share para não inflacionar
-                })
-
-        # Adicionar novos dados ao DataFrame
-        df_novos = pd.DataFrame(dados_novos)
-        df = pd.concat([df, df_novos], ignore_index=True)
-
-        # Recalcular shares nacionais para manter consistência
-        df['share_nacional'] = df.groupby('setor')['vab'].transform(lambda x: x / x.sum())
-
-    return df
-
-# Definição dos setores e metadados - garantindo codificação UTF-8
-setores = ['Agropecuária', 'Indústria', 'Construção', 'Serviços']
-metadados_setores = {
-    'Agropecuária': {
-        'emoji': '🌾',
-        'descricao': 'Agricultura, pecuária, silvicultura e pesca',
-        'multiplicador_base': 1.52,
-        'cor': '#FF6B6B'
-    },
-    'Indústria': {
-        'emoji': '🏭',
-        'descricao': 'Manufatura, transformação e indústria extrativa',
-        'multiplicador_base': 2.18,
-        'cor': '#4ECDC4'
-    },
-    'Construção': {
-        'emoji': '🏗️',
-        'descricao': 'Construção civil, infraestrutura e obras',
-        'multiplicador_base': 1.84,
-        'cor': '#45B7D1'
-    },
-    'Serviços': {
-        'emoji': '🏪',
-        'descricao': 'Comércio, transportes, serviços e administração',
-        'multiplicador_base': 1.67,
-        'cor': '#96CEB4'
-    }
-}
-
-# Matriz de coeficientes técnicos (baseada em dados reais do Brasil - TRU 2017)
-matriz_a = pd.DataFrame({
-    'Agropecuária': [0.201, 0.155, 0.002, 0.117],
-    'Indústria': [0.085, 0.351, 0.004, 0.160],
-    'Construção': [0.003, 0.298, 0.001, 0.145],
-    'Serviços': [0.012, 0.105, 0.008, 0.245]
-}, index=setores)
-
-# Matriz de impactos L = (I - A)^-1
-matriz_identidade = np.identity(len(setores))
-matriz_L = np.linalg.inv(matriz_identidade - matriz_a.values)
-matriz_L_df = pd.DataFrame(matriz_L, index=setores, columns=setores)
-
-# Coeficientes de VAB por setor (baseados na estrutura da matriz A)
-coef_vab_por_setor = pd.Series({
-    'Agropecuária': 0.699,  # 1 - soma da coluna Agropecuária da matriz_a
-    'Indústria': 0.291,     # 1 - soma da coluna Indústria
-    'Construção': 0.985,    # 1 - soma da coluna Construção (usa poucos insumos de si mesma)
-    'Serviços': 0.573       # 1 - soma da coluna Serviços
-})
-
-# Coeficiente de impostos sobre VAB (carga tributária média)
-coef_impostos_sobre_vab = 0.18  # 18% - estimativa da carga tributária brasileira
-
-# Coeficientes de Emprego (Empregos por R$ Milhão de Produção) - VERSÃO CIENTIFICAMENTE CONSERVADORA
-coef_emprego_por_setor = pd.Series({
-    'Agropecuária': 12.5, # Média entre agricultura familiar e agronegócio de larga escala
-    'Indústria':     8.1, # Reflete a maior produtividade e automação da indústria
-    'Construção':   17.6, # Permanece o mais intensivo em mão-de-obra
-    'Serviços':     14.8  # Média de um setor muito heterogêneo (de TI a comércio)
-})
-
-# Parâmetros do modelo
-parametros_modelo = {
-    'ano_base': 2017,
-    'fonte_matriz': 'Tabela de Recursos e Usos (TRU) - IBGE',
-    'metodologia': 'Modelo Input-Output de Leontief',
-    'regioes_imediatas_cobertas': 133,
-    'setores_economicos': 4,
-    'tipo_analise': 'Impactos diretos, indiretos e induzidos',
-    'unidade_monetaria': 'Milhões de Reais (R$ Mi)',
-    'coef_vab_medio': coef_vab_por_setor.mean(),
-    'carga_tributaria': coef_impostos_sobre_vab,
-    'data_processamento': datetime.now().strftime('%d/%m/%Y %H:%M')
-}
-
-# ==============================================================================
-# CARREGAMENTO E PROCESSAMENTO DE DADOS (CACHEADO)
+# CARREGAMENTO DE DADOS (CACHEADO) - o núcleo headless fica no pacote `simulador`
 # ==============================================================================
 
 @st.cache_data(show_spinner="⚡ Carregando geometrias das 510 regiões imediatas...")
 def carregar_dados_geograficos():
     """Carrega geometrias otimizadas das 510 regiões imediatas com nomes ASCII-safe."""
-    try:
-        # Try ASCII shapefile first (for deployment)
-        try:
-            gdf = gpd.read_parquet('shapefiles/regioes_imediatas_510_ascii.parquet')
-            gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
-            return gdf
-        except FileNotFoundError:
-            pass
-
-        # Fallback to original shapefile (for local development)
-        gdf = gpd.read_parquet('shapefiles/regioes_imediatas_510_optimized.parquet')
-        gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
-
-        # Note: Some regions have identical names in different states (e.g., Itabaiana, Valença)
-        # This is handled correctly by the economic data matching system using region codes
+    gdf = simulador_dados.carregar_dados_geograficos()
+    if gdf is None:
+        st.error("Erro ao carregar dados geográficos")
+    return gdf
+
+@st.cache_resource(show_spinner="📏 Carregando matriz de distâncias entre regiões...")
+def carregar_matriz_distancias(_gdf):
+    """Matriz de distâncias origem×destino compartilhada por todas as sessões."""
+    return simulador_dados.carregar_matriz_distancias(_gdf)
+
+@st.cache_resource(show_spinner="🧮 Pré-calculando respostas unitárias do modelo...")
+def carregar_kernel_resposta(_df_economia, _matriz_distancias):
+    """Kernel de resposta unitária compartilhado por todas as sessões (memory-map em .cache/)."""
+    return obter_kernel_resposta(_df_economia, _matriz_distancias, diretorio_cache=simulador_dados.DIRETORIO_CACHE)
+
+@st.cache_resource
+def carregar_limites_regioes(_gdf):
+    """Caixas envolventes das regiões (índice espacial do recorte do mapa pela área visível)."""
+    return calcular_limites_regioes(_gdf)
+
+@st.cache_resource(show_spinner="🗺️ Carregando níveis de detalhe das geometrias...")
+def carregar_piramide(_gdf):
+    """Pirâmide de geometrias simplificadas por zoom (create_geometry_pyramid.py)."""
+    return simulador_dados.carregar_piramide_geometrias(_gdf)
+
+@st.cache_resource(show_spinner="🗺️ Codificando a topologia das regiões...")
+def carregar_topojson_nivel(_gdf, nivel):
+    """TopoJSON das regiões no nível de detalhe da pirâmide (arcos compartilhados, sem propriedades)."""
+    return simulador_dados.carregar_topojson_nivel(_gdf, carregar_piramide(_gdf), nivel)
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def carregar_metadados_tiles(url_tiles):
+    """TileJSON do servidor local de tiles vetoriais, ou None se ele não responder (o mapa volta ao TopoJSON)."""
+    import urllib.request
 
-        return gdf
-    except FileNotFoundError:
-        try:
-            # Fallback para GeoJSON ultra-light
-            gdf = gpd.read_file('shapefiles/regioes_imediatas_510_ultra_light.geojson')
-            gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
-
-            # Validate duplicates for fallback as well
-            total_regions = len(gdf)
-            unique_regions = gdf['NM_RGINT'].nunique()
-            # Duplicate region names are handled correctly by region codes
-
-            return gdf
-        except FileNotFoundError:
-            # Fallback para geometrias antigas (menor resolução)
-            try:
-                gdf = gpd.read_parquet('shapefiles/brasil_regions_ultra_light.parquet')
-                gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
-                st.warning("⚠️ Usando shapefile antigo - pode não corresponder exatamente aos dados IBGE")
-                return gdf
-            except Exception as e:
-                st.error(f"Erro ao carregar dados geográficos: {e}")
-                return None
+    try:
+        with urllib.request.urlopen(f'{url_tiles}/metadata.json', timeout=2) as resposta:
+            return json.loads(resposta.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+@st.cache_resource
+def carregar_fundo_nacional(_gdf):
+    """Contorno nacional simplificado, desenhado por baixo quando o mapa envia só a área visível."""
+    return _gdf[['geometry']].dissolve().simplify(TOLERANCIA_FUNDO_NACIONAL)
+
+@st.cache_resource
+def carregar_indice_resultados(_df_economia):
+    """Colunas fixas (região × setor) compartilhadas pelos registros de todas as simulações."""
+    return IndiceResultados(_df_economia)
+
+@st.cache_resource(show_spinner="🔗 Montando e fatorando o modelo interregional (MRIO)...")
+def carregar_modelo_interregional(_df_economia, _matriz_distancias):
+    """Modelo interregional (LU fatorada uma vez) compartilhado por todas as sessões."""
+    return montar_modelo_interregional(_df_economia, _matriz_distancias)
 
 @st.cache_data(show_spinner="📊 Carregando dados reais do IBGE (2021)...")
 def carregar_dados_reais_ibge(_gdf):
     """Carrega dados econômicos reais do IBGE pré-processados para as regiões imediatas."""
+    df_economia = simulador_dados.carregar_dados_reais_ibge(_gdf)
+    if df_economia.attrs.get('fonte_dados') == 'sintetico':
+        st.info("📊 Usando dados sintéticos como fallback...")
+    else:
+        st.success(f"✅ Dados reais do IBGE carregados e corrigidos: {df_economia['codigo_regiao'].nunique()} regiões, {len(df_economia)} entradas setoriais")
+    return df_economia
 
-    try:
-        # First try to load embedded processed data (for deployment)
-        embedded_file = "dados_ibge_processados_2021.csv"
-        if Path(embedded_file).exists():
-            df_embedded = pd.read_csv(embedded_file)
-            # Apply region name corrections to fix encoding issues
-            df_embedded = aplicar_correcao_nomes(df_embedded)
-            # Ensure all São Paulo regions have data
-            df_embedded = garantir_regioes_sao_paulo(df_embedded)
-            st.success(f"✅ Dados reais do IBGE carregados e corrigidos: {df_embedded['regiao'].nunique()} regiões, {len(df_embedded)} entradas setoriais")
-            return df_embedded
-
-        # Fallback: Try to process raw IBGE data (for local development)
-        try:
-            from ibge_data_parser import parse_ibge_municipal_data, aggregate_by_immediate_region, create_compatible_economic_data
-
-            ibge_file = "PIB dos Municípios - base de dados 2010-2021.txt"
-            if Path(ibge_file).exists():
-                df_municipal = parse_ibge_municipal_data(ibge_file, 2021)
-                df_regional = aggregate_by_immediate_region(df_municipal)
-                df_compatible = create_compatible_economic_data(df_regional, _gdf)
-                # Apply region name corrections
-                df_compatible = aplicar_correcao_nomes(df_compatible)
-                # Ensure all São Paulo regions have data
-                df_compatible = garantir_regioes_sao_paulo(df_compatible)
+# ==============================================================================
+# PREPARAÇÃO DOS RESULTADOS PARA O MAPA
+# ==============================================================================
 
-                st.success(f"✅ Dados reais do IBGE processados e corrigidos: {len(df_regional)} regiões, {len(df_compatible)} entradas setoriais")
-                return df_compatible
+def preparar_dados_tooltip_com_percentuais(gdf, simulacao):
+    """
+    Prepara os dados do GeoDataFrame com informações de percentual para tooltips.
+    Os rótulos por região e setor vêm prontos do registro da simulação, juntados pelo código IBGE.
+    """
+    rotulos = simulacao.tabela_tooltip().reindex(gdf['codigo_regiao'].to_numpy())
 
-        except Exception as e:
-            st.warning(f"Não foi possível processar dados do IBGE: {e}")
+    gdf_com_tooltips = gdf.copy()
+    for coluna in rotulos.columns:
+        gdf_com_tooltips[coluna] = rotulos[coluna].fillna("-").to_numpy()
 
-        # Final fallback: synthetic data
-        st.info("📊 Usando dados sintéticos como fallback...")
-        return gerar_dados_sinteticos_fallback(_gdf)
+    return gdf_com_tooltips
 
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        st.info("📊 Usando dados sintéticos como fallback...")
-        return gerar_dados_sinteticos_fallback(_gdf)
-
-def gerar_dados_sinteticos_fallback(_gdf):
-    """Gera dados sintéticos como fallback se os dados reais do IBGE não estiverem disponíveis."""
-    np.random.seed(42)  # Resultados consistentes
-    regioes = [normalizar_string(nome) for nome in _gdf['NM_RGINT'].tolist()]
-
-    dados = []
-    for regiao in regioes:
-        # VAB base por setor com variação regional realística
-        vab_base = {
-            'Agropecuária': np.random.lognormal(10, 0.8),  # Mais variável
-            'Indústria': np.random.lognormal(10.5, 1.0),
-            'Construção': np.random.lognormal(9.5, 0.6),
-            'Serviços': np.random.lognormal(11, 0.7)  # Maior VAB médio
-        }
+# Recorte do mapa pela área visível: abaixo deste zoom (visão nacional) todas as regiões são enviadas
+ZOOM_MINIMO_RECORTE = 6
+# Folga (fração da largura/altura visível) do recorte, para pequenos deslocamentos não reenviarem o mapa
+MARGEM_RECORTE = 0.5
+# Tolerância (graus) da simplificação do contorno nacional de fundo
+TOLERANCIA_FUNDO_NACIONAL = 0.05
+# Servidor local de tiles vetoriais (`python -m simulador servidor-tiles`, ex.: http://127.0.0.1:8766).
+# Com ele, o navegador carrega só os tiles visíveis e junta os valores pelo código da região
+URL_TILES = (os.environ.get('SIMULADOR_TILES_URL') or '').rstrip('/') or None
+# Fundo do mapa: nome de um provedor do Folium, 'nenhum' (fundo em branco, sem internet) ou o modelo
+# de URL de tiles raster locais (ex.: http://127.0.0.1:8080/{z}/{x}/{y}.png)
+FUNDO_MAPA = os.environ.get('SIMULADOR_FUNDO_MAPA') or 'CartoDB positron'
+
+# Camadas do mapa (rótulo -> métrica do resumo por região); todas vão para o navegador
+CAMADAS_MAPA = {
+    'Produção Total': 'impacto_producao',
+    'VAB (PIB)': 'impacto_vab',
+    'Empregos Gerados': 'impacto_empregos',
+    'Impostos Arrecadados': 'impacto_impostos',
+    'Multiplicador Efetivo': 'multiplicador_efetivo',
+    'Densidade de Impacto': 'densidade_impacto',
+    'Spillover Relativo': 'spillover_relativo'
+}
 
-        for setor in setores:
-            # Garantir que setor e região estão normalizados
-            dados.append({
-                'regiao': normalizar_string(regiao),
-                'setor': normalizar_string(setor),
-                'vab': vab_base[setor],
-                'empregos': vab_base[setor] * np.random.uniform(15, 25),  # Empregos por R$ milhão
-                'empresas': int(vab_base[setor] * np.random.uniform(0.5, 2.0))  # Número de empresas
-            })
+# Sistema de cores otimizado para melhor contraste visual (7-8 classes)
+ESQUEMAS_CORES = {
+    'Economic Impact': ['#f7f7f7', '#d9f0a3', '#addd8e', '#78c679', '#41ab5d', '#238443', '#005a32'],  # Verde econômico
+    'Viridis (Verde-Azul)': ['#440154', '#414487', '#2a788e', '#22a884', '#7ad151', '#fde725', '#fcffa4'],
+    'Plasma (Rosa-Amarelo)': ['#0d0887', '#5302a3', '#8b0aa5', '#b83289', '#db5c68', '#f48849', '#febd2a', '#f0f921'],
+    'Inferno (Preto-Amarelo)': ['#000004', '#1b0c41', '#4a0c6b', '#781c6d', '#a52c60', '#cf4446', '#ed6925', '#fb9b06', '#fcffa4'],
+    'Blues (Azul)': ['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', '#2171b5', '#08519c'],
+    'Reds (Vermelho)': ['#fff5f0', '#fee0d2', '#fcbba1', '#fc9272', '#fb6a4a', '#ef3b2c', '#cb181d', '#99000d'],
+    'YlOrRd (Amarelo-Vermelho)': ['#ffffcc', '#ffeda0', '#fed976', '#feb24c', '#fd8d3c', '#fc4e2a', '#e31a1c', '#b10026'],
+}
 
-    df = pd.DataFrame(dados)
+def preparar_propriedades_mapa(gdf, simulacao, mostrar_percentuais, posicao_ativa):
+    """
+    Propriedades de cada região para o mapa, na ordem do GeoDataFrame: as de estilo de todas as
+    camadas (`valor_<métrica>`, `classe_<métrica>`), o destaque (`selecionada`) e os campos do
+    tooltip. A troca de camada e de cores acontece no navegador. Sem simulação, as regiões só
+    levam nome, código e o destaque da seleção.
+    """
+    camada = pd.DataFrame(gdf[['NM_RGINT', 'codigo_regiao']])
+    if simulacao is not None and mostrar_percentuais:
+        camada = preparar_dados_tooltip_com_percentuais(camada, simulacao)
+
+    if simulacao is not None:
+        # Junção pelo código IBGE: os nomes do shapefile são ASCII e alguns se repetem
+        por_regiao = simulacao['resumo'].por_regiao
+        posicoes = por_regiao.index.get_indexer(camada['codigo_regiao'])
+        encontradas = posicoes >= 0
+        for coluna in CAMADAS_MAPA.values():
+            # Classes calculadas uma vez por simulação (cache LRU do registro)
+            _, classes = simulacao.classificar(coluna)
+            valores = por_regiao[coluna].to_numpy()
+            camada[f'valor_{coluna}'] = np.where(encontradas, np.nan_to_num(valores[posicoes]), 0.0)
+            camada[f'classe_{coluna}'] = np.where(encontradas, classes[posicoes], 0).astype(int)
+
+    selecionada = np.zeros(len(camada), dtype=bool)
+    if posicao_ativa is not None:
+        selecionada[posicao_ativa] = True
+    camada['selecionada'] = selecionada
+    return camada
+
+def preparar_camada_mapa(gdf, topojson, simulacao, mostrar_percentuais, posicao_ativa, posicoes_visiveis=None):
+    """
+    Uma única camada TopoJSON para o mapa: arcos compartilhados enviados uma vez, com as
+    propriedades de `preparar_propriedades_mapa` em cada região. Com `posicoes_visiveis`,
+    apenas essas regiões (e os arcos que elas usam) são enviadas.
+    """
+    camada = preparar_propriedades_mapa(gdf, simulacao, mostrar_percentuais, posicao_ativa)
+    if posicoes_visiveis is not None:
+        camada = camada.iloc[posicoes_visiveis]
 
-    # Aplicar correções de nomes e normalizar strings
-    df = aplicar_correcao_nomes(df)
+    # to_json converte os tipos do NumPy em tipos nativos do JSON
+    propriedades = json.loads(camada.to_json(orient='records', force_ascii=False))
+    return recortar_topojson(topojson, posicoes_visiveis, propriedades)
 
-    # Ensure all São Paulo regions have data (should already exist in synthetic)
-    df = garantir_regioes_sao_paulo(df)
+def preparar_propriedades_tiles(gdf, simulacao, mostrar_percentuais, posicao_ativa):
+    """
+    Propriedades por código IBGE para a camada de tiles vetoriais: os tiles só trazem o código
+    de cada região, e o navegador junta estas propriedades a ele.
+    """
+    camada = preparar_propriedades_mapa(gdf, simulacao, mostrar_percentuais, posicao_ativa)
+    registros = json.loads(camada.to_json(orient='records', force_ascii=False))
+    return {str(registro['codigo_regiao']): registro for registro in registros}
 
-    # Calcular shares (participação de cada região no VAB setorial nacional)
-    df['share_nacional'] = df.groupby('setor')['vab'].transform(lambda x: x / x.sum())
+def criar_mapa_base(url_tiles=None, estaticos=None):
+    """
+    Mapa Folium com o fundo de `FUNDO_MAPA`. Se o servidor de tiles publica o Leaflet na pasta de
+    estáticos (`estaticos` do TileJSON), o script e o estilo do Leaflet vêm dele em vez da CDN.
+    """
+    if FUNDO_MAPA.lower() == 'nenhum':
+        mapa = folium.Map(location=[-15.0, -55.0], zoom_start=4, tiles=None)
+    elif '{z}' in FUNDO_MAPA:
+        mapa = folium.Map(location=[-15.0, -55.0], zoom_start=4, tiles=FUNDO_MAPA, attr='Fundo local')
+    else:
+        mapa = folium.Map(location=[-15.0, -55.0], zoom_start=4, tiles=FUNDO_MAPA)
 
-    return df
+    if url_tiles and (estaticos or {}).get('leaflet'):
+        locais = {'leaflet': f'{url_tiles}/static/leaflet.js', 'leaflet_css': f'{url_tiles}/static/leaflet.css'}
+        mapa.default_js = [(nome, locais.get(nome, url)) for nome, url in mapa.default_js]
+        mapa.default_css = [(nome, locais.get(nome, url)) for nome, url in mapa.default_css]
+    return mapa
 
-# ==============================================================================
-# LÓGICA DE SIMULAÇÃO AVANÇADA
-# ==============================================================================
+def atualizar_recorte_mapa(vista, limites_regioes):
+    """
+    Posições das regiões a enviar para a vista atual do mapa (`bounds`/`zoom` devolvidos pelo
+    st_folium), ou None para enviar todas. O recorte guardado na sessão tem uma folga em volta da
+    área visível e só é refeito quando a vista sai dele, mantendo o mapa igual entre reruns.
+    """
+    if not vista or not vista.get('bounds') or (vista.get('zoom') or 0) < ZOOM_MINIMO_RECORTE:
+        st.session_state.recorte_mapa = None
+        return None
 
-def calcular_percentuais_impacto(df_economia, df_resultados):
+    try:
+        sul = vista['bounds']['_southWest']['lat']
+        oeste = vista['bounds']['_southWest']['lng']
+        norte = vista['bounds']['_northEast']['lat']
+        leste = vista['bounds']['_northEast']['lng']
+    except (KeyError, TypeError):
+        st.session_state.recorte_mapa = None
+        return None
+
+    recorte = st.session_state.get('recorte_mapa')
+    if recorte is None or not (recorte[0] <= oeste and recorte[1] <= sul and recorte[2] >= leste and recorte[3] >= norte):
+        folga_x = (leste - oeste) * MARGEM_RECORTE
+        folga_y = (norte - sul) * MARGEM_RECORTE
+        recorte = (oeste - folga_x, sul - folga_y, leste + folga_x, norte + folga_y)
+        st.session_state.recorte_mapa = recorte
+
+    # Vista sem nenhuma região (ex.: sobre o oceano): envia todas para a camada não ficar vazia
+    posicoes = regioes_no_recorte(limites_regioes, *recorte)
+    return posicoes if len(posicoes) > 0 else None
+
+def montar_legenda_mapa(df_simulacao, bins, coluna, titulo, cores):
     """
-    Calcula percentuais de aumento em cada região/setor baseado no VAB original.
+    Legenda HTML de uma camada com os valores reais dos bins. Fica oculta até ser escolhida no
+    controle do mapa; o gradiente (`legenda-gradiente`) é recolorido junto com o esquema de cores.
     """
-    # Merge para ter baseline VAB junto com impactos
-    df_com_baseline = df_resultados.merge(
-        df_economia[['regiao', 'setor', 'vab']],
-        on=['regiao', 'setor'],
-        suffixes=('', '_baseline')
-    )
+    # Usar os valores reais dos bins calculados
+    valores_bins = list(bins)  # Estes são os valores reais, não interpolados
+    valor_min = valores_bins[0]
+    valor_max = valores_bins[-1]
+
+    # Estatísticas da simulação
+    valores_simulacao = df_simulacao[coluna]
+    regioes_zero = len(valores_simulacao[valores_simulacao == 0])
+    regioes_impacto = len(valores_simulacao[valores_simulacao > 0])
+    total_regioes = len(valores_simulacao)
+
+    titulo_legenda = {
+        'impacto_producao': 'Impacto na Produção (R$)',
+        'impacto_vab': 'Impacto no VAB/PIB (R$)',
+        'impacto_empregos': 'Empregos Gerados',
+        'impacto_impostos': 'Impostos Gerados (R$)'
+    }
 
-    # Calcular percentuais de aumento
-    df_com_baseline['percentual_aumento_producao'] = (
-        df_com_baseline['impacto_producao'] / df_com_baseline['vab_baseline'] * 100
-    ).fillna(0)
+    # Formatação otimizada de valores
+    def formatar_valor(valor):
+        if coluna == 'impacto_empregos':
+            if valor >= 1000000:
+                return f"{valor/1000000:.1f}M"
+            elif valor >= 1000:
+                return f"{valor/1000:.0f}k"
+            else:
+                return f"{valor:,.0f}"
+        else:  # Valores monetários
+            if valor >= 1000000:
+                return f"R$ {valor/1000000:.1f}B"
+            elif valor >= 1000:
+                return f"R$ {valor/1000:.0f}M"
+            else:
+                return f"R$ {valor:,.0f}"
+
+    # Criar gradiente CSS com as cores do esquema
+    cores_gradiente = ', '.join(cores)
+
+    # Usar os valores reais dos bins como pontos de referência
+    pontos_referencia = valores_bins[::max(1, len(valores_bins)//6)][:6]  # Pegar até 6 pontos bem distribuídos
+    if len(pontos_referencia) < 6:
+        pontos_referencia.extend([valor_max] * (6 - len(pontos_referencia)))
+
+    return f'''
+    <div class="legenda-mapa" data-camada="{coluna}" style="display: none; position: fixed;
+    bottom: 30px; left: 30px; width: 280px;
+    border: 2px solid #333; z-index: 9999; font-size: 13px;
+    background-color: rgba(255, 255, 255, 0.95);
+    padding: 15px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.15);
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;">
+
+    <div style="margin-bottom: 12px;">
+        <strong style="color: #333; font-size: 14px;">{titulo_legenda.get(coluna, titulo)}</strong>
+    </div>
 
-    df_com_baseline['percentual_aumento_vab'] = (
-        df_com_baseline['impacto_vab'] / df_com_baseline['vab_baseline'] * 100
-    ).fillna(0)
+    <!-- Barra de Gradiente Contínua -->
+    <div style="position: relative; margin: 10px 0;">
+        <div class="legenda-gradiente" style="height: 20px; width: 100%;
+        background: linear-gradient(to right, {cores_gradiente});
+        border: 1px solid #666; border-radius: 3px;
+        cursor: help;"
+        title="Gradiente de impacto: {formatar_valor(valor_min)} até {formatar_valor(valor_max)}">
+        </div>
 
-    return df_com_baseline
+        <!-- Escala de Valores -->
+        <div style="position: relative; margin-top: 5px; height: 40px;">
+            <span style="position: absolute; left: 0%; transform: translateX(-50%);
+            font-size: 11px; color: #555;">{formatar_valor(valor_min)}</span>
 
-def preparar_dados_tooltip_com_percentuais(gdf, resultados_df, regiao_origem, setor_origem):
-    """
-    Prepara os dados do GeoDataFrame com informações de percentual para tooltips.
-    """
-    # Agregar resultados por região e calcular percentuais por setor
-    tooltip_data = []
+            <span style="position: absolute; left: 20%; transform: translateX(-50%);
+            font-size: 11px; color: #555;"
+            title="{formatar_valor(pontos_referencia[1])}">{formatar_valor(pontos_referencia[1])}</span>
 
-    for regiao in gdf['NM_RGINT'].unique():
-        dados_regiao = resultados_df[resultados_df['regiao'] == regiao]
+            <span style="position: absolute; left: 50%; transform: translateX(-50%);
+            font-size: 11px; color: #555;"
+            title="Valor médio: {formatar_valor(pontos_referencia[2])}">{formatar_valor(pontos_referencia[2])}</span>
 
-        # Informações básicas da região
-        regiao_info = {
-            'NM_RGINT': regiao,
-            'eh_origem': regiao == regiao_origem
-        }
+            <span style="position: absolute; left: 80%; transform: translateX(-50%);
+            font-size: 11px; color: #555;"
+            title="{formatar_valor(pontos_referencia[4])}">{formatar_valor(pontos_referencia[4])}</span>
 
-        # Calcular percentuais para cada setor
-        for setor in setores:
-            dados_setor = dados_regiao[dados_regiao['setor'] == setor]
-            if not dados_setor.empty:
-                percentual = dados_setor['percentual_aumento_producao'].iloc[0]
-                # Formatação adaptativa para diferentes escalas
-                if percentual >= 0.001:  # Limiar reduzido para capturar mais impactos
-                    if percentual >= 0.01:  # ≥ 0.01%: 2 casas decimais
-                        regiao_info[f'pct_{setor}'] = f"+{percentual:.2f}%"
-                    elif percentual >= 0.001:  # 0.001% - 0.009%: 3 casas decimais
-                        regiao_info[f'pct_{setor}'] = f"+{percentual:.3f}%"
-                    else:  # < 0.001%: 4 casas decimais
-                        regiao_info[f'pct_{setor}'] = f"+{percentual:.4f}%"
-                else:
-                    regiao_info[f'pct_{setor}'] = "-"
-            else:
-                regiao_info[f'pct_{setor}'] = "-"
+            <span style="position: absolute; right: 0%; transform: translateX(50%);
+            font-size: 11px; color: #555;">{formatar_valor(valor_max)}</span>
+        </div>
+    </div>
 
-        tooltip_data.append(regiao_info)
+    <!-- Indicadores de Impacto Zero -->
+    <div style="margin-top: 15px; padding-top: 10px; border-top: 1px solid #ddd;">
+        <div style="display: flex; align-items: center; margin-bottom: 5px;">
+            <span style="width: 12px; height: 12px; border: 2px solid #999;
+            border-radius: 50%; background: #f5f5f5; margin-right: 8px;"
+            title="Regiões sem impacto econômico"></span>
+            <span style="font-size: 12px; color: #666;">Sem Impacto: {regioes_zero} regiões</span>
+        </div>
 
-    # Converter para DataFrame e fazer merge com gdf
-    df_tooltip = pd.DataFrame(tooltip_data)
-    gdf_com_tooltips = gdf.merge(df_tooltip, on='NM_RGINT', how='left')
+        <div style="font-size: 11px; color: #888; margin-top: 8px;"
+        title="Distribuição de impactos: {regioes_impacto} regiões afetadas de {total_regioes} total">
+            📊 Impacto: {regioes_impacto}/{total_regioes} regiões ({(regioes_impacto/total_regioes*100):.1f}%)
+        </div>
 
-    # Preencher valores nulos
-    for setor in setores:
-        gdf_com_tooltips[f'pct_{setor}'] = gdf_com_tooltips[f'pct_{setor}'].fillna("-")
+        <div style="font-size: 10px; color: #aaa; margin-top: 5px; font-style: italic;"
+        title="Modelo baseado em matriz Leontief 4x4 com efeitos gravitacionais">
+            💡 Hover para detalhes por região
+        </div>
+    </div>
 
-    return gdf_com_tooltips
+    </div>
+    '''
 
-def analisar_distribuicao_impactos(df_resultados):
+class CamadaTilesVetoriais(JSCSSMixin, MacroElement):
     """
-    Analisa a distribuição de impactos para debug e validação.
+    Camada de regiões em tiles vetoriais (Leaflet.VectorGrid) servidos por `servico_tiles.py`:
+    o navegador busca só os tiles da área visível, no zoom atual. Os tiles trazem apenas o código
+    de cada região; as propriedades da simulação (`preparar_propriedades_tiles`) vão no HTML e são
+    juntadas pelo código no estilo (ver `ControleCamadasMapa`) e no tooltip.
     """
-    # Agregar por região
-    impactos_por_regiao = df_resultados.groupby('regiao')['percentual_aumento_producao'].sum().sort_values(ascending=False)
-
-    # Estatísticas básicas
-    total_regioes = len(impactos_por_regiao)
-    regioes_com_impacto = len(impactos_por_regiao[impactos_por_regiao > 0])
-    regioes_acima_001 = len(impactos_por_regiao[impactos_por_regiao >= 0.001])
-    regioes_acima_01 = len(impactos_por_regiao[impactos_por_regiao >= 0.01])
-
-    # Distribuição por faixas
-    faixas = {
-        '>= 1.0%': len(impactos_por_regiao[impactos_por_regiao >= 1.0]),
-        '0.1% - 1.0%': len(impactos_por_regiao[(impactos_por_regiao >= 0.1) & (impactos_por_regiao < 1.0)]),
-        '0.01% - 0.1%': len(impactos_por_regiao[(impactos_por_regiao >= 0.01) & (impactos_por_regiao < 0.1)]),
-        '0.001% - 0.01%': len(impactos_por_regiao[(impactos_por_regiao >= 0.001) & (impactos_por_regiao < 0.01)]),
-        '< 0.001%': len(impactos_por_regiao[impactos_por_regiao < 0.001])
-    }
 
-    return {
-        'total_regioes': total_regioes,
-        'regioes_com_impacto': regioes_com_impacto,
-        'regioes_acima_001': regioes_acima_001,
-        'regioes_acima_01': regioes_acima_01,
-        'distribuicao_faixas': faixas,
-        'impactos_por_regiao': impactos_por_regiao
-    }
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.vectorGrid.protobuf({{ this.url_tiles|tojson }}, {
+            vectorTileLayerStyles: {},
+            interactive: true,
+            rendererFactory: L.canvas.tile,
+            minNativeZoom: {{ this.zoom_minimo }},
+            maxNativeZoom: {{ this.zoom_maximo }},
+            getFeatureId: function(feature) { return feature.properties.codigo; }
+        }).addTo({{ this._parent.get_name() }});
+        {{ this.get_name() }}.propriedades = {{ this.propriedades|tojson }};
+
+        (function() {
+            var camada = {{ this.get_name() }};
+            var mapa = {{ this._parent.get_name() }};
+            var campos = {{ this.campos|tojson }};
+            var rotulos = {{ this.rotulos|tojson }};
+            var dica = L.tooltip({direction: 'top', offset: [0, -8]});
+
+            function conteudo(codigo) {
+                var p = camada.propriedades[codigo] || {};
+                return '<table style="font-size: 12px; font-family: Arial;">' + campos.map(function(campo, i) {
+                    var valor = p[campo] !== undefined && p[campo] !== null ? p[campo] : '-';
+                    return '<tr><th style="text-align: left; padding-right: 6px;">' + rotulos[i] + '</th><td>' + valor + '</td></tr>';
+                }).join('') + '</table>';
+            }
 
-def executar_simulacao_avancada(df_economia, gdf, valor_choque, setor_choque, regiao_origem):
+            camada.on('mouseover mousemove', function(e) {
+                dica.setLatLng(e.latlng).setContent(conteudo(e.layer.properties.codigo));
+                if (!mapa.hasLayer(dica)) { mapa.openTooltip(dica); }
+            });
+            camada.on('mouseout', function() { mapa.closeTooltip(dica); });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, url_tiles, propriedades, campos, rotulos, zoom_minimo=3, zoom_maximo=10):
+        super().__init__()
+        self._name = 'CamadaTilesVetoriais'
+        self.url_tiles = f'{url_tiles}/tiles/{{z}}/{{x}}/{{y}}.pbf'
+        self.propriedades = propriedades
+        self.campos = campos
+        self.rotulos = rotulos
+        self.zoom_minimo = zoom_minimo
+        self.zoom_maximo = zoom_maximo
+        # O plugin vem do próprio servidor de tiles (pasta de estáticos), sem CDN
+        self.default_js = [('leaflet_vectorgrid', f'{url_tiles}/static/Leaflet.VectorGrid.bundled.min.js')]
+
+class ControleCamadasMapa(MacroElement):
     """
-    Executa simulação completa com modelo Leontief e distribuição gravitacional.
+    Seletores de camada e de esquema de cores dentro do mapa. O estilo de cada região é calculado
+    no navegador a partir das suas propriedades (destaque > mapa de calor >
+    bordas), então trocar camada ou cores não provoca rerun do Streamlit nem reenvio da geometria.
+    Numa camada de tiles vetoriais, as propriedades são buscadas pelo código da região.
     """
-    # --- PARTE 1: CÁLCULO DO IMPACTO NACIONAL (lógica de Leontief, inalterada) ---
-    setor_idx = setores.index(setor_choque)
-    vetor_choque = np.zeros(len(setores))
-    vetor_choque[setor_idx] = valor_choque
-    impactos_setoriais_nacionais = matriz_L @ vetor_choque
-
-    # --- PARTE 2: DISTRIBUIÇÃO ESPACIAL GRAVITACIONAL (Lógica Nova e Corrigida) ---
-
-    # Calcula o "efeito cascata" (ripple effect) - o impacto que se espalha pela economia
-    ripple_effect_nacional = impactos_setoriais_nacionais.sum() - valor_choque
 
-    # Inicializa um DataFrame de resultados com as colunas que vamos precisar
-    df_resultados = df_economia.copy()
-    df_resultados['impacto_producao'] = 0.0
-    
-    # --- Passo 2a: Atribuir o impacto DIRETO 100% à região de origem ---
-    mask_origem = (df_resultados['regiao'] == regiao_origem) & (df_resultados['setor'] == setor_choque)
-    df_resultados.loc[mask_origem, 'impacto_producao'] = valor_choque
-    
-    # --- Passo 2b: Preparar pesos para distribuir o "efeito cascata" (LÓGICA SUAVIZADA) ---
-    # Calcular distâncias geográficas a partir da origem
-    distancias = calcular_distancias(gdf, regiao_origem)
-    
-    # --- AJUSTE NO FATOR DE ATRITO PARA MAIOR DISPERSÃO ---
-    # Um fator de 0.4 permite impactos mais distribuídos geograficamente.
-    # Valores menores = mais dispersão; valores maiores = mais concentração
-    fator_atrito = 0.4
-    fator_proximidade = np.exp(-fator_atrito * distancias)
-    
-    # Mapear o fator de proximidade para cada linha do DataFrame de resultados
-    # Handle duplicate region names by creating unique indices
-    gdf_unique = gdf.copy()
-    gdf_unique['unique_region'] = gdf_unique['NM_RGINT'] + '_' + gdf_unique.index.astype(str)
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var camada = {{ this.camada.get_name() }};
+            var camadas = {{ this.camadas|tojson }};
+            var esquemas = {{ this.esquemas|tojson }};
+            var estado = {metrica: {{ this.metrica|tojson }}, esquema: {{ this.esquema|tojson }}};
 
-    # Create mapping with unique indices
-    mapa_proximidade = pd.Series(fator_proximidade.values, index=gdf_unique['unique_region'])
+            function estilo(p) {
 
-    # For mapping, try exact match first, then fall back to original name
-    def map_proximidade_safe(regiao):
-        # Try direct mapping first
-        if regiao in mapa_proximidade.index:
-            return mapa_proximidade[regiao]
+                // Destaque da região selecionada
+                if (p.selecionada) {
+                    return {fillColor: '#3b82f6', color: '#1d4ed8', weight: 3, fillOpacity: 0.3, opacity: 1};
+                }
 
-        # For duplicates, find the first match
-        matching_indices = [idx for idx in mapa_proximidade.index if idx.startswith(regiao + '_')]
-        if matching_indices:
-            return mapa_proximidade[matching_indices[0]]
+                // Sem simulação ativa: apenas as bordas cinzas de contexto
+                var classe = p['classe_' + estado.metrica];
+                if (classe === undefined) {
+                    return {fillColor: 'transparent', color: '#888888', weight: 1, fillOpacity: 0, opacity: 1};
+                }
 
-        # Default to 1.0 if no match found
-        return 1.0
+                // Classe dentro dos limites da lista de cores; regiões sem impacto ficam mais claras
+                var cores = esquemas[estado.esquema];
+                var indice = Math.min(Math.max(parseInt(classe, 10) || 0, 0), cores.length - 1);
+                var comImpacto = (p['valor_' + estado.metrica] || 0) > 0;
+                return {
+                    fillColor: cores[indice],
+                    fillOpacity: comImpacto ? 0.85 : 0.3,
+                    weight: comImpacto ? 0.5 : 0.2,
+                    color: comImpacto ? '#ffffff' : '#cccccc',
+                    opacity: 0.8
+                };
+            }
 
-    df_resultados['proximidade'] = df_resultados['regiao'].apply(map_proximidade_safe)
-    
-    # Criar um peso final combinando tamanho econômico (`share_nacional`) e proximidade
-    df_resultados['peso_final'] = df_resultados['share_nacional'] * df_resultados['proximidade']
-    
-    # --- Passo 2c: Distribuir o "efeito cascata" usando os novos pesos ---
-    for setor_idx, setor_nome in enumerate(setores):
-        # O efeito cascata de cada setor
-        ripple_setor = impactos_setoriais_nacionais[setor_idx]
-        if setor_idx == setores.index(setor_choque):
-            ripple_setor -= valor_choque # Subtrai o choque direto que já alocamos
-        
-        if ripple_setor > 0:
-            # Filtra para o setor atual
-            mask_setor = df_resultados['setor'] == setor_nome
-            
-            # Normaliza os pesos para que a soma seja 1 (dentro do setor)
-            soma_pesos_setor = df_resultados.loc[mask_setor, 'peso_final'].sum()
-            if soma_pesos_setor > 0:
-                pesos_normalizados = df_resultados.loc[mask_setor, 'peso_final'] / soma_pesos_setor
-                
-                # Distribui o ripple do setor e SOMA ao impacto já existente (o direto)
-                impacto_distribuido = pesos_normalizados * ripple_setor
-                df_resultados.loc[mask_setor, 'impacto_producao'] += impacto_distribuido
-
-    # --- PARTE 3: CÁLCULO DOS INDICADORES FINAIS (VAB, Impostos, Empregos) ---
-    # (Usando os aprimoramentos que definimos anteriormente)
-    df_resultados['coef_vab'] = df_resultados['setor'].map(coef_vab_por_setor)
-    df_resultados['impacto_vab'] = df_resultados['impacto_producao'] * df_resultados['coef_vab']
-    df_resultados['impacto_impostos'] = df_resultados['impacto_vab'] * coef_impostos_sobre_vab
-    
-    # --- CORREÇÃO NO CÁLCULO DE EMPREGOS ---
-    df_resultados['coef_emprego'] = df_resultados['setor'].map(coef_emprego_por_setor)
-    df_resultados['impacto_empregos'] = df_resultados['impacto_producao'] * df_resultados['coef_emprego']
-    
-    df_resultados['impacto_empresas'] = df_resultados['impacto_producao'] * 0.01
-
-    # --- PARTE 4: CLASSIFICAÇÃO MULTIVARIADA PARA O MAPA ---
-    impacto_agregado = df_resultados.groupby('regiao').agg(
-        impacto_producao=('impacto_producao', 'sum'),
-        impacto_vab=('impacto_vab', 'sum'),
-        impacto_empregos=('impacto_empregos', 'sum'),
-        impacto_impostos=('impacto_impostos', 'sum')
-    )
-    
-    all_bins = {
-        'impacto_producao': calculate_log_bins(impacto_agregado['impacto_producao']),
-        'impacto_vab': calculate_log_bins(impacto_agregado['impacto_vab']),
-        'impacto_empregos': calculate_log_bins(impacto_agregado['impacto_empregos']),
-        'impacto_impostos': calculate_log_bins(impacto_agregado['impacto_impostos'])
-    }
+            function aplicar() {
+                if (camada.propriedades) {
+                    // Tiles vetoriais: junta pelo código e redesenha os tiles visíveis
+                    camada.options.vectorTileLayerStyles[{{ this.nome_camada|tojson }}] = function(p) {
+                        return L.extend({fill: true}, estilo(camada.propriedades[p.codigo] || {}));
+                    };
+                    camada.redraw();
+                } else {
+                    camada.setStyle(function(feature) { return estilo(feature.properties); });
+                }
+                var gradiente = 'linear-gradient(to right, ' + esquemas[estado.esquema].join(', ') + ')';
+                document.querySelectorAll('.legenda-mapa').forEach(function(legenda) {
+                    legenda.style.display = legenda.dataset.camada === estado.metrica ? 'block' : 'none';
+                    legenda.querySelectorAll('.legenda-gradiente').forEach(function(barra) {
+                        barra.style.background = gradiente;
+                    });
+                });
+            }
 
-    for metrica, bins in all_bins.items():
-        # Ensure bins is properly formatted and has at least 2 values
-        if len(bins) < 2:
-            bins = [impacto_agregado[metrica].min(), impacto_agregado[metrica].max()]
+            function seletor(opcoes, valorAtual, aoMudar) {
+                var select = L.DomUtil.create('select');
+                select.style.cssText = 'display: block; width: 100%; margin-top: 4px; font-size: 12px;';
+                Object.keys(opcoes).forEach(function(rotulo) {
+                    var opcao = L.DomUtil.create('option', '', select);
+                    opcao.value = opcoes[rotulo];
+                    opcao.text = rotulo;
+                    opcao.selected = opcoes[rotulo] === valorAtual;
+                });
+                L.DomEvent.on(select, 'change', function() { aoMudar(select.value); aplicar(); });
+                return select;
+            }
 
-        # Create labels after confirming bin count
-        num_labels = max(1, len(bins) - 1)
-        labels = [i for i in range(num_labels)]
+            var controle = L.control({position: 'topright'});
+            controle.onAdd = function() {
+                var div = L.DomUtil.create('div', 'leaflet-bar');
+                div.style.cssText = 'background: rgba(255, 255, 255, 0.95); padding: 8px; width: 210px; font: 12px Arial, sans-serif;';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+
+                var rotuloCamada = L.DomUtil.create('strong', '', div);
+                rotuloCamada.textContent = '📊 Camada';
+                div.appendChild(seletor(camadas, estado.metrica, function(valor) { estado.metrica = valor; }));
+
+                var rotuloCores = L.DomUtil.create('strong', '', div);
+                rotuloCores.style.cssText = 'display: block; margin-top: 8px;';
+                rotuloCores.textContent = '🎨 Esquema de Cores';
+                var nomesEsquemas = {};
+                Object.keys(esquemas).forEach(function(nome) { nomesEsquemas[nome] = nome; });
+                div.appendChild(seletor(nomesEsquemas, estado.esquema, function(valor) { estado.esquema = valor; }));
+                return div;
+            };
+            controle.addTo({{ this._parent.get_name() }});
+            aplicar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, camada, camadas=CAMADAS_MAPA, esquemas=ESQUEMAS_CORES, metrica='impacto_producao',
+                 esquema='Economic Impact', nome_camada=OBJETO_TOPOJSON):
+        super().__init__()
+        self._name = 'ControleCamadasMapa'
+        self.camada = camada
+        self.nome_camada = nome_camada
+        self.camadas = camadas
+        self.esquemas = esquemas
+        self.metrica = metrica
+        self.esquema = esquema
 
-        try:
-            classes = pd.cut(impacto_agregado[metrica], bins=bins, labels=labels, include_lowest=True, duplicates='drop')
-            # Criar um dicionário para mapear região -> classe
-            classes_dict = classes.to_dict()
-            df_resultados[f'classe_{metrica}'] = df_resultados['regiao'].map(classes_dict)
-            df_resultados[f'classe_{metrica}'].fillna(0, inplace=True)
-        except ValueError as e:
-            # Fallback: use simple quartile-based binning
-            classes = pd.qcut(impacto_agregado[metrica], q=min(4, len(impacto_agregado[metrica].unique())),
-                            labels=False, duplicates='drop')
-            classes_dict = classes.to_dict()
-            df_resultados[f'classe_{metrica}'] = df_resultados['regiao'].map(classes_dict)
-            df_resultados[f'classe_{metrica}'].fillna(0, inplace=True)
-
-    # --- PARTE 5: CÁLCULO DOS PERCENTUAIS DE AUMENTO ---
-    df_resultados_com_percentuais = calcular_percentuais_impacto(df_economia, df_resultados)
-
-    return df_resultados_com_percentuais, impactos_setoriais_nacionais, all_bins
 
 # ==============================================================================
 # COMPONENTES DE INTERFACE ELEGANTES
@@ -1032,8 +888,9 @@ def criar_controles_simulacao_sidebar(df_economia):
         return
 
     # Dados da região selecionada
-    regiao_normalizada = normalizar_string(st.session_state.regiao_ativa)
-    dados_regiao = df_economia[df_economia['regiao'] == regiao_normalizada].copy()
+    dados_regiao = dados_da_regiao(
+        df_economia, st.session_state.regiao_ativa, st.session_state.get('codigo_regiao_ativa')
+    ).copy()
 
     # Cabeçalho elegante da simulação
     st.markdown(f"""
@@ -1069,7 +926,7 @@ def criar_controles_simulacao_sidebar(df_economia):
     )
 
     setor_selecionado = setores[setor_idx]
-    multiplicador = matriz_L_df.sum(axis=0)[setor_selecionado]
+    multiplicador = multiplicadores_producao[setor_selecionado]
 
     # Info compacta do multiplicador
     st.markdown(f"""
@@ -1333,7 +1190,7 @@ def criar_sidebar_controles(df_economia, gdf):
             regiao_normalizada = normalizar_string(st.session_state.regiao_ativa)
             setor_normalizado = normalizar_string(setor_selecionado)
 
-            dados_regiao = df_economia[df_economia['regiao'] == regiao_normalizada]
+            dados_regiao = dados_da_regiao(df_economia, regiao_normalizada, st.session_state.get('codigo_regiao_ativa'))
             dados_setor = dados_regiao[dados_regiao['setor'] == setor_normalizado]
 
             # Debug para ajudar a identificar problemas
@@ -1383,6 +1240,20 @@ def criar_sidebar_controles(df_economia, gdf):
             </div>
             """, unsafe_allow_html=True)
 
+        # Modelo de regionalização do choque
+        st.markdown("**🧭 Modelo Espacial**")
+        st.radio(
+            "Modelo espacial:",
+            options=['gravitacional', 'interregional'],
+            format_func=lambda x: {
+                'gravitacional': "🌐 Gravitacional (Leontief nacional regionalizado)",
+                'interregional': "🔗 Interregional (MRIO, 510 regiões)"
+            }[x],
+            key='modelo_espacial',
+            label_visibility="collapsed",
+            help="O modelo interregional resolve a matriz regiões × setores com comércio entre regiões derivado da distância."
+        )
+
         st.markdown("---")
 
         # Botões de ação principais
@@ -1395,7 +1266,8 @@ def criar_sidebar_controles(df_economia, gdf):
                         disabled=st.session_state.regiao_ativa is None,
                         help="Calcular os impactos econômicos do choque"):
                 if st.session_state.regiao_ativa:
-                    executar_simulacao_nova(st.session_state.regiao_ativa, setor_selecionado, valor_investimento, df_economia, gdf)
+                    executar_simulacao_nova(st.session_state.regiao_ativa, setor_selecionado, valor_investimento, df_economia, gdf,
+                                            codigo_regiao=st.session_state.get('codigo_regiao_ativa'))
                     st.rerun()
 
         with col2:
@@ -1405,6 +1277,7 @@ def criar_sidebar_controles(df_economia, gdf):
                         help="Limpar seleções e começar nova análise"):
                 # Reset para nova simulação
                 st.session_state.regiao_ativa = None
+                st.session_state.codigo_regiao_ativa = None
                 st.rerun()
 
         # Explicação do modelo
@@ -1504,12 +1377,12 @@ def criar_sidebar_controles(df_economia, gdf):
             </div>
             """, unsafe_allow_html=True)
 
-def criar_painel_resultados_aprimorado(simulacao):
+def criar_painel_resultados_aprimorado(simulacao, df_economia=None, gdf=None):
     """Cria um painel de resultados com dashboard interativo e gráficos."""
     
     st.markdown("### 📈 Análise de Impactos da Simulação")
     
-    resultados_df = simulacao['resultados']
+    resumo = simulacao['resumo']
     params = simulacao['parametros']
     
     # Card de Resumo da Simulação (mantido, é ótimo)
@@ -1522,9 +1395,9 @@ def criar_painel_resultados_aprimorado(simulacao):
     """, unsafe_allow_html=True)
 
     # Métricas Principais (mantidas)
-    total_impacto_prod = resultados_df['impacto_producao'].sum()
-    total_impacto_vab = resultados_df['impacto_vab'].sum()
-    total_empregos = resultados_df['impacto_empregos'].sum()
+    total_impacto_prod = resumo.totais['impacto_producao']
+    total_impacto_vab = resumo.totais['impacto_vab']
+    total_empregos = resumo.totais['impacto_empregos']
 
     col1, col2 = st.columns(2)
     with col1:
@@ -1538,16 +1411,13 @@ def criar_painel_resultados_aprimorado(simulacao):
 
     # --- NOVO DASHBOARD COM ABAS ---
     st.markdown("#### 📊 Análise Detalhada dos Impactos")
-    tab_ranking, tab_setorial = st.tabs(["🏆 Ranking Regional", "🏭 Composição Setorial"])
+    tab_ranking, tab_setorial, tab_incerteza = st.tabs(["🏆 Ranking Regional", "🏭 Composição Setorial", "📉 Incerteza"])
 
     with tab_ranking:
         st.markdown("**Top 15 Regiões Imediatas Mais Impactadas (por Produção)**")
         
-        impacto_por_regiao = resultados_df.groupby('regiao').agg(
-            impacto_producao=('impacto_producao', 'sum'),
-            impacto_vab=('impacto_vab', 'sum'),
-            impacto_empregos=('impacto_empregos', 'sum')
-        ).nlargest(15, 'impacto_producao').reset_index()
+        impacto_por_regiao = resumo.por_regiao[['regiao', 'impacto_producao', 'impacto_vab', 'impacto_empregos']] \
+            .nlargest(15, 'impacto_producao')
 
         fig_ranking = px.bar(
             impacto_por_regiao,
@@ -1568,26 +1438,86 @@ def criar_painel_resultados_aprimorado(simulacao):
     with tab_setorial:
         st.markdown("**Composição do Impacto Total por Setor Econômico**")
         
-        impacto_por_setor = resultados_df.groupby('setor').agg(
-            impacto_producao=('impacto_producao', 'sum'),
-            impacto_vab=('impacto_vab', 'sum'),
-            impacto_empregos=('impacto_empregos', 'sum')
-        ).reset_index()
+        impacto_por_setor = resumo.por_setor[['impacto_producao', 'impacto_vab', 'impacto_empregos']].reset_index()
 
         fig_treemap = px.treemap(
             impacto_por_setor,
             path=[px.Constant("Impacto Total"), 'setor'],
             values='impacto_producao',
             color='setor',
-            color_discrete_map={
-                'Agropecuária': '#FF6B6B', 'Indústria': '#4ECDC4',
-                'Construção': '#45B7D1', 'Serviços': '#96CEB4'
-            },
+            color_discrete_map={setor: metadados_setores[setor]['cor'] for setor in setores},
             hover_data={'impacto_vab': ':.2f', 'impacto_empregos': ':.0f'}
         )
         fig_treemap.update_layout(margin = dict(t=50, l=25, r=25, b=25))
         st.plotly_chart(fig_treemap, width='stretch')
 
+    with tab_incerteza:
+        if df_economia is None or gdf is None:
+            st.info("Bandas de incerteza indisponíveis para esta simulação.")
+        else:
+            criar_secao_incerteza(simulacao, df_economia, gdf)
+
+@st.cache_data(show_spinner="🎲 Calculando bandas de incerteza (Monte Carlo)...")
+def calcular_bandas_incerteza(_df_economia, _gdf, valor, setor, regiao_origem, num_amostras):
+    """Bandas P5/P50/P95 do choque, cacheadas pelos parâmetros da simulação."""
+    return simular_incerteza(_df_economia, _gdf, valor, setor, regiao_origem,
+                             carregar_matriz_distancias(_gdf), num_amostras=num_amostras)
+
+def criar_secao_incerteza(simulacao, df_economia, gdf):
+    """Bandas de confiança (Monte Carlo) dos totais, multiplicadores e regiões mais impactadas."""
+    st.markdown("**Bandas de Incerteza (P5 – P50 – P95)**")
+    st.caption("Perturba a matriz A, os coeficientes de VAB, emprego e impostos e o fator de atrito "
+               "e repete a simulação para milhares de conjuntos de parâmetros.")
+
+    num_amostras = st.select_slider("Amostras", options=[500, 1000, 2000, 5000], value=2000,
+                                    key=f"amostras_incerteza_{simulacao['id']}")
+    regiao_origem = simulacao.get('codigo_regiao')
+    if regiao_origem is None:
+        regiao_origem = simulacao['regiao']
+    bandas = calcular_bandas_incerteza(df_economia, gdf, simulacao['valor'], simulacao['setor'],
+                                       regiao_origem, num_amostras)
+
+    nomes_indicadores = {
+        'impacto_producao': '💰 Produção (R$ Mi)', 'impacto_vab': '📈 VAB (R$ Mi)',
+        'impacto_impostos': '🏛️ Impostos (R$ Mi)', 'impacto_empregos': '👥 Empregos'
+    }
+    totais = bandas['totais'].copy()
+    totais['indicador'] = totais['indicador'].map(nomes_indicadores)
+    st.dataframe(
+        totais.rename(columns={'indicador': 'Indicador', 'p5': 'P5', 'p50': 'P50', 'p95': 'P95'}),
+        hide_index=True, width='stretch',
+        column_config={col: st.column_config.NumberColumn(format="%.2f") for col in ['P5', 'P50', 'P95']}
+    )
+
+    regioes = bandas['regioes']
+    top_regioes = regioes[regioes['indicador'] == 'impacto_producao'].nlargest(15, 'p50')
+    fig_bandas = go.Figure(go.Bar(
+        x=top_regioes['p50'],
+        y=top_regioes['regiao'],
+        orientation='h',
+        marker_color='#3b82f6',
+        error_x=dict(
+            type='data', symmetric=False,
+            array=top_regioes['p95'] - top_regioes['p50'],
+            arrayminus=top_regioes['p50'] - top_regioes['p5']
+        ),
+        hovertemplate="%{y}<br>P50: R$ %{x:.2f} Mi<extra></extra>"
+    ))
+    fig_bandas.update_layout(
+        title="Top 15 Regiões - Produção (P50 com faixa P5–P95)",
+        xaxis_title="Impacto na Produção (R$ Milhões)",
+        yaxis={'categoryorder': 'total ascending'},
+        height=500
+    )
+    st.plotly_chart(fig_bandas, width='stretch')
+
+    with st.expander("📊 Multiplicadores de produção por setor"):
+        st.dataframe(
+            bandas['multiplicadores'].rename(columns={'setor': 'Setor', 'p5': 'P5', 'p50': 'P50', 'p95': 'P95'}),
+            hide_index=True, width='stretch',
+            column_config={col: st.column_config.NumberColumn(format="%.3f") for col in ['P5', 'P50', 'P95']}
+        )
+
 def criar_painel_resultados():
     """Nova coluna de resultados compacta e organizada"""
 
@@ -1610,17 +1540,19 @@ def criar_painel_resultados():
         st.session_state.simulacoes = []
         st.session_state.contador_simulacoes = 0
         st.session_state.regiao_ativa = None
-        st.session_state.resultados_simulacao = None
-        st.session_state.parametros_simulacao = None
+        st.session_state.codigo_regiao_ativa = None
+        st.session_state.simulacao_atual = None
         st.success("✅ Simulações removidas!")
         st.rerun()
 
     # Mostrar última simulação
-    if st.session_state.resultados_simulacao is not None:
-        total_impacto = st.session_state.resultados_simulacao['impacto_producao'].sum()
-        total_empregos = st.session_state.resultados_simulacao['impacto_empregos'].sum()
-        total_vab = st.session_state.resultados_simulacao['impacto_vab'].sum()
-        total_impostos = st.session_state.resultados_simulacao['impacto_impostos'].sum()
+    if st.session_state.simulacao_atual is not None:
+        simulacao_atual = st.session_state.simulacao_atual
+        resumo_atual = simulacao_atual['resumo']
+        total_impacto = simulacao_atual.total('impacto_producao')
+        total_empregos = simulacao_atual.total('impacto_empregos')
+        total_vab = simulacao_atual.total('impacto_vab')
+        total_impostos = simulacao_atual.total('impacto_impostos')
 
         # Métricas principais expandidas
         col1, col2 = st.columns(2)
@@ -1633,14 +1565,14 @@ def criar_painel_resultados():
 
         # Top 3 regiões impactadas
         st.markdown("**🏆 Top 3 Regiões Imediatas**")
-        top_regioes = st.session_state.resultados_simulacao.groupby('regiao')['impacto_producao'].sum().nlargest(3)
+        top_regioes = resumo_atual.por_regiao.nlargest(3, 'impacto_producao')
 
-        for i, (regiao, impacto) in enumerate(top_regioes.items(), 1):
+        for i, (regiao, impacto) in enumerate(zip(top_regioes['regiao'], top_regioes['impacto_producao']), 1):
             st.markdown(f"**{i}.** {regiao[:20]}... - R$ {impacto:,.0f}M")
 
         # Gráfico compacto por setor
         st.markdown("**📊 Impacto por Setor**")
-        impactos_setor = st.session_state.resultados_simulacao.groupby('setor')['impacto_producao'].sum()
+        impactos_setor = resumo_atual.por_setor['impacto_producao']
 
         fig = px.bar(
             x=impactos_setor.values,
@@ -1669,54 +1601,72 @@ def criar_painel_resultados():
                     pass
 
 
-def executar_simulacao_nova(regiao, setor, valor, df_economia, gdf):
+def executar_simulacao_nova(regiao, setor, valor, df_economia, gdf, codigo_regiao=None):
     """Executa uma nova simulação e adiciona à lista"""
-    resultados, _, all_bins = executar_simulacao_avancada(
-        df_economia=df_economia,
-        gdf=gdf,
-        valor_choque=valor,
-        setor_choque=setor,
-        regiao_origem=regiao
-    )
-
-    if resultados is not None:
-        # Gerar cor única
-        cores_disponiveis = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8', '#F7DC6F']
-        cor_simulacao = cores_disponiveis[len(st.session_state.simulacoes) % len(cores_disponiveis)]
-
-        # Nova simulação
-        nova_simulacao = {
-            'id': f'sim_{st.session_state.contador_simulacoes:03d}',
-            'nome': f'Simulação {st.session_state.contador_simulacoes}: {setor} em {regiao}',
-            'regiao': regiao,
-            'setor': setor,
-            'valor': valor,
-            'timestamp': datetime.now(),
-            'resultados': resultados,
-            'all_bins': all_bins,  # Armazenar todos os bins para diferentes métricas
-            'parametros': {  # Adicionando a chave que faltava
-                'regiao_origem': regiao,
-                'setor_investimento': setor,
-                'valor_investimento': valor,
-                'timestamp': datetime.now()
-            },
-            'cor': cor_simulacao,
-            'ativa': True
-        }
+    modelo_espacial = st.session_state.get('modelo_espacial', 'gravitacional')
+    regiao_origem = codigo_regiao if codigo_regiao is not None else regiao
 
-        st.session_state.simulacoes.append(nova_simulacao)
-        st.session_state.contador_simulacoes += 1
+    if not valor or valor <= 0:
+        st.warning("⚠️ O valor do investimento precisa ser positivo para simular.")
+        return
 
-        # Atualizar simulação atual
-        st.session_state.resultados_simulacao = resultados
-        st.session_state.parametros_simulacao = {
-            'regiao_origem': regiao,
-            'setor_investimento': setor,
-            'valor_investimento': valor,
-            'timestamp': datetime.now()
+    # O modelo é linear no valor: a resposta unitária da última (origem, setor) é só reescalada.
+    # Na sessão fica apenas o registro compacto dela (arrays float32 sobre o índice compartilhado).
+    chave_unitaria = (regiao_origem, setor, modelo_espacial)
+    resposta_unitaria = st.session_state.get('resposta_unitaria')
+    if resposta_unitaria is None or resposta_unitaria['chave'] != chave_unitaria:
+        if modelo_espacial == 'interregional':
+            resultado_unitario = executar_simulacao_interregional(
+                df_economia=df_economia,
+                gdf=gdf,
+                valor_choque=1.0,
+                setor_choque=setor,
+                regiao_origem=regiao_origem,
+                modelo=carregar_modelo_interregional(df_economia, carregar_matriz_distancias(gdf))
+            )
+        else:
+            # Memo LRU do processo: origens populares já simuladas por outras sessões saem prontas
+            resultado_unitario = executar_simulacao_memoizada(
+                df_economia=df_economia,
+                gdf=gdf,
+                valor_choque=1.0,
+                setor_choque=setor,
+                regiao_origem=regiao_origem,
+                matriz_distancias=carregar_matriz_distancias(gdf),
+                kernel_resposta=carregar_kernel_resposta(df_economia, carregar_matriz_distancias(gdf))
+            )
+        resultados_unitarios, _, bins_unitarios = resultado_unitario
+        resposta_unitaria = {
+            'chave': chave_unitaria,
+            'registro': RegistroSimulacao(carregar_indice_resultados(df_economia), resultados_unitarios,
+                                          bins_unitarios, valor=1.0, regiao=regiao),
         }
+        st.session_state.resposta_unitaria = resposta_unitaria
+
+    # Gerar cor única
+    cores_disponiveis = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8', '#F7DC6F']
+    cor_simulacao = cores_disponiveis[len(st.session_state.simulacoes) % len(cores_disponiveis)]
+
+    # Nova simulação: os arrays float32 da resposta unitária multiplicados pelo valor, com as
+    # mesmas classes e as faixas escaladas (sem montar o DataFrame de resultados)
+    nova_simulacao = resposta_unitaria['registro'].reescalado(
+        valor,
+        id=f'sim_{st.session_state.contador_simulacoes:03d}',
+        nome=f'Simulação {st.session_state.contador_simulacoes}: {setor} em {regiao}',
+        regiao=regiao,
+        codigo_regiao=codigo_regiao,
+        setor=setor,
+        modelo_espacial=modelo_espacial,
+        timestamp=datetime.now(),
+        cor=cor_simulacao,
+        ativa=True
+    )
+
+    st.session_state.simulacoes.append(nova_simulacao)
+    st.session_state.contador_simulacoes += 1
+    st.session_state.simulacao_atual = nova_simulacao
 
-        st.success(f"✅ Simulação executada: {setor} em {regiao}")
+    st.success(f"✅ Simulação executada: {setor} em {regiao}")
 
 def criar_secao_export_simples():
     """Seção simplificada de export"""
@@ -1819,9 +1769,9 @@ def criar_funcionalidades_avancadas(df_economia):
     with col2:
         st.markdown("#### 📊 Informações da Simulação")
         
-        if st.session_state.resultados_simulacao is not None:
+        if st.session_state.simulacao_atual is not None:
             # Mostrar informações da última simulação
-            params = st.session_state.parametros_simulacao
+            params = st.session_state.simulacao_atual
             st.markdown(f"""
             **🎯 Última Simulação:**
             - **Região:** {params['regiao']}
@@ -1837,17 +1787,10 @@ def gerar_relatorio_completo():
     relatorio_data = []
 
     for sim in st.session_state.simulacoes:
-        resultados = sim['resultados']
-        total_impacto = resultados['impacto_producao'].sum()
-        total_empregos = resultados['impacto_empregos'].sum()
-
-        # Agregar por região
-        impactos_por_regiao = resultados.groupby('regiao').agg({
-            'impacto_producao': 'sum',
-            'impacto_empregos': 'sum',
-            'impacto_vab': 'sum',
-            'impacto_impostos': 'sum'
-        }).reset_index()
+        total_impacto = sim.total('impacto_producao')
+
+        # Agregados por região calculados na criação da simulação
+        impactos_por_regiao = sim['resumo'].por_regiao.reset_index()
 
         for _, row in impactos_por_regiao.iterrows():
             relatorio_data.append({
@@ -1858,6 +1801,7 @@ def gerar_relatorio_completo():
                 'valor_investimento': sim['valor'],
                 'timestamp': sim['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
                 'regiao_impactada': row['regiao'],
+                'codigo_regiao_impactada': row['codigo_regiao'],
                 'impacto_producao': row['impacto_producao'],
                 'impacto_vab': row['impacto_vab'],
                 'impacto_impostos': row['impacto_impostos'],
@@ -1875,10 +1819,10 @@ def gerar_comparacao_export():
 
     comparacao_data = []
     for sim in simulacoes_ativas:
-        total_impacto = sim['resultados']['impacto_producao'].sum()
-        total_empregos = sim['resultados']['impacto_empregos'].sum()
-        total_vab = sim['resultados']['impacto_vab'].sum()
-        total_impostos = sim['resultados']['impacto_impostos'].sum()
+        total_impacto = sim.total('impacto_producao')
+        total_empregos = sim.total('impacto_empregos')
+        total_vab = sim.total('impacto_vab')
+        total_impostos = sim.total('impacto_impostos')
 
         comparacao_data.append({
             'simulacao_nome': sim['nome'],
@@ -1908,11 +1852,11 @@ def criar_dashboard_comparacao_simulacoes(simulacoes_ativas):
     # Preparar dados para comparação
     dados_comparacao = []
     for sim in simulacoes_ativas:
-        total_impacto = sim['resultados']['impacto_producao'].sum()
-        total_empregos = sim['resultados']['impacto_empregos'].sum()
-        top_regiao_series = sim['resultados'].groupby('regiao')['impacto_producao'].sum()
-        top_regiao = top_regiao_series.idxmax() if not top_regiao_series.empty else 'N/A'
-        top_impacto_regiao = sim['resultados'].groupby('regiao')['impacto_producao'].sum().max()
+        total_impacto = sim.total('impacto_producao')
+        total_empregos = sim.total('impacto_empregos')
+        top_regiao_series = sim['resumo'].por_regiao['impacto_producao']
+        top_regiao = sim['resumo'].por_regiao.at[top_regiao_series.idxmax(), 'regiao'] if not top_regiao_series.empty else 'N/A'
+        top_impacto_regiao = top_regiao_series.max()
 
         dados_comparacao.append({
             'nome': sim['nome'][:25] + '...' if len(sim['nome']) > 25 else sim['nome'],
@@ -2106,7 +2050,7 @@ def criar_dashboard_regiao_elegante(dados_regiao):
     </div>
     """, unsafe_allow_html=True)
 
-def criar_secao_validacao_modelo():
+def criar_secao_validacao_modelo(gdf=None, df_economia=None):
     """Cria seção de validação e parâmetros do modelo"""
 
     st.markdown("""
@@ -2119,15 +2063,23 @@ def criar_secao_validacao_modelo():
     """, unsafe_allow_html=True)
 
     # Tabs para organizar informações técnicas
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Matriz Leontief", "⚙️ Parâmetros", "📈 Multiplicadores", "🎯 Metodologia"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Matriz Leontief", "⚙️ Parâmetros", "📈 Multiplicadores", "🎯 Metodologia", "🌐 Sensibilidade ao Atrito"])
 
     with tab1:
         st.markdown("📊 **Matriz de Impactos (I - A)⁻¹**")
         st.caption("Mostra quanto cada setor produz para atender uma unidade de demanda final")
 
-        # Exibir matriz L com formatação elegante
-        matriz_styled = matriz_L_df.style.format("{:.3f}")
-        st.dataframe(matriz_styled, width='stretch')
+        # A inversa densa só é formada aqui, para exibição (as simulações usam a fatoração LU)
+        matriz_L_df = simulador_modelo.matriz_L_df
+        if len(setores) <= 12:
+            # Exibir matriz L com formatação elegante
+            matriz_styled = matriz_L_df.style.format("{:.3f}")
+            st.dataframe(matriz_styled, width='stretch')
+        else:
+            # Tabelas com dezenas de setores ficam legíveis apenas como mapa de calor
+            fig_matriz = px.imshow(matriz_L_df, color_continuous_scale='viridis', aspect='auto')
+            fig_matriz.update_layout(height=max(400, 12 * len(setores)), margin=dict(t=10, l=10, r=10, b=10))
+            st.plotly_chart(fig_matriz, width='stretch')
 
         st.markdown("""
         <div style="background: var(--primary-50); padding: 1rem; border-radius: var(--radius-md); margin-top: 1rem; border-left: 4px solid var(--primary-500);">
@@ -2165,6 +2117,11 @@ def criar_secao_validacao_modelo():
             st.markdown(f"🏛️ **Carga Tributária:** {coef_impostos_sobre_vab:.1%}")
             st.markdown("📊 **Aplicação:** Sobre VAB gerado")
         
+        estatisticas_memo = memo_simulacoes.estatisticas()
+        st.caption(f"🗃️ Memo de simulações do servidor: {estatisticas_memo['entradas']} resultados "
+                   f"({estatisticas_memo['bytes'] / 1024 ** 2:.1f} MB), {estatisticas_memo['acertos']} acertos, "
+                   f"{estatisticas_memo['falhas']} falhas")
+
         st.markdown("---")
         st.markdown("### 🌍 Cobertura Espacial")
         st.markdown("""
@@ -2177,7 +2134,7 @@ def criar_secao_validacao_modelo():
         st.markdown("### Multiplicadores Setoriais")
 
         # Calcular multiplicadores reais da matriz
-        multiplicadores_reais = matriz_L_df.sum(axis=0)
+        multiplicadores_reais = multiplicadores_producao
 
         # Criar gráfico de multiplicadores
         fig_mult = px.bar(
@@ -2230,6 +2187,76 @@ def criar_secao_validacao_modelo():
         4. **Agregação** dos resultados por região imediata e setor
         """)
 
+    with tab5:
+        criar_secao_sensibilidade_atrito(gdf, df_economia)
+
+@st.cache_data(show_spinner="🌐 Avaliando a grade de fatores de atrito...")
+def calcular_sensibilidade_atrito(_df_economia, _gdf, valor, setor, regiao_origem):
+    """Varredura do fator de atrito para um choque, cacheada pelos parâmetros da simulação."""
+    return varrer_fator_atrito(_df_economia, _gdf, valor, setor, regiao_origem, carregar_matriz_distancias(_gdf))
+
+def criar_secao_sensibilidade_atrito(gdf, df_economia):
+    """Como o transbordamento e as principais regiões receptoras mudam com o fator de atrito β."""
+    st.markdown("### 🌐 Sensibilidade ao Fator de Atrito (β)")
+    st.caption(f"A distribuição espacial usa pesos share × exp(-β·d); o modelo adota β = {fator_atrito}. "
+               "Valores menores dispersam o impacto, valores maiores o concentram perto da origem.")
+
+    if gdf is None or df_economia is None or not st.session_state.get('simulacoes'):
+        st.info("Execute uma simulação na aba principal para analisar a sensibilidade ao fator de atrito.")
+        return
+
+    simulacao = st.session_state.simulacoes[-1]
+    regiao_origem = simulacao.get('codigo_regiao')
+    if regiao_origem is None:
+        regiao_origem = simulacao['regiao']
+    varredura = calcular_sensibilidade_atrito(df_economia, gdf, simulacao['valor'], simulacao['setor'], regiao_origem)
+    resumo = varredura['resumo']
+
+    st.markdown(f"**Simulação analisada:** {simulacao['nome']}")
+
+    fig_atrito = go.Figure()
+    fig_atrito.add_trace(go.Scatter(
+        x=resumo['fator_atrito'], y=resumo['participacao_transbordamento'] * 100,
+        mode='lines', name='Transbordamento (fora da origem)', line=dict(color='#3b82f6')
+    ))
+    fig_atrito.add_trace(go.Scatter(
+        x=resumo['fator_atrito'], y=resumo['participacao_principais'] * 100,
+        mode='lines', name='Top 10 regiões receptoras', line=dict(color='#f59e0b')
+    ))
+    fig_atrito.add_vline(x=fator_atrito, line_dash='dash', line_color='#64748b',
+                         annotation_text=f"β = {fator_atrito}", annotation_position='top')
+    fig_atrito.update_layout(
+        height=320, margin=dict(t=30, l=10, r=10, b=10),
+        xaxis_title='Fator de atrito β', yaxis_title='% da produção total',
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, x=0)
+    )
+    st.plotly_chart(fig_atrito, width='stretch')
+
+    # Principais receptoras em alguns pontos da grade
+    valores_exibidos = resumo['fator_atrito'].iloc[np.linspace(0, len(resumo) - 1, 5).astype(int)].tolist()
+    if not np.isclose(valores_exibidos, fator_atrito).any():
+        valores_exibidos = sorted(valores_exibidos + [fator_atrito])
+    tabela = resumo[resumo['fator_atrito'].isin(valores_exibidos)].copy()
+    colunas_percentuais = ['participacao_transbordamento', 'participacao_principais', 'sobreposicao_principais_padrao']
+    tabela[colunas_percentuais] = tabela[colunas_percentuais] * 100
+    st.dataframe(
+        tabela.rename(columns={
+            'fator_atrito': 'β',
+            'participacao_transbordamento': 'Transbordamento',
+            'participacao_principais': 'Top 10',
+            'distancia_media': 'Distância média (graus)',
+            'principal_receptora': 'Principal receptora',
+            'sobreposicao_principais_padrao': f'Top 10 em comum com β = {fator_atrito}',
+        }),
+        hide_index=True, width='stretch',
+        column_config={
+            'Transbordamento': st.column_config.NumberColumn(format="%.1f%%"),
+            'Top 10': st.column_config.NumberColumn(format="%.1f%%"),
+            'Distância média (graus)': st.column_config.NumberColumn(format="%.2f"),
+            f'Top 10 em comum com β = {fator_atrito}': st.column_config.NumberColumn(format="%.0f%%"),
+        }
+    )
+
 def criar_secao_analise_tecnica():
     """Cria seção completa de análise técnica e validação científica dos dados"""
 
@@ -2304,7 +2331,7 @@ def criar_secao_analise_tecnica():
         # Multiplicadores setoriais
         st.markdown("#### 📊 Multiplicadores Setoriais (Literatura vs. Implementado)")
 
-        multiplicadores_reais = matriz_L_df.sum(axis=0)
+        multiplicadores_reais = multiplicadores_producao
 
         dados_multiplicadores = []
         literatura_ranges = {
@@ -2315,6 +2342,8 @@ def criar_secao_analise_tecnica():
         }
 
         for setor in setores:
+            if setor not in literatura_ranges:
+                continue  # Sem faixa de referência para setores de matrizes carregadas de arquivo
             mult_real = multiplicadores_reais[setor]
             min_lit, max_lit = literatura_ranges[setor]
             status = "✅ Dentro da faixa" if min_lit <= mult_real <= max_lit else "⚠️ Fora da faixa"
@@ -2343,7 +2372,8 @@ def criar_secao_analise_tecnica():
                     'Serviços': "Margem intermediária - setor heterogêneo"
                 }
                 st.markdown(f"{emoji} **{setor}:** {coef:.1%}")
-                st.caption(justificativa[setor])
+                if setor in justificativa:
+                    st.caption(justificativa[setor])
 
         with col2:
             st.markdown("**📈 Comparação com IBGE (2017):**")
@@ -2354,6 +2384,8 @@ def criar_secao_analise_tecnica():
                 'Serviços': "59.1%"
             }
             for setor, ref in referencias_ibge.items():
+                if setor not in metadados_setores:
+                    continue
                 emoji = metadados_setores[setor]['emoji']
                 st.markdown(f"{emoji} **IBGE {setor}:** {ref}")
 
@@ -2463,21 +2495,23 @@ def criar_secao_analise_tecnica():
             """)
 
     with tab_exemplo:
-        st.markdown("### 📈 Exemplo Prático: Choque de R$ 1 Bilhão na Indústria")
+        # Com uma matriz carregada de arquivo, o exemplo usa o primeiro setor se não houver 'Indústria'
+        setor_exemplo = 'Indústria' if 'Indústria' in setores else setores[0]
+        st.markdown(f"### 📈 Exemplo Prático: Choque de R$ 1 Bilhão em {setor_exemplo}")
 
         # Simulação passo-a-passo
         st.markdown("#### 🔢 Cálculo Passo-a-Passo")
 
         valor_exemplo = 1000  # R$ 1 bilhão em milhões
-        mult_industria = matriz_L_df.sum(axis=0)['Indústria']
+        mult_industria = multiplicadores_producao[setor_exemplo]
 
         passos_calculo = [
-            ("1. Choque Inicial", f"R$ {valor_exemplo:,.0f} Mi na Indústria", "Investimento direto"),
+            ("1. Choque Inicial", f"R$ {valor_exemplo:,.0f} Mi em {setor_exemplo}", "Investimento direto"),
             ("2. Multiplicador Leontief", f"{mult_industria:.2f}x", "Efeitos diretos + indiretos + induzidos"),
             ("3. Impacto Total de Produção", f"R$ {valor_exemplo * mult_industria:,.0f} Mi", f"{valor_exemplo:,.0f} × {mult_industria:.2f}"),
-            ("4. VAB Gerado", f"R$ {valor_exemplo * mult_industria * coef_vab_por_setor['Indústria']:,.0f} Mi", f"Produção × coef. VAB ({coef_vab_por_setor['Indústria']:.1%})"),
-            ("5. Impostos Arrecadados", f"R$ {valor_exemplo * mult_industria * coef_vab_por_setor['Indústria'] * coef_impostos_sobre_vab:,.0f} Mi", f"VAB × carga tributária ({coef_impostos_sobre_vab:.1%})"),
-            ("6. Empregos Gerados", f"{valor_exemplo * mult_industria * coef_emprego_por_setor['Indústria']:,.0f} postos", f"Produção × coef. emprego ({coef_emprego_por_setor['Indústria']:.1f}/R$ Mi)")
+            ("4. VAB Gerado", f"R$ {valor_exemplo * mult_industria * coef_vab_por_setor[setor_exemplo]:,.0f} Mi", f"Produção × coef. VAB ({coef_vab_por_setor[setor_exemplo]:.1%})"),
+            ("5. Impostos Arrecadados", f"R$ {valor_exemplo * mult_industria * coef_vab_por_setor[setor_exemplo] * coef_impostos_sobre_vab:,.0f} Mi", f"VAB × carga tributária ({coef_impostos_sobre_vab:.1%})"),
+            ("6. Empregos Gerados", f"{valor_exemplo * mult_industria * coef_emprego_por_setor[setor_exemplo]:,.0f} postos", f"Produção × coef. emprego ({coef_emprego_por_setor[setor_exemplo]:.1f}/R$ Mi)")
         ]
 
         for i, (passo, resultado, calculo) in enumerate(passos_calculo, 1):
@@ -2566,7 +2600,7 @@ def criar_secao_analise_tecnica():
         </div>
         """, unsafe_allow_html=True)
 
-def criar_ranking_resultados_elegante(resultados_simulacao):
+def criar_ranking_resultados_elegante(simulacao):
     """Cria ranking visual elegante de resultados com composição setorial"""
 
     st.markdown("""
@@ -2575,8 +2609,8 @@ def criar_ranking_resultados_elegante(resultados_simulacao):
     </div>
     """, unsafe_allow_html=True)
 
-    # Agregar por região
-    resultados_agregados = resultados_simulacao.groupby('regiao')['impacto_producao'].sum().reset_index()
+    # Agregados por região calculados na criação da simulação
+    resultados_agregados = simulacao['resumo'].por_regiao[['regiao', 'impacto_producao']]
     top_10 = resultados_agregados.nlargest(10, 'impacto_producao')
 
     # Gráfico de barras horizontal para o top 10
@@ -2603,13 +2637,14 @@ def criar_ranking_resultados_elegante(resultados_simulacao):
     st.markdown("### 📊 Composição Setorial - Top 5 Regiões Imediatas")
 
     top_5 = top_10.head(5)
+    resultados_simulacao = simulacao['resultados']
 
-    for i, row in top_5.iterrows():
+    for i, (codigo_regiao, row) in enumerate(top_5.iterrows()):
         regiao = row['regiao']
         impacto_total = row['impacto_producao']
 
-        # Dados setoriais da região
-        dados_regiao = resultados_simulacao[resultados_simulacao['regiao'] == regiao]
+        # Dados setoriais da região (pelo código: nomes se repetem entre estados)
+        dados_regiao = resultados_simulacao[resultados_simulacao['codigo_regiao'] == codigo_regiao]
 
         with st.expander(f"🥇 {regiao} - R$ {impacto_total:,.1f} Mi", expanded=(i == 0)):
             col1, col2 = st.columns([2, 1])
@@ -2659,11 +2694,19 @@ def main():
         st.error("❌ Não foi possível carregar os dados geográficos.")
         st.stop()
 
+    # Matriz de distâncias origem×destino (pré-calculada em disco, compartilhada entre sessões)
+    matriz_distancias = carregar_matriz_distancias(gdf)
+
     df_economia = carregar_dados_reais_ibge(gdf)
 
+    # Respostas unitárias do modelo para todas as origens (cada simulação vira uma fatia escalada)
+    carregar_kernel_resposta(df_economia, matriz_distancias)
+
     # Estado da sessão para sistema multi-simulação
     if 'regiao_ativa' not in st.session_state:
         st.session_state.regiao_ativa = None
+    if 'codigo_regiao_ativa' not in st.session_state:
+        st.session_state.codigo_regiao_ativa = None
     if 'simulacoes' not in st.session_state:
         st.session_state.simulacoes = []
     if 'contador_simulacoes' not in st.session_state:
@@ -2671,14 +2714,8 @@ def main():
     if 'sidebar_state' not in st.session_state:
         st.session_state.sidebar_state = 'expanded'  # 'expanded' ou 'collapsed'
 
-    # Manter compatibilidade com código existente
-    # A simulação "ativa" é a última da lista ou None se não houver
-    if len(st.session_state.simulacoes) > 0:
-        st.session_state.resultados_simulacao = st.session_state.simulacoes[-1]['resultados']
-        st.session_state.parametros_simulacao = st.session_state.simulacoes[-1]['parametros']
-    else:
-        st.session_state.resultados_simulacao = None
-        st.session_state.parametros_simulacao = None
+    # A simulação "atual" é a última da lista ou None se não houver (resultados montados sob demanda)
+    st.session_state.simulacao_atual = st.session_state.simulacoes[-1] if st.session_state.simulacoes else None
 
     # ============================================================================
     # NAVEGAÇÃO POR ABAS
@@ -2691,7 +2728,7 @@ def main():
 
     with tab2:
         # ABA TÉCNICA - VALIDAÇÃO E PARÂMETROS
-        criar_secao_validacao_modelo()
+        criar_secao_validacao_modelo(gdf, df_economia)
 
     with tab3:
         # ABA ANÁLISE CIENTÍFICA - VALIDAÇÃO COMPLETA DOS DADOS
@@ -2719,23 +2756,6 @@ def simulacao_principal_tab(gdf, df_economia):
         try:
             st.markdown("### 🗺️ Análise Geográfica Interativa")
             
-            # Seletor de Camada Expandido
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                layer_choice = st.selectbox(
-                    "📊 Selecione a camada para visualizar no mapa:",
-                    ['Produção Total', 'VAB (PIB)', 'Empregos Gerados', 'Impostos Arrecadados',
-                     'Multiplicador Efetivo', 'Densidade de Impacto', 'Spillover Relativo'],
-                    key="map_layer_selector"
-                )
-            with col2:
-                color_scheme = st.selectbox(
-                    "🎨 Esquema de Cores:",
-                    ['Economic Impact', 'Viridis (Verde-Azul)', 'Plasma (Rosa-Amarelo)', 'Inferno (Preto-Amarelo)',
-                     'Blues (Azul)', 'Reds (Vermelho)', 'YlOrRd (Amarelo-Vermelho)'],
-                    key="color_scheme_selector"
-                )
-
             # Toggle para mostrar percentuais no hover
             show_percentages = st.checkbox(
                 "🔍 Mostrar percentuais de aumento no hover",
@@ -2750,7 +2770,7 @@ def simulacao_principal_tab(gdf, df_economia):
             if len(simulacoes_ativas) > 0:
                 with st.expander("🔬 Análise da Distribuição de Impactos (Debug)", expanded=False):
                     simulacao_ativa = simulacoes_ativas[-1]
-                    analise = analisar_distribuicao_impactos(simulacao_ativa['resultados'])
+                    analise = simulacao_ativa['resumo'].distribuicao
 
                     col1, col2 = st.columns(2)
                     with col1:
@@ -2769,336 +2789,156 @@ def simulacao_principal_tab(gdf, df_economia):
                         for i, (regiao, impacto) in enumerate(top_20.items(), 1):
                             st.write(f"{i:2d}. {regiao}: +{impacto:.4f}%")
 
-            # Mapeamento expandido de colunas e cálculo de métricas derivadas
-            if len(simulacoes_ativas) > 0:
-                simulacao_ref = simulacoes_ativas[-1]
-                resultados_df = simulacao_ref['resultados']
-
-                # Calcular métricas derivadas por região
-                dados_agregados = resultados_df.groupby('regiao').agg(
-                    impacto_producao=('impacto_producao', 'sum'),
-                    impacto_vab=('impacto_vab', 'sum'),
-                    impacto_empregos=('impacto_empregos', 'sum'),
-                    impacto_impostos=('impacto_impostos', 'sum'),
-                    vab_baseline=('vab_baseline', 'sum')
-                ).reset_index()
-
-                # Calcular métricas adicionais
-                dados_agregados['multiplicador_efetivo'] = dados_agregados['impacto_producao'] / simulacao_ref['valor']
-                dados_agregados['densidade_impacto'] = dados_agregados['impacto_vab'] / dados_agregados['vab_baseline'] * 100
-                # Spillover relativo: impacto fora da região de origem
-                regiao_origem = simulacao_ref['regiao']
-                dados_agregados['spillover_relativo'] = dados_agregados.apply(
-                    lambda row: row['impacto_producao'] if row['regiao'] != regiao_origem else 0, axis=1
-                )
+            metadados_tiles = carregar_metadados_tiles(URL_TILES) if URL_TILES else None
+            if URL_TILES and metadados_tiles is None:
+                st.warning(f"⚠️ Servidor de tiles em {URL_TILES} não respondeu; usando a geometria embutida no mapa.")
+            estaticos_tiles = (metadados_tiles or {}).get('estaticos', {})
+            if metadados_tiles is not None and not estaticos_tiles.get('vectorgrid'):
+                # Sem o plugin a camada de tiles quebraria o mapa inteiro: fica a geometria embutida
+                st.warning(f"⚠️ O servidor de tiles em {URL_TILES} não publica o plugin Leaflet.VectorGrid em "
+                           "/static; usando a geometria embutida no mapa.")
+                metadados_tiles = None
 
-            column_map = {
-                'Produção Total': 'impacto_producao',
-                'VAB (PIB)': 'impacto_vab',
-                'Empregos Gerados': 'impacto_empregos',
-                'Impostos Arrecadados': 'impacto_impostos',
-                'Multiplicador Efetivo': 'multiplicador_efetivo',
-                'Densidade de Impacto': 'densidade_impacto',
-                'Spillover Relativo': 'spillover_relativo'
-            }
+            mapa = criar_mapa_base(URL_TILES, estaticos_tiles)
 
-            selected_column = column_map[layer_choice]
-            selected_class_col = f"classe_{selected_column}"
-            
-            mapa = folium.Map(location=[-15.0, -55.0], zoom_start=4, tiles="CartoDB positron")
-
-            # --- LÓGICA DE VISUALIZAÇÃO CORRIGIDA COM 4 CAMADAS ---
-
-            # Camada 1: Bordas de Fundo (VISUAL)
-            # Desenha as bordas cinzas de todas as regiões para contexto
-            folium.GeoJson(
-                gdf,
-                name='Bordas das Regiões',
-                style_function=lambda x: {
-                    'fillColor': 'transparent',  # Sem preenchimento
-                    'color': '#888888',          # Cor cinza para as bordas
-                    'weight': 1,                 # Espessura fina
-                    'fillOpacity': 0,
-                }
-            ).add_to(mapa)
-
-            # Camada 2: Mapa de Calor (VISUAL)
-            if len(simulacoes_ativas) > 0:
-                simulacao = simulacoes_ativas[-1]
+            # --- CAMADA ÚNICA (TopoJSON): bordas, mapa de calor, destaque e interação nas mesmas regiões ---
+            # Todas as camadas (métricas) e classes vão juntas; camada e cores são trocadas no navegador
+            simulacao = simulacoes_ativas[-1] if len(simulacoes_ativas) > 0 else None
 
-                # Usar dados agregados se disponível, senão usar dados originais
-                if 'dados_agregados' in locals() and selected_column in dados_agregados.columns:
-                    map_data = dados_agregados[['regiao', selected_column]].copy()
-                    map_data['valor'] = map_data[selected_column]
-                else:
-                    resultados_df = simulacao['resultados']
-                    map_data = resultados_df.groupby('regiao').agg(
-                        valor=(selected_column, 'sum')
-                    ).reset_index()
-
-                # Calcular classes dinamicamente com cache básico
-                # Usar hash dos valores para evitar recálculos desnecessários
-                valores_hash = hash(tuple(sorted(map_data['valor'].values)))
-                cache_key = f"{selected_column}_{valores_hash}"
-
-                if f"bins_cache_{cache_key}" not in st.session_state:
-                    st.session_state[f"bins_cache_{cache_key}"] = calculate_enhanced_bins(map_data['valor'])
-
-                bins = st.session_state[f"bins_cache_{cache_key}"]
-                labels = [i for i in range(len(bins) - 1)]
-                map_data['classe'] = pd.cut(map_data['valor'], bins=bins, labels=labels, include_lowest=True, duplicates='drop')
-                map_data['classe'] = map_data['classe'].fillna(0).astype(int)
-
-                gdf_com_dados = gdf.merge(map_data, left_on='NM_RGINT', right_on='regiao', how='left').fillna(0)
-
-                # Sistema de cores otimizado para melhor contraste visual (7-8 classes)
-                color_schemes = {
-                    'Viridis (Verde-Azul)': ['#440154', '#414487', '#2a788e', '#22a884', '#7ad151', '#fde725', '#fcffa4'],
-                    'Plasma (Rosa-Amarelo)': ['#0d0887', '#5302a3', '#8b0aa5', '#b83289', '#db5c68', '#f48849', '#febd2a', '#f0f921'],
-                    'Inferno (Preto-Amarelo)': ['#000004', '#1b0c41', '#4a0c6b', '#781c6d', '#a52c60', '#cf4446', '#ed6925', '#fb9b06', '#fcffa4'],
-                    'Blues (Azul)': ['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', '#2171b5', '#08519c'],
-                    'Reds (Vermelho)': ['#fff5f0', '#fee0d2', '#fcbba1', '#fc9272', '#fb6a4a', '#ef3b2c', '#cb181d', '#99000d'],
-                    'YlOrRd (Amarelo-Vermelho)': ['#ffffcc', '#ffeda0', '#fed976', '#feb24c', '#fd8d3c', '#fc4e2a', '#e31a1c', '#b10026'],
-                    'Economic Impact': ['#f7f7f7', '#d9f0a3', '#addd8e', '#78c679', '#41ab5d', '#238443', '#005a32']  # Verde econômico
-                }
-                cores = color_schemes.get(color_scheme, color_schemes['Economic Impact'])
-                
-                # --- FUNÇÃO DE ESTILO OTIMIZADA PARA MELHOR CONTRASTE ---
-                def style_function_segura(feature):
-                    classe = feature['properties'].get('classe', 0)
-                    valor = feature['properties'].get('valor', 0)
-
-                    # Garante que a classe seja um inteiro e esteja dentro dos limites da lista de cores
-                    try:
-                        classe_segura = int(min(max(classe, 0), len(cores) - 1))
-                    except (ValueError, TypeError):
-                        classe_segura = 0
-
-                    # Opacidade dinâmica baseada no valor (mais impacto = mais opaco)
-                    opacity_base = 0.85  # Aumentado de 0.7 para melhor visibilidade
-                    if valor > 0:
-                        # Regiões com impacto têm opacidade plena
-                        fillOpacity = opacity_base
-                        weight = 0.5  # Borda sutil para definição
-                        color = '#ffffff'  # Borda branca sutil
-                    else:
-                        # Regiões sem impacto têm opacidade reduzida
-                        fillOpacity = 0.3
-                        weight = 0.2
-                        color = '#cccccc'
-
-                    return {
-                        'fillOpacity': fillOpacity,
-                        'weight': weight,
-                        'color': color,
-                        'fillColor': cores[classe_segura],
-                        'opacity': 0.8  # Opacidade da borda
-                    }
-                
-                # Desenha o mapa de calor usando GeoJson
-                folium.GeoJson(
-                    gdf_com_dados,
-                    name='Mapa de Calor',
-                    style_function=style_function_segura
-                ).add_to(mapa)
-
-                # --- LEGENDA HTML OTIMIZADA COM VALORES REAIS DOS BINS ---
-                if 'all_bins' in simulacao and selected_column in simulacao['all_bins']:
-                    bins = simulacao['all_bins'][selected_column]
-
-                    # Usar os valores reais dos bins calculados
-                    valores_bins = bins  # Estes são os valores reais, não interpolados
-                    valor_min = valores_bins[0]
-                    valor_max = valores_bins[-1]
-
-                    # Estatísticas da simulação
-                    df_simulacao = simulacao['resultados']
-                    valores_simulacao = df_simulacao[selected_column]
-                    regioes_zero = len(valores_simulacao[valores_simulacao == 0])
-                    regioes_impacto = len(valores_simulacao[valores_simulacao > 0])
-                    total_regioes = len(valores_simulacao)
-
-                    # Calcular percentis para contexto adicional
-                    if len(valores_simulacao[valores_simulacao > 0]) > 0:
-                        p25 = valores_simulacao.quantile(0.25)
-                        p50 = valores_simulacao.quantile(0.50)
-                        p75 = valores_simulacao.quantile(0.75)
-                        p95 = valores_simulacao.quantile(0.95)
-                    else:
-                        p25 = p50 = p75 = p95 = 0
-
-                    titulo_legenda = {
-                        'impacto_producao': 'Impacto na Produção (R$)',
-                        'impacto_vab': 'Impacto no VAB/PIB (R$)',
-                        'impacto_empregos': 'Empregos Gerados',
-                        'impacto_impostos': 'Impostos Gerados (R$)'
-                    }
-
-                    # Formatação otimizada de valores
-                    def formatar_valor(valor, column):
-                        if column == 'impacto_empregos':
-                            if valor >= 1000000:
-                                return f"{valor/1000000:.1f}M"
-                            elif valor >= 1000:
-                                return f"{valor/1000:.0f}k"
-                            else:
-                                return f"{valor:,.0f}"
-                        else:  # Valores monetários
-                            if valor >= 1000000:
-                                return f"R$ {valor/1000000:.1f}B"
-                            elif valor >= 1000:
-                                return f"R$ {valor/1000:.0f}M"
-                            else:
-                                return f"R$ {valor:,.0f}"
-
-                    # Criar gradiente CSS com as cores do esquema
-                    cores_gradiente = ', '.join(cores)
-
-                    # Usar os valores reais dos bins como pontos de referência
-                    pontos_referencia = valores_bins[::max(1, len(valores_bins)//6)][:6]  # Pegar até 6 pontos bem distribuídos
-                    if len(pontos_referencia) < 6:
-                        pontos_referencia.extend([valor_max] * (6 - len(pontos_referencia)))
-
-                    legend_html = f'''
-                    <div style="position: fixed;
-                    bottom: 30px; left: 30px; width: 280px;
-                    border: 2px solid #333; z-index: 9999; font-size: 13px;
-                    background-color: rgba(255, 255, 255, 0.95);
-                    padding: 15px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;">
-
-                    <div style="margin-bottom: 12px;">
-                        <strong style="color: #333; font-size: 14px;">{titulo_legenda.get(selected_column, layer_choice)}</strong>
-                    </div>
+            posicao_ativa = None
+            if st.session_state.regiao_ativa:
+                posicao_ativa = localizar_regiao(
+                    gdf, st.session_state.codigo_regiao_ativa
+                    if st.session_state.codigo_regiao_ativa is not None else st.session_state.regiao_ativa
+                )
 
-                    <!-- Barra de Gradiente Contínua -->
-                    <div style="position: relative; margin: 10px 0;">
-                        <div style="height: 20px; width: 100%;
-                        background: linear-gradient(to right, {cores_gradiente});
-                        border: 1px solid #666; border-radius: 3px;
-                        cursor: help;"
-                        title="Gradiente de impacto: {formatar_valor(valor_min, selected_column)} até {formatar_valor(valor_max, selected_column)}">
-                        </div>
-
-                        <!-- Escala de Valores -->
-                        <div style="position: relative; margin-top: 5px; height: 40px;">
-                            <span style="position: absolute; left: 0%; transform: translateX(-50%);
-                            font-size: 11px; color: #555;">{formatar_valor(valor_min, selected_column)}</span>
-
-                            <span style="position: absolute; left: 20%; transform: translateX(-50%);
-                            font-size: 11px; color: #555;"
-                            title="{formatar_valor(pontos_referencia[1], selected_column)}">{formatar_valor(pontos_referencia[1], selected_column)}</span>
-
-                            <span style="position: absolute; left: 50%; transform: translateX(-50%);
-                            font-size: 11px; color: #555;"
-                            title="Valor médio: {formatar_valor(pontos_referencia[2], selected_column)}">{formatar_valor(pontos_referencia[2], selected_column)}</span>
-
-                            <span style="position: absolute; left: 80%; transform: translateX(-50%);
-                            font-size: 11px; color: #555;"
-                            title="{formatar_valor(pontos_referencia[4], selected_column)}">{formatar_valor(pontos_referencia[4], selected_column)}</span>
-
-                            <span style="position: absolute; right: 0%; transform: translateX(50%);
-                            font-size: 11px; color: #555;">{formatar_valor(valor_max, selected_column)}</span>
-                        </div>
-                    </div>
+            vista = st.session_state.get('vista_mapa')
 
-                    <!-- Indicadores de Impacto Zero -->
-                    <div style="margin-top: 15px; padding-top: 10px; border-top: 1px solid #ddd;">
-                        <div style="display: flex; align-items: center; margin-bottom: 5px;">
-                            <span style="width: 12px; height: 12px; border: 2px solid #999;
-                            border-radius: 50%; background: #f5f5f5; margin-right: 8px;"
-                            title="Regiões sem impacto econômico"></span>
-                            <span style="font-size: 12px; color: #666;">Sem Impacto: {regioes_zero} regiões</span>
-                        </div>
-
-                        <div style="font-size: 11px; color: #888; margin-top: 8px;"
-                        title="Distribuição de impactos: {regioes_impacto} regiões afetadas de {total_regioes} total">
-                            📊 Impacto: {regioes_impacto}/{total_regioes} regiões ({(regioes_impacto/total_regioes*100):.1f}%)
-                        </div>
-
-                        <div style="font-size: 10px; color: #aaa; margin-top: 5px; font-style: italic;"
-                        title="Modelo baseado em matriz Leontief 4x4 com efeitos gravitacionais">
-                            💡 Hover para detalhes por região
-                        </div>
-                    </div>
+            # Campos e aliases do tooltip
+            # (o código IBGE vai por último: é a linha lida pelo processamento do clique)
+            if simulacao is not None and show_percentages:
+                tooltip_fields = ['NM_RGINT'] + [f'pct_{setor}' for setor in setores] + ['codigo_regiao']
+                tooltip_aliases = ['Região:'] + [f'{metadados_setores[setor]["emoji"]} {setor}:' for setor in setores] + ['Código IBGE:']
+                tooltip_opcoes = {'labels': True, 'sticky': True, 'style': "font-size: 12px; font-family: Arial;"}
+            else:
+                tooltip_fields = ['NM_RGINT', 'codigo_regiao']
+                tooltip_aliases = ['Região Imediata:', 'Código IBGE:']
+                tooltip_opcoes = {}
+
+            if metadados_tiles is not None:
+                # --- TILES VETORIAIS: o navegador busca só os tiles visíveis e junta os valores pelo código ---
+                camada_regioes = CamadaTilesVetoriais(
+                    URL_TILES,
+                    preparar_propriedades_tiles(gdf, simulacao, show_percentages, posicao_ativa),
+                    tooltip_fields, tooltip_aliases,
+                    zoom_minimo=metadados_tiles.get('minzoom', 3),
+                    zoom_maximo=metadados_tiles.get('maxzoom', 10),
+                )
+                mapa.add_child(camada_regioes)
+            else:
+                # Recorte pela área visível (bounds/zoom da última interação com o mapa)
+                posicoes_visiveis = atualizar_recorte_mapa(vista, carregar_limites_regioes(gdf))
 
-                    </div>
-                    '''
-                    mapa.get_root().html.add_child(folium.Element(legend_html))
+                # Nível de detalhe da geometria pelo zoom: leve na visão nacional, nítido de perto
+                topojson_nivel = carregar_topojson_nivel(gdf, nivel_para_zoom(vista['zoom'] if vista else 4))
 
-            # Camada 3: Destaque da Região Selecionada (VISUAL)
-            if st.session_state.regiao_ativa:
-                folium.GeoJson(
-                    gdf[gdf['NM_RGINT'] == st.session_state.regiao_ativa],
-                    name='Região Selecionada',
-                    style_function=lambda x: {
-                        'fillColor': '#3b82f6',  # Preenchimento azul
-                        'color': '#1d4ed8',      # Borda azul escura
-                        'weight': 3,             # Borda mais espessa
-                        'fillOpacity': 0.3       # Semi-transparente
-                    }
-                ).add_to(mapa)
-
-            # Camada 4: Camada de Captura de Cliques (FUNCIONAL)
-            # Fica por cima de tudo, é invisível e só serve para capturar o tooltip
-            if show_percentages and len(simulacoes_ativas) > 0:
-                # Preparar dados com percentuais para tooltip melhorado
-                simulacao_ativa = simulacoes_ativas[-1]
-                resultados_df = simulacao_ativa['resultados']
-                regiao_origem = simulacao_ativa['regiao']
-                setor_origem = simulacao_ativa['setor']
-
-                gdf_com_tooltips = preparar_dados_tooltip_com_percentuais(
-                    gdf, resultados_df, regiao_origem, setor_origem
+                camada = preparar_camada_mapa(
+                    gdf, topojson_nivel, simulacao, show_percentages, posicao_ativa, posicoes_visiveis
                 )
 
-                # Campos e aliases para tooltip com percentuais
-                tooltip_fields = ['NM_RGINT'] + [f'pct_{setor}' for setor in setores]
-                tooltip_aliases = ['Região:'] + [f'{metadados_setores[setor]["emoji"]} {setor}:' for setor in setores]
-
-                # Criar tooltip customizado com percentuais
-                folium.GeoJson(
-                    gdf_com_tooltips,
-                    name='Camada de Interação',
-                    style_function=lambda x: {'fillOpacity': 0, 'weight': 0},
-                    tooltip=folium.GeoJsonTooltip(
-                        fields=tooltip_fields,
-                        aliases=tooltip_aliases,
-                        labels=True,
-                        sticky=True,
-                        style="font-size: 12px; font-family: Arial;"
-                    )
-                ).add_to(mapa)
+                # Com o recorte ativo, um contorno nacional leve mantém o contexto fora da área enviada
+                if posicoes_visiveis is not None:
+                    folium.GeoJson(
+                        carregar_fundo_nacional(gdf),
+                        name='Contorno Nacional',
+                        style_function=lambda x: {
+                            'fillColor': 'transparent',
+                            'color': '#888888',
+                            'weight': 1,
+                            'fillOpacity': 0,
+                        }
+                    ).add_to(mapa)
+
+                tooltip = folium.GeoJsonTooltip(fields=tooltip_fields, aliases=tooltip_aliases, **tooltip_opcoes)
+
+                # Sem style_function: o estilo é aplicado pelo controle de camadas (JS no navegador)
+                camada_regioes = folium.TopoJson(
+                    camada, object_path=f'objects.{OBJETO_TOPOJSON}', name='Regiões', tooltip=tooltip
+                )
+                camada_regioes.add_to(mapa)
+            mapa.add_child(ControleCamadasMapa(camada_regioes))
+
+            # --- LEGENDAS HTML COM VALORES REAIS DOS BINS (uma por camada, exibida pelo controle) ---
+            if simulacao is not None and simulacao.get('all_bins'):
+                df_simulacao = simulacao['resultados']
+                cores_padrao = ESQUEMAS_CORES['Economic Impact']
+                for titulo, coluna in CAMADAS_MAPA.items():
+                    if coluna in simulacao['all_bins']:
+                        legend_html = montar_legenda_mapa(
+                            df_simulacao, simulacao['all_bins'][coluna], coluna, titulo, cores_padrao
+                        )
+                        mapa.get_root().html.add_child(folium.Element(legend_html))
+
+            # Cada objeto devolvido pelo st_folium refaz o script quando muda: com tiles basta o clique.
+            # Com o TopoJSON o zoom escolhe o nível da pirâmide e liga o recorte; área visível e centro
+            # só são pedidos com o recorte ativo, para arrastar o mapa de longe não gerar reruns
+            if metadados_tiles is not None:
+                objetos_retornados = ["last_clicked"]
             else:
-                # Tooltip simples sem percentuais
-                folium.GeoJson(
-                    gdf,
-                    name='Camada de Interação',
-                    style_function=lambda x: {'fillOpacity': 0, 'weight': 0},
-                    tooltip=folium.GeoJsonTooltip(fields=['NM_RGINT'], aliases=['Região Imediata:'])
-                ).add_to(mapa)
+                objetos_retornados = ["last_object_clicked_tooltip", "zoom"]
+                if vista and (vista.get('zoom') or 0) >= ZOOM_MINIMO_RECORTE:
+                    objetos_retornados += ["bounds", "center"]
 
+            # Centro e zoom vão como argumentos do componente (o HTML do mapa não muda ao navegar)
             map_data = st_folium(
                 mapa,
                 width='stretch',
                 height=600,
-                returned_objects=["last_object_clicked_tooltip"], # Pedimos apenas o tooltip
+                center=vista.get('center') if vista else None,
+                zoom=vista['zoom'] if vista else None,
+                returned_objects=objetos_retornados,
                 key="main_map"
             )
 
+            # Guarda a vista para o recorte do próximo rerun (sem centro novo, mantém o anterior)
+            if map_data and map_data.get('zoom') is not None:
+                centro = map_data.get('center') or {}
+                st.session_state.vista_mapa = {
+                    'bounds': map_data.get('bounds'),
+                    'zoom': map_data['zoom'],
+                    'center': [centro['lat'], centro['lng']] if 'lat' in centro and 'lng' in centro
+                              else (vista or {}).get('center'),
+                }
+
             # --- PROCESSAMENTO DO CLIQUE (LÓGICA CORRIGIDA) ---
-            if map_data and map_data.get('last_object_clicked_tooltip'):
+            posicao_clicada = None
+            if metadados_tiles is not None:
+                # Tiles vetoriais não passam pelo tooltip do st_folium: a região vem do ponto clicado
+                clique = map_data.get('last_clicked') if map_data else None
+                if clique:
+                    posicao_clicada = localizar_regiao_no_ponto(
+                        gdf, carregar_limites_regioes(gdf), clique['lat'], clique['lng']
+                    )
+            elif map_data and map_data.get('last_object_clicked_tooltip'):
                 tooltip_text = map_data['last_object_clicked_tooltip']
                 
-                # PARSER ROBUSTO: Pega a última linha não vazia do tooltip e remove espaços
+                # PARSER ROBUSTO: Pega a última linha não vazia do tooltip (o código IBGE) e remove espaços
                 try:
-                    nova_regiao = [line.strip() for line in tooltip_text.split('\n') if line.strip()][-1]
+                    ultima_linha = [line.strip() for line in tooltip_text.split('\n') if line.strip()][-1]
                 except (IndexError, AttributeError):
-                    nova_regiao = None
+                    ultima_linha = None
+
+                # Resolve código -> região pelo gdf (nomes duplicados ficam sem ambiguidade)
+                posicao_clicada = localizar_regiao(gdf, ultima_linha) if ultima_linha else None
+
+            if posicao_clicada is not None:
+                nova_regiao = gdf['NM_RGINT'].iloc[posicao_clicada]
+                novo_codigo = int(gdf['codigo_regiao'].iloc[posicao_clicada])
 
                 # LÓGICA DE ATUALIZAÇÃO DE ESTADO
-                if nova_regiao and nova_regiao != st.session_state.regiao_ativa:
+                if novo_codigo != st.session_state.codigo_regiao_ativa:
                     st.session_state.regiao_ativa = nova_regiao
+                    st.session_state.codigo_regiao_ativa = novo_codigo
                     st.success(f"✅ Região selecionada: **{nova_regiao}**. Controles habilitados.")
                     st.rerun()
 
@@ -3108,8 +2948,9 @@ def simulacao_principal_tab(gdf, df_economia):
         # Perfil compacto da região selecionada
         if st.session_state.regiao_ativa is not None:
             with st.expander(f"📍 Perfil da Região: {st.session_state.regiao_ativa}", expanded=True):
-                regiao_normalizada = normalizar_string(st.session_state.regiao_ativa)
-                dados_regiao = df_economia[df_economia['regiao'] == regiao_normalizada]
+                dados_regiao = dados_da_regiao(
+                    df_economia, st.session_state.regiao_ativa, st.session_state.get('codigo_regiao_ativa')
+                )
                 
                 # Usando st.columns para garantir o layout correto
                 col1, col2, col3 = st.columns(3)
@@ -3133,7 +2974,7 @@ def simulacao_principal_tab(gdf, df_economia):
     # ==============================================================================
     with col_resultados:
         if st.session_state.simulacoes:
-            criar_painel_resultados_aprimorado(st.session_state.simulacoes[-1])
+            criar_painel_resultados_aprimorado(st.session_state.simulacoes[-1], df_economia, gdf)
         else:
             st.markdown("""
             <div style="text-align: center; padding: 2rem 0;">
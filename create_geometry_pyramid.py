@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Gera a pirâmide de níveis de detalhe das geometrias das 510 regiões imediatas.
+Cada nível é simplificado pelos arcos compartilhados (fronteiras vizinhas continuam
+encaixadas) e o mapa escolhe o nível de acordo com o zoom. Cada nível também é gravado
+em TopoJSON (arcos compartilhados, coordenadas quantizadas), que é o que o mapa envia.
+Os caminhos de entrada e saída vêm de `simulador.dados`, relativos à raiz do repositório,
+então o script pode ser executado de qualquer diretório de trabalho.
+"""
+
+import json
+import os
+import time
+
+from simulador.dados import caminho_nivel_piramide, caminho_topojson_nivel, carregar_dados_geograficos
+from simulador.topologia import NIVEIS_PIRAMIDE, extrair_topologia, geometrias_para_topojson, simplificar_com_topologia
+
+def contar_vertices(geometrias):
+    """Total de vértices (exteriores e furos) de uma sequência de (Multi)Polygons."""
+    total = 0
+    for geometria in geometrias:
+        poligonos = geometria.geoms if geometria.geom_type == 'MultiPolygon' else [geometria]
+        for poligono in poligonos:
+            total += len(poligono.exterior.coords) + sum(len(furo.coords) for furo in poligono.interiors)
+    return total
+
+def criar_piramide_geometrias():
+    """Grava um parquet e um TopoJSON por nível da pirâmide, na mesma ordem (e com os mesmos códigos) do app."""
+
+    print("🗺️ Gerando a pirâmide de geometrias...")
+    inicio = time.time()
+
+    try:
+        gdf = carregar_dados_geograficos()
+        if gdf is None:
+            print("❌ Erro: geometrias das regiões não encontradas")
+            return False
+        print(f"   Regiões carregadas: {len(gdf)}")
+        print(f"   Vértices originais: {contar_vertices(gdf.geometry):,}")
+
+        print("🔗 Extraindo os arcos compartilhados...")
+        geometrias = list(gdf.geometry)
+        topologia = extrair_topologia(geometrias)
+        print(f"   Arcos: {len(topologia['arcos']):,}")
+
+        for nivel, (tolerancia, zoom_maximo) in enumerate(NIVEIS_PIRAMIDE):
+            gdf_nivel = gdf[['NM_RGINT', 'codigo_regiao', 'geometry']].copy()
+            gdf_nivel['geometry'] = simplificar_com_topologia(geometrias, tolerancia, topologia)
+
+            caminho_parquet = caminho_nivel_piramide(nivel)
+            gdf_nivel.to_parquet(caminho_parquet, compression='snappy', index=False)
+
+            # TopoJSON do nível, com o código IBGE como id (as propriedades entram no app)
+            topojson = geometrias_para_topojson(list(gdf_nivel.geometry), ids=gdf_nivel['codigo_regiao'].astype(int).tolist())
+            caminho_topojson = caminho_topojson_nivel(nivel)
+            with open(caminho_topojson, 'w', encoding='utf-8') as f:
+                json.dump(topojson, f, separators=(',', ':'))
+
+            faixa_zoom = f"zoom <= {zoom_maximo}" if zoom_maximo is not None else "zoom maior"
+            print(f"   Nível {nivel} (tolerância {tolerancia}, {faixa_zoom}): "
+                  f"{contar_vertices(gdf_nivel.geometry):,} vértices, "
+                  f"{os.path.getsize(caminho_parquet) / (1024 * 1024):.2f} MB, "
+                  f"válidas: {gdf_nivel.geometry.is_valid.all()}")
+            print(f"      GeoJSON {len(gdf_nivel[['geometry']].to_json()) / 1024:,.0f} KB -> "
+                  f"TopoJSON {os.path.getsize(caminho_topojson) / 1024:,.0f} KB "
+                  f"({len(topojson['arcs']):,} arcos)")
+
+        print(f"✅ Pirâmide concluída em {time.time() - inicio:.2f} segundos")
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro ao gerar a pirâmide: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    criar_piramide_geometrias()
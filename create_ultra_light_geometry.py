@@ -1,109 +1,184 @@
 #!/usr/bin/env python3
 """
-Ultra-aggressive geometry optimization for maximum performance
-Target: < 5MB final size with immediate loading
+Otimização agressiva das geometrias para carregamento imediato.
+Meta: menos de 5 MB no total. Os caminhos partem da pasta deste script, então ele pode ser
+executado de qualquer diretório de trabalho.
 """
 
 import geopandas as gpd
-import pandas as pd
+import numpy as np
+import shapely
+import argparse
 import json
+import math
 import time
 import os
-
-def create_ultra_light_geometries():
-    """Create ultra-lightweight geometries for instant loading"""
-
-    print("Creating ULTRA-LIGHT geometries for instant loading...")
-    start_time = time.time()
+from pathlib import Path
+
+from simulador.topologia import geometrias_para_topojson
+
+# Pasta do script (raiz do repositório): os caminhos não dependem do diretório de trabalho
+DIRETORIO_BASE = Path(__file__).resolve().parent
+PASTA_SHAPEFILES = DIRETORIO_BASE / 'shapefiles'
+
+# Grade (graus) da etapa de quantização: 1e-4 grau são ~11 m, menos de um pixel nos zooms regionais
+GRADE_QUANTIZACAO = 1e-4
+
+def casas_decimais_grade(grade):
+    """Casas decimais necessárias para gravar coordenadas alinhadas à grade."""
+    return max(0, math.ceil(-math.log10(grade)))
+
+def tamanhos_geometrias(geometrias):
+    """Número de vértices, bytes em WKB (o que o parquet guarda) e bytes em GeoJSON de uma coluna de geometrias."""
+    geometrias = np.asarray(geometrias)
+    return {
+        'vertices': int(shapely.get_num_coordinates(geometrias).sum()),
+        'wkb': int(sum(len(wkb) for wkb in shapely.to_wkb(geometrias))),
+        'geojson': len(gpd.GeoSeries(geometrias).to_json().encode('utf-8')),
+    }
+
+def quantizar_geometrias(geometrias, grade=GRADE_QUANTIZACAO):
+    """
+    Alinha as coordenadas a uma grade regular, descartando os vértices duplicados que isso cria
+    e mantendo o resultado válido (modelo de precisão do GEOS). Polígonos que colapsam são
+    reparados com make_valid no modo 'structure', que devolve só partes poligonais (o modo
+    padrão pode gerar GeometryCollection com linhas e pontos soltos). As coordenadas são então arredondadas às casas da grade, para serem
+    gravadas como os decimais mais curtos (o GEOS deixa valores como 0.30000000000000004).
+    """
+    quantizadas = shapely.set_precision(np.asarray(geometrias), grid_size=grade)
+    invalidas = ~shapely.is_valid(quantizadas)
+    if invalidas.any():
+        quantizadas[invalidas] = shapely.make_valid(quantizadas[invalidas], method='structure', keep_collapsed=False)
+    casas = casas_decimais_grade(grade)
+    return shapely.transform(quantizadas, lambda coordenadas: np.round(coordenadas, casas))
+
+def create_ultra_light_geometries(grade=GRADE_QUANTIZACAO):
+    """Cria geometrias ultraleves para carregamento imediato."""
+
+    print("🚀 Criando geometrias ULTRALEVES para carregamento imediato...")
+    inicio = time.time()
 
     try:
-        # Load optimized parquet
-        print("Loading optimized parquet...")
-        gdf = gpd.read_parquet('shapefiles/BR_RG_Imediatas_2024_optimized.parquet')
-        print(f"   Loaded {len(gdf)} regions")
+        # Parquet otimizado
+        print("📂 Carregando o parquet otimizado...")
+        gdf = gpd.read_parquet(PASTA_SHAPEFILES / 'BR_RG_Imediatas_2024_optimized.parquet')
+        print(f"   Regiões carregadas: {len(gdf)}")
 
-        # Aggregate by intermediate region
-        print("Aggregating by intermediate region...")
+        # Agregação por região intermediária
+        print("🔗 Agregando por região intermediária...")
         gdf_regioes = gdf.dissolve(by='NM_RGINT').reset_index()
-        print(f"   {len(gdf_regioes)} intermediate regions")
+        print(f"   Regiões intermediárias: {len(gdf_regioes)}")
+
+        # Simplificação EXTREMA: velocidade antes de precisão
+        print("✂️ Aplicando simplificação extrema das geometrias...")
 
-        # EXTREME simplification - prioritize speed over precision
-        print("Applying EXTREME geometry simplification...")
+        tamanhos_etapas = {'agregada': tamanhos_geometrias(gdf_regioes.geometry)}
 
-        # Stage 1: Ultra-aggressive simplification (tolerance = 0.02 - very aggressive)
+        # Etapa 1: simplificação bem agressiva (tolerância 0.02)
         gdf_ultra = gdf_regioes.copy()
         gdf_ultra['geometry'] = gdf_ultra.geometry.simplify(tolerance=0.02, preserve_topology=True)
+        tamanhos_etapas['simplificada'] = tamanhos_geometrias(gdf_ultra.geometry)
 
-        # Stage 2: Further reduce precision by rounding coordinates
-        print("Reducing coordinate precision...")
-        gdf_ultra['geometry'] = gdf_ultra.geometry.apply(
-            lambda geom: geom if geom.is_empty else geom
-        )
+        # Etapa 2: menos precisão, alinhando as coordenadas à grade
+        print(f"📐 Quantizando as coordenadas numa grade de {grade:g} grau...")
+        gdf_ultra['geometry'] = quantizar_geometrias(gdf_ultra.geometry, grade)
+        gdf_ultra = gdf_ultra[~gdf_ultra.geometry.is_empty]
+        tamanhos_etapas['quantizada'] = tamanhos_geometrias(gdf_ultra.geometry)
 
-        # Keep only essential columns
+        # Apenas as colunas essenciais
         gdf_final = gdf_ultra[['NM_RGINT', 'geometry']].copy()
 
-        # Clean region names
-        print("Cleaning region names...")
+        # Limpeza dos nomes das regiões
+        print("🧹 Limpando os nomes das regiões...")
         gdf_final['NM_RGINT'] = gdf_final['NM_RGINT'].astype(str)
         gdf_final['NM_RGINT'] = gdf_final['NM_RGINT'].str.strip()
 
-        # Add region codes for faster indexing
+        # Códigos das regiões para indexação rápida
         gdf_final['codigo'] = gdf_final.reset_index().index
 
-        # Save as ultra-compressed parquet
-        output_parquet = 'shapefiles/brasil_regions_ultra_light.parquet'
-        print(f"Saving ultra-light parquet to {output_parquet}...")
+        # Parquet ultracomprimido
+        saida_parquet = PASTA_SHAPEFILES / 'brasil_regions_ultra_light.parquet'
+        print(f"💾 Salvando o parquet ultraleve em {saida_parquet}...")
 
-        # Save with maximum compression
         gdf_final.to_parquet(
-            output_parquet,
-            compression='snappy',  # Fast decompression
+            saida_parquet,
+            compression='snappy',  # Descompressão rápida
             index=False
         )
 
-        # Also save as minimal GeoJSON for web compatibility
-        output_geojson = 'shapefiles/brasil_regions_ultra_light.geojson'
-        print(f"Saving minimal GeoJSON to {output_geojson}...")
+        # GeoJSON mínimo, para compatibilidade com a web
+        saida_geojson = PASTA_SHAPEFILES / 'brasil_regions_ultra_light.geojson'
+        print(f"💾 Salvando o GeoJSON mínimo em {saida_geojson}...")
 
+        # Só os dígitos que a grade mantém (o GDAL grava 15 dígitos significativos por padrão)
         gdf_final.to_file(
-            output_geojson,
+            saida_geojson,
             driver='GeoJSON',
-            write_crs=True
+            write_crs=True,
+            COORDINATE_PRECISION=casas_decimais_grade(grade)
         )
 
-        # Check file sizes
-        parquet_size = os.path.getsize(output_parquet) / (1024 * 1024)
-        geojson_size = os.path.getsize(output_geojson) / (1024 * 1024)
-
-        end_time = time.time()
-
-        print(f"\nULTRA-LIGHT OPTIMIZATION COMPLETE!")
-        print(f"   Time: {end_time - start_time:.2f} seconds")
-        print(f"   Parquet size: {parquet_size:.2f} MB")
-        print(f"   GeoJSON size: {geojson_size:.2f} MB")
-        print(f"   Regions: {len(gdf_final)}")
-
-        # Performance test
-        print(f"\nTesting loading performance...")
-        test_start = time.time()
-        test_gdf = gpd.read_parquet(output_parquet)
-        test_end = time.time()
-        print(f"   Parquet load time: {test_end - test_start:.3f} seconds")
-
-        # Verify data integrity
-        print(f"\nData integrity check...")
-        print(f"   Regions loaded: {len(test_gdf)}")
-        print(f"   Geometry valid: {test_gdf.geometry.is_valid.all()}")
-        print(f"   No empty geometries: {not test_gdf.geometry.is_empty.any()}")
+        # Cópia com topologia para o mapa web: fronteiras compartilhadas guardadas uma vez como
+        # arcos, com coordenadas quantizadas e codificadas por diferença
+        saida_topojson = PASTA_SHAPEFILES / 'brasil_regions_ultra_light.topojson'
+        print(f"💾 Salvando o TopoJSON em {saida_topojson}...")
+        topojson = geometrias_para_topojson(
+            list(gdf_final.geometry),
+            propriedades=gdf_final[['NM_RGINT', 'codigo']].to_dict('records'),
+            ids=gdf_final['codigo'].astype(int).tolist()
+        )
+        with open(saida_topojson, 'w', encoding='utf-8') as f:
+            json.dump(topojson, f, separators=(',', ':'), default=int)
+
+        # Tamanho dos arquivos
+        tamanho_parquet = os.path.getsize(saida_parquet) / (1024 * 1024)
+        tamanho_geojson = os.path.getsize(saida_geojson) / (1024 * 1024)
+        tamanho_topojson = os.path.getsize(saida_topojson) / (1024 * 1024)
+
+        fim = time.time()
+
+        print("\n✅ OTIMIZAÇÃO ULTRALEVE CONCLUÍDA!")
+        print(f"   Tempo: {fim - inicio:.2f} segundos")
+        print(f"   Parquet: {tamanho_parquet:.2f} MB")
+        print(f"   GeoJSON: {tamanho_geojson:.2f} MB")
+        print(f"   TopoJSON: {tamanho_topojson:.2f} MB ({len(topojson['arcs']):,} arcos compartilhados)")
+        print(f"   Regiões: {len(gdf_final)}")
+
+        # Bytes economizados em cada etapa
+        print("\n📊 Tamanho das geometrias por etapa:")
+        anterior = None
+        for etapa, tamanhos in tamanhos_etapas.items():
+            linha = (f"   {etapa:<12} {tamanhos['vertices']:>10,} vértices  "
+                     f"WKB {tamanhos['wkb'] / 1024:>9,.0f} KB  GeoJSON {tamanhos['geojson'] / 1024:>9,.0f} KB")
+            if anterior:
+                linha += (f"  (economia: WKB {(anterior['wkb'] - tamanhos['wkb']) / 1024:,.0f} KB, "
+                          f"GeoJSON {(anterior['geojson'] - tamanhos['geojson']) / 1024:,.0f} KB)")
+            print(linha)
+            anterior = tamanhos
+
+        # Teste de desempenho
+        print("\n⏱️ Testando o tempo de carregamento...")
+        inicio_teste = time.time()
+        gdf_teste = gpd.read_parquet(saida_parquet)
+        fim_teste = time.time()
+        print(f"   Carregamento do parquet: {fim_teste - inicio_teste:.3f} segundos")
+
+        # Integridade dos dados
+        print("\n🔍 Verificando a integridade dos dados...")
+        print(f"   Regiões carregadas: {len(gdf_teste)}")
+        print(f"   Geometrias válidas: {gdf_teste.geometry.is_valid.all()}")
+        print(f"   Sem geometrias vazias: {not gdf_teste.geometry.is_empty.any()}")
 
         return True
 
     except Exception as e:
-        print(f"ERROR in ultra-light optimization: {e}")
+        print(f"❌ Erro na otimização ultraleve: {e}")
         import traceback
         traceback.print_exc()
         return False
 
 if __name__ == "__main__":
-    create_ultra_light_geometries()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cria geometrias ultraleves das regiões")
+    parser.add_argument('--grade', type=float, default=GRADE_QUANTIZACAO,
+                        help=f"grade das coordenadas em graus para a quantização (padrão {GRADE_QUANTIZACAO:g})")
+    create_ultra_light_geometries(parser.parse_args().grade)
@@ -2,15 +2,20 @@
 """
 Shapefile to GeoParquet Converter
 Converts large shapefiles to optimized GeoParquet format for better performance and storage efficiency.
+Optionally also writes a TopoJSON copy (shared borders stored once as arcs, quantized and
+delta-encoded coordinates) with the encoder the web map uses (simulador.topologia).
 """
 
 import geopandas as gpd
-import pyarrow as pa
-import pyarrow.parquet as pq
+import json
 import os
+import sys
 import time
 from pathlib import Path
 
+# Repository root (parent of shapefiles/), so simulador imports when this script runs standalone
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
 
 def convert_shapefile_to_geoparquet(
     shapefile_path: str,
@@ -71,13 +76,6 @@ def convert_shapefile_to_geoparquet(
                         gdf[col] = gdf[col].astype('category')
                         print(f"  📋 Converted {col} to category (uniqueness: {unique_ratio:.2%})")
         
-        # Configure Parquet writing options
-        parquet_options = {
-            'compression': compression,
-            'row_group_size': row_group_size,
-            'use_dictionary': use_dictionary,
-        }
-        
         print(f"💾 Writing GeoParquet with {compression} compression...")
         print(f"⚙️  Row group size: {row_group_size}")
         
@@ -120,6 +118,49 @@ def convert_shapefile_to_geoparquet(
         raise
 
 
+def export_topojson(
+    gdf: gpd.GeoDataFrame,
+    output_path: str,
+    id_column: str = None,
+    tolerance: float = None
+):
+    """
+    Write a GeoDataFrame as TopoJSON using the shared-arc encoder of the web map.
+    
+    Args:
+        gdf (GeoDataFrame): Polygons to export (reprojected to EPSG:4326 if needed)
+        output_path (str): Path for the output TopoJSON file
+        id_column (str): Column used as the feature id (optional)
+        tolerance (float): Arc simplification tolerance in degrees (optional, no simplification by default)
+    
+    Returns:
+        dict: Export statistics (arcs, sizes)
+    """
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    from simulador.topologia import geometrias_para_topojson
+
+    print(f"🧩 Writing TopoJSON to {output_path}...")
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+
+    # Non-geometry columns as properties (to_json turns NumPy types into JSON types)
+    properties = json.loads(gdf.drop(columns=gdf.geometry.name).to_json(orient='records', force_ascii=False))
+    ids = gdf[id_column].tolist() if id_column else None
+    topojson = geometrias_para_topojson(list(gdf.geometry), propriedades=properties, ids=ids, tolerancia=tolerance)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(topojson, f, separators=(',', ':'), ensure_ascii=False, default=int)
+
+    stats = {
+        'arcs_count': len(topojson['arcs']),
+        'topojson_size_mb': os.path.getsize(output_path) / (1024 * 1024),
+        'geojson_size_mb': len(gdf.to_json().encode('utf-8')) / (1024 * 1024),
+    }
+    print(f"✅ TopoJSON written: {stats['arcs_count']:,} shared arcs, "
+          f"{stats['topojson_size_mb']:.2f} MB (GeoJSON would be {stats['geojson_size_mb']:.2f} MB)")
+    return stats
+
+
 def validate_geoparquet(parquet_path: str):
     """
     Validate the converted GeoParquet file by reading it back and checking basic properties.
@@ -156,6 +197,7 @@ if __name__ == "__main__":
     # Configuration
     INPUT_SHAPEFILE = "BR_RG_Imediatas_2024.shp"
     OUTPUT_GEOPARQUET = "BR_RG_Imediatas_2024.parquet"
+    OUTPUT_TOPOJSON = "BR_RG_Imediatas_2024.topojson"  # None to skip the TopoJSON copy
     
     # Compression options: 'snappy' (fast), 'gzip' (balanced), 'brotli' (best compression)
     COMPRESSION = "snappy"  # Good balance of speed and compression
@@ -178,11 +220,14 @@ if __name__ == "__main__":
             print(f"📁 Your optimized GeoParquet file is ready: {output_file}")
             
             # Print performance benefits
-            print(f"\n📈 Performance Benefits:")
+            print("\n📈 Performance Benefits:")
             print(f"   • File size reduced by {conversion_stats['compression_ratio_percent']:.1f}%")
-            print(f"   • Faster loading with columnar storage")
+            print("   • Faster loading with columnar storage")
             print(f"   • Better compression with {COMPRESSION} algorithm")
-            print(f"   • Optimized for analytical workloads")
+            print("   • Optimized for analytical workloads")
+            
+            if OUTPUT_TOPOJSON:
+                export_topojson(gpd.read_parquet(output_file), OUTPUT_TOPOJSON, id_column='CD_RGI')
             
         else:
             print("\n⚠️  Conversion completed but validation failed. Please check the output file.")
@@ -0,0 +1,80 @@
+"""
+Núcleo do Simulador Geo-Econômico, importável sem Streamlit.
+
+Reúne o modelo de Leontief, a distribuição espacial gravitacional, a classificação em
+faixas e o carregamento de dados. Pode ser usado por jobs em lote e scripts:
+
+    from simulador import carregar_dados_geograficos, carregar_dados_reais_ibge, executar_simulacao_avancada
+
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    resultados, impactos_nacionais, bins = executar_simulacao_avancada(
+        df_economia, gdf, 100.0, 'Indústria', 320007  # código de Campinas
+    )
+"""
+
+from .classificacao import calculate_enhanced_bins, calculate_log_bins, classificar_valores
+from .dados import (
+    anexar_codigos_economia,
+    anexar_codigos_regiao,
+    carregar_dados_geograficos,
+    carregar_dados_reais_ibge,
+    carregar_matriz_distancias,
+    carregar_piramide_geometrias,
+    carregar_topojson_nivel,
+    dados_da_regiao,
+    geometrias_no_nivel,
+)
+from .incerteza import simular_incerteza
+from .interregional import executar_simulacao_interregional, montar_modelo_interregional
+from .memo import MemoSimulacoes, executar_simulacao_memoizada, memo_simulacoes
+from .modelo import (
+    calcular_multiplicadores,
+    carregar_matriz_coeficientes,
+    coef_emprego_por_setor,
+    coef_impostos_sobre_vab,
+    coef_vab_por_setor,
+    fator_atrito,
+    metadados_setores,
+    parametros_modelo,
+    resolver_leontief,
+    setores,
+)
+from .regioes import (
+    calcular_distancias,
+    calcular_limites_regioes,
+    calcular_matriz_distancias,
+    localizar_regiao,
+    localizar_regiao_no_ponto,
+    normalizar_string,
+    regioes_no_recorte,
+)
+from .registro import IndiceResultados, RegistroSimulacao
+from .sensibilidade import varrer_fator_atrito
+from .simulacao import (
+    calcular_kernel_resposta,
+    calcular_percentuais_impacto,
+    executar_simulacao_avancada,
+    executar_simulacoes_em_lote,
+    finalizar_resultados,
+    obter_kernel_resposta,
+    reescalar_simulacao,
+)
+from .topologia import (
+    NIVEIS_PIRAMIDE,
+    codificar_topojson,
+    construir_piramide,
+    extrair_topologia,
+    geometrias_para_topojson,
+    montar_geometrias,
+    nivel_para_zoom,
+    recortar_topojson,
+    simplificar_com_topologia,
+)
+
+def __getattr__(nome):
+    # multiplicadores_producao / matriz_L / matriz_L_df são formados sob demanda pelo módulo do modelo
+    if nome in ('multiplicadores_producao', 'matriz_L', 'matriz_L_df'):
+        from . import modelo
+        return getattr(modelo, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -0,0 +1,78 @@
+"""
+Cliente de teste de carga para o serviço HTTP local (somente biblioteca padrão).
+
+Dispara requisições /simular concorrentes com origens e setores aleatórios e, opcionalmente,
+um lote /simular/lote, medindo latências (P50/P95/P99), vazão e o tempo até a primeira
+linha do NDJSON.
+"""
+
+import json
+import random
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .modelo import setores
+
+def _post(url, conteudo, timeout=120):
+    requisicao = urllib.request.Request(
+        url, data=json.dumps(conteudo).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    return urllib.request.urlopen(requisicao, timeout=timeout)
+
+def _codigos_regioes(url_base):
+    """Obtém códigos de região válidos a partir de uma simulação de referência."""
+    with _post(f"{url_base}/simular", {'regiao': 'Campinas', 'setor': setores[0], 'valor': 1}) as resposta:
+        return sorted(set(json.load(resposta)['codigo_regiao']))
+
+def _descrever_latencias(latencias):
+    latencias_ms = np.array(latencias) * 1000
+    p50, p95, p99 = np.percentile(latencias_ms, [50, 95, 99])
+    return f"P50 {p50:.1f} ms | P95 {p95:.1f} ms | P99 {p99:.1f} ms | máx {latencias_ms.max():.1f} ms"
+
+def executar_teste_carga(url_base='http://127.0.0.1:8765', requisicoes=200, concorrencia=8, tamanho_lote=0, semente=42):
+    """Executa o teste de carga e imprime o resumo; retorna as métricas em um dict."""
+    url_base = url_base.rstrip('/')
+    gerador = random.Random(semente)
+    codigos = _codigos_regioes(url_base)
+    choques = [
+        {'regiao': gerador.choice(codigos), 'setor': gerador.choice(setores), 'valor': round(gerador.uniform(1, 1000), 2)}
+        for _ in range(requisicoes)
+    ]
+
+    def simular(choque):
+        inicio = time.perf_counter()
+        with _post(f"{url_base}/simular", choque) as resposta:
+            resposta.read()
+        return time.perf_counter() - inicio
+
+    print(f"🔥 {requisicoes} requisições /simular com concorrência {concorrencia}...")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = list(executor.map(simular, choques))
+    duracao = time.perf_counter() - inicio
+    metricas = {'requisicoes': requisicoes, 'duracao_s': duracao, 'vazao_rps': requisicoes / duracao,
+                'latencias_s': latencias}
+    print(f"   {metricas['vazao_rps']:.1f} req/s | {_descrever_latencias(latencias)}")
+
+    if tamanho_lote > 0:
+        lote = [dict(choque, cenario_id=i) for i, choque in enumerate(choques[:1] * tamanho_lote)]
+        for i, choque in enumerate(lote):
+            choque['regiao'] = codigos[i % len(codigos)]
+        print(f"📦 Lote NDJSON com {tamanho_lote} cenários...")
+        inicio = time.perf_counter()
+        primeira_linha = None
+        linhas = 0
+        with _post(f"{url_base}/simular/lote", {'choques': lote}, timeout=600) as resposta:
+            for linha in resposta:
+                if primeira_linha is None:
+                    primeira_linha = time.perf_counter() - inicio
+                linhas += 1
+        duracao_lote = time.perf_counter() - inicio
+        metricas.update({'lote_cenarios': linhas, 'lote_duracao_s': duracao_lote, 'lote_primeira_linha_s': primeira_linha})
+        print(f"   {linhas} cenários em {duracao_lote:.2f}s ({linhas / duracao_lote:.1f} cenários/s), "
+              f"primeira linha em {primeira_linha * 1000:.0f} ms")
+
+    return metricas
@@ -0,0 +1,110 @@
+"""
+Classificação dos impactos em faixas (bins) para a visualização no mapa.
+"""
+
+import numpy as np
+
+def remover_limites_proximos(bins, tolerancia_relativa=1e-6):
+    """
+    Ordena os limites e remove os que diferem apenas por ruído de ponto flutuante
+    (ex.: máximo do quantil vs. máximo do logspace), que viravam classes vazias.
+    """
+    bins = np.unique(bins)
+    if len(bins) < 2:
+        return bins
+    distintos = np.diff(bins) > tolerancia_relativa * np.maximum(np.abs(bins[1:]), 1e-12)
+    return bins[np.concatenate([[True], distintos])]
+
+def calculate_enhanced_bins(series, num_classes=7):
+    """
+    Sistema de binning aprimorado para melhor visualização dos impactos econômicos.
+    Combina técnicas quantile e logarítmica para distribuição mais visual.
+    Aceita Series ou array; os cálculos são feitos em arrays NumPy.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    series = series[~np.isnan(series)]  # Como os métodos do pandas, ignora valores ausentes
+
+    # Handle edge cases
+    if len(series) == 0 or series.max() == series.min():
+        # Return simple bins for edge cases
+        return np.linspace(series.min() if len(series) > 0 else 0,
+                          series.max() if len(series) > 0 else 1,
+                          num=num_classes + 1).tolist()
+
+    # Detectar valores zero (sem impacto) separadamente
+    valores_zero = series[series == 0]
+    valores_positivos = series[series > 0]
+
+    # Se não há valores positivos, retornar bins simples
+    if len(valores_positivos) == 0:
+        return np.linspace(series.min(), series.max(), num=num_classes + 1).tolist()
+
+    # Usar quantile menos agressivo para capturar mais outliers relevantes
+    series_filtered = valores_positivos[valores_positivos < np.quantile(valores_positivos, 0.95)]
+
+    # Se ainda há dados suficientes, usar binning híbrido
+    if len(series_filtered) >= num_classes and len(np.unique(series_filtered)) >= num_classes:
+        # Combinar quantile e logarítmico para melhor distribuição
+        try:
+            # 60% dos bins baseados em quantiles (distribuição uniforme)
+            quantile_bins = int(num_classes * 0.6)
+            quantiles = np.linspace(0, 1, quantile_bins + 1)
+            quant_values = np.quantile(series_filtered, quantiles)
+
+            # 40% dos bins baseados em log (capturar variações pequenas). Sem piso fixo no
+            # mínimo (já positivo): as faixas escalam com os valores, como as dos quantis
+            log_bins = num_classes - quantile_bins
+            if log_bins > 0:
+                log_values = np.logspace(
+                    np.log10(series_filtered.min()),
+                    np.log10(series_filtered.max()),
+                    num=log_bins + 1
+                )
+                # Combinar e remover duplicatos
+                combined = np.concatenate([quant_values, log_values])
+                bins = remover_limites_proximos(combined)
+            else:
+                bins = quant_values
+
+        except (ValueError, Warning):
+            # Fallback para quantiles simples
+            bins = np.quantile(valores_positivos, np.linspace(0, 1, num_classes + 1))
+    else:
+        # Para poucos dados, usar distribuição linear
+        bins = np.linspace(valores_positivos.min(), valores_positivos.max(), num_classes + 1)
+
+    # Garantir que zero está incluído se existem valores zero
+    if len(valores_zero) > 0:
+        bins = np.insert(bins, 0, 0)
+
+    # Garantir que o valor máximo real está incluído
+    bins = np.append(bins, series.max())
+
+    # Remover duplicados e ordenar
+    bins = remover_limites_proximos(bins)
+
+    # CRITICAL: Ensure we have at least 2 bins for visualization
+    if len(bins) < 2:
+        bins = np.linspace(series.min(), series.max(), num=2)
+    elif len(bins) > num_classes + 2:  # Permitir +1 para zero e +1 para max
+        # Se há muitos bins, usar only the most important ones
+        bins = np.quantile(bins, np.linspace(0, 1, num_classes + 1))
+
+    return bins.tolist()
+
+def classificar_valores(valores, bins):
+    """
+    Classe (0, 1, ...) de cada valor nas faixas `bins`, como `pd.cut(..., include_lowest=True)`
+    seguido de `fillna(0)`: faixas fechadas à direita e valores fora dos limites na classe 0.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    bins = np.asarray(bins, dtype=np.float64)
+    classes = np.searchsorted(bins, valores, side='left') - 1
+    classes[valores == bins[0]] = 0
+    classes[(classes < 0) | (classes >= len(bins) - 1)] = 0
+    return classes.astype(np.int8)
+
+# Manter função original para compatibilidade
+def calculate_log_bins(series, num_classes=7):
+    """Wrapper para nova função com compatibilidade."""
+    return calculate_enhanced_bins(series, num_classes)
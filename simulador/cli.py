@@ -0,0 +1,146 @@
+"""
+Linha de comando do simulador.
+
+    python -m simulador lote cenarios.csv --saida resultados/ --workers 4 --retomar
+    python -m simulador servidor --porta 8765 --workers 4
+    python -m simulador carga --url http://127.0.0.1:8765 --requisicoes 500 --concorrencia 16
+    python -m simulador tiles --saida shapefiles/regioes_imediatas_510.mbtiles --zoom-max 10
+    python -m simulador servidor-tiles --acervo shapefiles/regioes_imediatas_510.mbtiles --porta 8766
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+def _comando_lote(args):
+    from .lote import executar_lote
+
+    inicio = time.perf_counter()
+    resumo = executar_lote(
+        args.cenarios,
+        args.saida,
+        workers=args.workers,
+        retomar=args.retomar,
+        tamanho_bloco=args.tamanho_bloco,
+        parametros_padrao={
+            'fator_atrito': args.fator_atrito,
+            'coef_impostos_sobre_vab': args.coef_impostos,
+        },
+    )
+    duracao = time.perf_counter() - inicio
+    print(f"✅ {resumo['gravados']} cenários gravados em {args.saida} "
+          f"({resumo['lidos']} lidos, {resumo['pulados']} já existentes) em {duracao:.1f}s")
+    if resumo['rejeitados']:
+        print(f"❌ {resumo['rejeitados']} cenários rejeitados por região de origem desconhecida "
+              f"(cenario_id: {', '.join(resumo['ids_rejeitados'][:20])}"
+              f"{', ...' if resumo['rejeitados'] > 20 else ''})", file=sys.stderr)
+        return 1
+    return 0
+
+def _comando_servidor(args):
+    from .servico import servir
+
+    servir(host=args.host, porta=args.porta, workers=args.workers, tamanho_bloco=args.tamanho_bloco)
+    return 0
+
+def _comando_carga(args):
+    from .carga import executar_teste_carga
+
+    executar_teste_carga(args.url, requisicoes=args.requisicoes, concorrencia=args.concorrencia,
+                         tamanho_lote=args.lote)
+    return 0
+
+def _comando_tiles(args):
+    from .dados import caminho_tiles_regioes, carregar_dados_geograficos
+    from .tiles import gravar_tiles
+
+    if args.geometrias:
+        import geopandas as gpd
+
+        gdf = gpd.read_parquet(args.geometrias) if args.geometrias.endswith('.parquet') else gpd.read_file(args.geometrias)
+    else:
+        gdf = carregar_dados_geograficos()
+        if gdf is None:
+            raise RuntimeError("Geometrias das regiões não encontradas")
+    faltando = [coluna for coluna in (args.coluna_codigo, args.coluna_nome) if coluna and coluna not in gdf.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes nas geometrias: {', '.join(faltando)}")
+
+    inicio = time.perf_counter()
+    resumo = gravar_tiles(
+        gdf, args.saida or caminho_tiles_regioes(),
+        coluna_codigo=args.coluna_codigo,
+        coluna_nome=args.coluna_nome,
+        zoom_minimo=args.zoom_min,
+        zoom_maximo=args.zoom_max,
+    )
+    duracao = time.perf_counter() - inicio
+    print(f"✅ {resumo['tiles']} tiles ({resumo['bytes'] / (1024 * 1024):.1f} MB comprimidos) de {len(gdf)} geometrias, "
+          f"zoom {args.zoom_min}-{args.zoom_max}, gravados em {resumo['destino']} em {duracao:.1f}s")
+    return 0
+
+def _comando_servidor_tiles(args):
+    from .dados import caminho_tiles_regioes
+    from .servico_tiles import PASTA_ESTATICOS, servir_tiles
+
+    servir_tiles(args.acervo or caminho_tiles_regioes(), host=args.host, porta=args.porta,
+                 pasta_estaticos=args.estaticos or PASTA_ESTATICOS)
+    return 0
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='python -m simulador', description='Simulador Geo-Econômico sem interface')
+    parser.add_argument('-v', '--verbose', action='store_true', help='mostra o progresso detalhado')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    lote = subparsers.add_parser('lote', help='executa um arquivo de cenários (CSV/JSONL) e grava em Parquet')
+    lote.add_argument('cenarios', help='arquivo CSV ou JSONL com colunas regiao, setor, valor [, cenario_id, fator_atrito, coef_impostos_sobre_vab]')
+    lote.add_argument('--saida', required=True, help='diretório do dataset Parquet particionado por setor do choque')
+    lote.add_argument('--workers', type=int, default=1, help='número de processos (padrão: 1)')
+    lote.add_argument('--retomar', action='store_true', help='pula cenários cujo cenario_id já está na saída')
+    lote.add_argument('--tamanho-bloco', type=int, default=256, help='cenários por bloco/arquivo (padrão: 256)')
+    lote.add_argument('--fator-atrito', type=float, help='fator de atrito padrão para cenários sem a coluna')
+    lote.add_argument('--coef-impostos', type=float, help='carga tributária sobre o VAB para cenários sem a coluna')
+    lote.set_defaults(funcao=_comando_lote)
+
+    servidor = subparsers.add_parser('servidor', help='inicia o serviço HTTP local (JSON e NDJSON)')
+    servidor.add_argument('--host', default='127.0.0.1', help='endereço de escuta (padrão: 127.0.0.1)')
+    servidor.add_argument('--porta', type=int, default=8765, help='porta (padrão: 8765)')
+    servidor.add_argument('--workers', type=int, default=4, help='simulações simultâneas (padrão: 4)')
+    servidor.add_argument('--tamanho-bloco', type=int, default=32, help='cenários por bloco nos lotes (padrão: 32)')
+    servidor.set_defaults(funcao=_comando_servidor)
+
+    carga = subparsers.add_parser('carga', help='teste de carga contra um serviço local')
+    carga.add_argument('--url', default='http://127.0.0.1:8765', help='endereço do serviço')
+    carga.add_argument('--requisicoes', type=int, default=200, help='número de requisições /simular')
+    carga.add_argument('--concorrencia', type=int, default=8, help='requisições simultâneas')
+    carga.add_argument('--lote', type=int, default=0, help='tamanho de um lote NDJSON adicional (0 = não envia)')
+    carga.set_defaults(funcao=_comando_carga)
+
+    tiles = subparsers.add_parser('tiles', help='gera os tiles vetoriais (MVT) das regiões em MBTiles ou pasta')
+    tiles.add_argument('--saida', help='arquivo .mbtiles ou pasta {z}/{x}/{y}.pbf (padrão: shapefiles/regioes_imediatas_510.mbtiles)')
+    tiles.add_argument('--geometrias', help='Parquet/GeoJSON com outras geometrias (padrão: as 510 regiões imediatas)')
+    tiles.add_argument('--coluna-codigo', default='codigo_regiao', help='coluna do código de junção (padrão: codigo_regiao)')
+    tiles.add_argument('--coluna-nome', default='NM_RGINT', help='coluna do nome (padrão: NM_RGINT)')
+    tiles.add_argument('--zoom-min', type=int, default=3, help='zoom mínimo (padrão: 3)')
+    tiles.add_argument('--zoom-max', type=int, default=10, help='zoom máximo; acima dele o mapa amplia os tiles (padrão: 10)')
+    tiles.set_defaults(funcao=_comando_tiles)
+
+    servidor_tiles = subparsers.add_parser('servidor-tiles', help='serve os tiles vetoriais localmente (offline)')
+    servidor_tiles.add_argument('--acervo', help='arquivo .mbtiles ou pasta gerados pelo comando tiles')
+    servidor_tiles.add_argument('--host', default='127.0.0.1', help='endereço de escuta (padrão: 127.0.0.1)')
+    servidor_tiles.add_argument('--porta', type=int, default=8766, help='porta (padrão: 8766)')
+    servidor_tiles.add_argument('--estaticos', help='pasta servida em /static (padrão: static/ na raiz do projeto)')
+    servidor_tiles.set_defaults(funcao=_comando_servidor_tiles)
+
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        return args.funcao(args)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,425 @@
+"""
+Carregamento das geometrias das 510 regiões imediatas e dos dados econômicos do IBGE.
+
+As funções não dependem do Streamlit: mensagens vão para o `logging` e o cache fica a
+cargo de quem chama (o app envolve os carregadores com `st.cache_data`/`st.cache_resource`).
+O geopandas só é importado quando as geometrias são de fato carregadas.
+"""
+
+import hashlib
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .modelo import setores
+from .regioes import (
+    aplicar_correcao_nomes,
+    calcular_centroides,
+    calcular_matriz_distancias,
+    corrigir_nomes_regioes,
+    normalizar_string,
+)
+from .topologia import NIVEIS_PIRAMIDE, OBJETO_TOPOJSON, geometrias_para_topojson
+
+logger = logging.getLogger(__name__)
+
+# Raiz do repositório: os caminhos dos dados não dependem do diretório de trabalho
+DIRETORIO_BASE = Path(__file__).resolve().parent.parent
+# Arquivos derivados, recalculáveis (matriz de distâncias, kernel de resposta); fora do Git
+DIRETORIO_CACHE = DIRETORIO_BASE / '.cache'
+
+def garantir_regioes_sao_paulo(df):
+    """Garante que todas as 11 regiões imediatas de São Paulo tenham dados econômicos."""
+    # Lista oficial das 11 regiões imediatas de São Paulo (IBGE 2017)
+    regioes_sp_oficiais = [
+        'São Paulo', 'Sorocaba', 'Bauru', 'Marília', 'Presidente Prudente',
+        'Araçatuba', 'São José do Rio Preto', 'Ribeirão Preto', 'Araraquara',
+        'Campinas', 'São José dos Campos'
+    ]
+
+    setores_oficiais = ['Agropecuária', 'Indústria', 'Construção', 'Serviços']
+    regioes_existentes = df['regiao'].unique().tolist()
+
+    # Identificar regiões ausentes
+    regioes_ausentes = [r for r in regioes_sp_oficiais if r not in regioes_existentes]
+
+    if regioes_ausentes:
+        logger.warning("Gerando dados sintéticos para %d regiões SP ausentes: %s", len(regioes_ausentes), regioes_ausentes)
+
+        # Usar dados de regiões similares como base
+        dados_base_sp = df[df['regiao'].isin(regioes_sp_oficiais)].copy()
+
+        if len(dados_base_sp) > 0:
+            # Calcular médias por setor para regiões SP existentes
+            medias_sp = dados_base_sp.groupby('setor').agg({
+                'vab': 'mean',
+                'empregos': 'mean',
+                'empresas': 'mean',
+                'share_nacional': 'mean'
+            }).reset_index()
+        else:
+            # Fallback: usar médias nacionais com ajuste para SP
+            medias_sp = df.groupby('setor').agg({
+                'vab': 'mean',
+                'empregos': 'mean',
+                'empresas': 'mean',
+                'share_nacional': 'mean'
+            }).reset_index()
+            # Ajustar para níveis típicos de SP (mais desenvolvido)
+            medias_sp['vab'] *= 1.3
+            medias_sp['empregos'] *= 1.2
+            medias_sp['empresas'] *= 1.4
+
+        # Gerar dados para regiões ausentes
+        dados_novos = []
+        np.random.seed(42)  # Consistência
+
+        for regiao in regioes_ausentes:
+            for _, setor_data in medias_sp.iterrows():
+                # Adicionar variação realística (±20%)
+                fator_variacao = np.random.uniform(0.8, 1.2)
+
+                dados_novos.append({
+                    'regiao': regiao,
+                    'setor': setor_data['setor'],
+                    'vab': setor_data['vab'] * fator_variacao,
+                    'empregos': setor_data['empregos'] * fator_variacao,
+                    'empresas': int(setor_data['empresas'] * fator_variacao),
+                    'share_nacional': setor_data['share_nacional'] * fator_variacao * 0.1  # Reduzir share para não inflacionar
+                })
+
+        # Adicionar novos dados ao DataFrame
+        df_novos = pd.DataFrame(dados_novos)
+        df = pd.concat([df, df_novos], ignore_index=True)
+
+        # Recalcular shares nacionais para manter consistência
+        df['share_nacional'] = df.groupby('setor')['vab'].transform(lambda x: x / x.sum())
+
+    return df
+
+def anexar_codigos_regiao(gdf):
+    """Anexa ao GeoDataFrame o código IBGE de cada região imediata (chave inteira estável)."""
+    # A lista corrigida tem códigos únicos (na versão ASCII, Itabaiana/Valença repetem o código)
+    df_codigos = pd.read_csv(DIRETORIO_BASE / 'regioes_oficiais_510_corrected.csv')
+
+    # Os parquets das 510 regiões seguem a mesma ordem da lista oficial de códigos
+    if len(df_codigos) == len(gdf) and df_codigos['codigo_regiao'].is_unique:
+        gdf['codigo_regiao'] = df_codigos['codigo_regiao'].astype(int).to_numpy()
+    else:
+        # Geometrias de fallback (outra divisão regional): usa a posição como código
+        gdf['codigo_regiao'] = np.arange(len(gdf))
+
+    return gdf
+
+def validar_setores_economia(df_economia):
+    """
+    Confere se os setores de df_economia são exatamente os da matriz de coeficientes em uso
+    (a 4×4 embutida ou a de `SIMULADOR_MATRIZ_A`). Sem isso, os setores sem par ficam com
+    código -1 e o efeito cascata deles some sem aviso. Levanta ValueError com as diferenças.
+    """
+    setores_dados = set(df_economia['setor'].astype(str).unique())
+    sem_dados = [setor for setor in setores if setor not in setores_dados]
+    sem_coluna = sorted(setores_dados - set(setores))
+    if sem_dados or sem_coluna:
+        partes = []
+        if sem_dados:
+            partes.append(f"setores da matriz sem dados econômicos: {', '.join(sem_dados)}")
+        if sem_coluna:
+            partes.append(f"setores dos dados ausentes da matriz: {', '.join(sem_coluna)}")
+        raise ValueError(
+            f"Os setores dos dados econômicos não correspondem aos da matriz de coeficientes "
+            f"({len(setores)} setores) - {'; '.join(partes)}. Com SIMULADOR_MATRIZ_A, use dados "
+            f"econômicos com os mesmos setores da matriz."
+        )
+
+def anexar_codigos_economia(df_economia, gdf):
+    """
+    Junta df_economia às geometrias uma única vez, pelo código IBGE da região.
+    Adiciona `idx_regiao` (posição no GeoDataFrame, -1 se sem geometria) e `codigo_regiao`,
+    as chaves de agregação e junção: nomes se repetem entre estados (Itabaiana PB/SE, Valença
+    BA/RJ), então `regiao` vira um categórico só de rótulo (nomes corrigidos, na ordem do
+    GeoDataFrame, seguidos dos sem geometria) e não deve ser usado em groupby. `setor` vira
+    categórico na ordem do modelo; os setores precisam ser os da matriz de coeficientes
+    (`validar_setores_economia`).
+    """
+    validar_setores_economia(df_economia)
+    nomes_gdf = gdf['NM_RGINT'].replace(corrigir_nomes_regioes()).apply(normalizar_string).to_numpy()
+
+    # Os dados vêm em blocos consecutivos por região, na ordem oficial dos códigos
+    inicio_bloco = (df_economia['regiao'] != df_economia['regiao'].shift()).to_numpy()
+    blocos = np.cumsum(inicio_bloco) - 1
+    nomes_blocos = df_economia['regiao'].to_numpy()[inicio_bloco]
+
+    if len(nomes_blocos) == len(nomes_gdf) and (nomes_blocos == nomes_gdf).all():
+        idx_regiao = blocos
+    else:
+        # Fallback: casamento por nome; o k-ésimo bloco de um nome repetido no GeoDataFrame
+        # vai para a k-ésima região com esse nome (os demais nomes casam em qualquer bloco)
+        ocorrencias_gdf = pd.Series(nomes_gdf).groupby(nomes_gdf).cumcount().to_numpy()
+        posicao_por_nome = pd.Series(np.arange(len(nomes_gdf)),
+                                     index=pd.MultiIndex.from_arrays([nomes_gdf, ocorrencias_gdf]))
+        repetido = pd.Series(nomes_blocos).isin(nomes_gdf[ocorrencias_gdf > 0]).to_numpy()
+        ocorrencias_blocos = np.where(repetido, pd.Series(nomes_blocos).groupby(nomes_blocos).cumcount(), 0)
+        posicao_blocos = posicao_por_nome.reindex(pd.MultiIndex.from_arrays([nomes_blocos, ocorrencias_blocos]))
+        idx_regiao = posicao_blocos.fillna(-1).astype(int).to_numpy()[blocos]
+
+    codigos_gdf = gdf['codigo_regiao'].to_numpy() if 'codigo_regiao' in gdf.columns else np.arange(len(gdf))
+    df_economia['idx_regiao'] = idx_regiao
+    df_economia['codigo_regiao'] = np.where(idx_regiao >= 0, codigos_gdf[np.maximum(idx_regiao, 0)], -1)
+
+    # Categóricos com códigos inteiros em vez de strings; os agregados usam idx_regiao/codigo_regiao
+    nomes_economia = pd.Index(df_economia['regiao'].astype(str).unique())
+    categorias_regiao = pd.Index(nomes_gdf).append(nomes_economia).unique()
+    df_economia['regiao'] = pd.Categorical(df_economia['regiao'].astype(str), categories=categorias_regiao)
+    df_economia['setor'] = pd.Categorical(df_economia['setor'].astype(str), categories=setores)
+
+    return df_economia
+
+def dados_da_regiao(df_economia, regiao, codigo_regiao=None):
+    """Filtra as linhas de df_economia de uma região, preferindo o código IBGE ao nome."""
+    if codigo_regiao is not None and 'codigo_regiao' in df_economia.columns:
+        return df_economia[df_economia['codigo_regiao'] == codigo_regiao]
+    return df_economia[df_economia['regiao'] == normalizar_string(regiao)]
+
+def carregar_dados_geograficos():
+    """Carrega geometrias otimizadas das 510 regiões imediatas com nomes ASCII-safe."""
+    import geopandas as gpd
+
+    try:
+        # Try ASCII shapefile first (for deployment)
+        try:
+            gdf = gpd.read_parquet(DIRETORIO_BASE / 'shapefiles/regioes_imediatas_510_ascii.parquet')
+            gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
+            return anexar_codigos_regiao(gdf)
+        except FileNotFoundError:
+            pass
+
+        # Fallback to original shapefile (for local development)
+        gdf = gpd.read_parquet(DIRETORIO_BASE / 'shapefiles/regioes_imediatas_510_optimized.parquet')
+        gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
+
+        # Note: Some regions have identical names in different states (e.g., Itabaiana, Valença)
+        # This is handled correctly by the economic data matching system using region codes
+
+        return anexar_codigos_regiao(gdf)
+    except FileNotFoundError:
+        try:
+            # Fallback para GeoJSON ultra-light
+            gdf = gpd.read_file(DIRETORIO_BASE / 'shapefiles/regioes_imediatas_510_ultra_light.geojson')
+            gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
+
+            # Duplicate region names are handled correctly by region codes
+            return anexar_codigos_regiao(gdf)
+        except Exception:
+            # Fallback para geometrias antigas (menor resolução)
+            try:
+                gdf = gpd.read_parquet(DIRETORIO_BASE / 'shapefiles/brasil_regions_ultra_light.parquet')
+                gdf['NM_RGINT'] = gdf['NM_RGINT'].astype(str).str.strip()
+                logger.warning("Usando shapefile antigo - pode não corresponder exatamente aos dados IBGE")
+                return anexar_codigos_regiao(gdf)
+            except Exception as e:
+                logger.error("Erro ao carregar dados geográficos: %s", e)
+                return None
+
+def caminho_nivel_piramide(nivel):
+    """Arquivo de um nível da pirâmide de geometrias (gerada por `create_geometry_pyramid.py`)."""
+    return DIRETORIO_BASE / f'shapefiles/regioes_imediatas_510_lod{nivel}.parquet'
+
+def carregar_piramide_geometrias(gdf):
+    """
+    Geometrias de cada nível da pirâmide (do mais simplificado ao mais detalhado), alinhadas às
+    linhas do GeoDataFrame. Lista vazia se a pirâmide não foi gerada ou não corresponde às regiões.
+    """
+    import geopandas as gpd
+
+    piramide = []
+    for nivel in range(len(NIVEIS_PIRAMIDE)):
+        try:
+            gdf_nivel = gpd.read_parquet(caminho_nivel_piramide(nivel))
+        except (FileNotFoundError, OSError):
+            return []
+        if len(gdf_nivel) != len(gdf) or (
+            'codigo_regiao' in gdf_nivel.columns
+            and not np.array_equal(gdf_nivel['codigo_regiao'].to_numpy(), gdf['codigo_regiao'].to_numpy())
+        ):
+            logger.warning("Pirâmide de geometrias não corresponde às regiões carregadas; usando a geometria original")
+            return []
+        piramide.append(gpd.GeoSeries(gdf_nivel.geometry.to_numpy(), index=gdf.index, crs=gdf.crs))
+    return piramide
+
+def geometrias_no_nivel(gdf, piramide, nivel):
+    """Nome, código e geometria das regiões no nível da pirâmide (a original, sem pirâmide)."""
+    gdf_nivel = gdf[['NM_RGINT', 'codigo_regiao', 'geometry']].copy()
+    if piramide:
+        gdf_nivel['geometry'] = piramide[min(nivel, len(piramide) - 1)]
+    return gdf_nivel
+
+def caminho_topojson_nivel(nivel):
+    """TopoJSON de um nível da pirâmide (gerado junto com o parquet por `create_geometry_pyramid.py`)."""
+    return DIRETORIO_BASE / f'shapefiles/regioes_imediatas_510_lod{nivel}.topojson'
+
+def carregar_topojson_nivel(gdf, piramide, nivel):
+    """
+    TopoJSON (arcos compartilhados, coordenadas quantizadas) das regiões no nível da pirâmide,
+    com o código IBGE como `id` de cada geometria, na ordem do GeoDataFrame. Usa o arquivo gerado
+    se ele corresponder às regiões; senão codifica a partir das geometrias do nível.
+    """
+    codigos = gdf['codigo_regiao'].astype(int).tolist()
+    caminho = caminho_topojson_nivel(nivel)
+    if piramide and caminho.exists():
+        try:
+            topojson = json.loads(caminho.read_text(encoding='utf-8'))
+            ids = [geometria.get('id') for geometria in topojson['objects'][OBJETO_TOPOJSON]['geometries']]
+            if ids == codigos:
+                return topojson
+            logger.warning("TopoJSON do nível %d não corresponde às regiões carregadas; recodificando", nivel)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Erro ao ler %s: %s", caminho, e)
+
+    return geometrias_para_topojson(list(geometrias_no_nivel(gdf, piramide, nivel).geometry), ids=codigos)
+
+def caminho_tiles_regioes():
+    """MBTiles com os tiles vetoriais das regiões (gerado por `python -m simulador tiles`)."""
+    return DIRETORIO_BASE / 'shapefiles/regioes_imediatas_510.mbtiles'
+
+def impressao_geometrias(gdf):
+    """Hash curto dos códigos e centroides das regiões, na ordem do GeoDataFrame."""
+    assinatura = hashlib.sha1()
+    codigos = gdf['codigo_regiao'].to_numpy(dtype=np.int64) if 'codigo_regiao' in gdf.columns else np.arange(len(gdf))
+    for parte in (codigos, calcular_centroides(gdf)):
+        assinatura.update(np.ascontiguousarray(parte).tobytes())
+    return assinatura.hexdigest()[:16]
+
+def carregar_matriz_distancias(gdf, caminho_matriz=None):
+    """
+    Carrega a matriz de distâncias pré-calculada (em `.cache/` por padrão). A impressão das
+    geometrias (códigos e centroides) fica num arquivo `.impressao` ao lado: se a matriz faltar
+    ou tiver sido calculada para outras geometrias, ou outra ordem, é recalculada e salva.
+    """
+    if caminho_matriz is None:
+        caminho_matriz = DIRETORIO_CACHE / 'regioes_distancias.npy'
+    caminho_matriz = Path(caminho_matriz)
+    caminho_impressao = caminho_matriz.with_suffix('.impressao')
+    impressao = impressao_geometrias(gdf)
+
+    try:
+        if caminho_impressao.read_text(encoding='utf-8').strip() == impressao:
+            matriz = np.load(caminho_matriz)
+            if matriz.shape == (len(gdf), len(gdf)):
+                return matriz
+    except (OSError, ValueError):
+        pass
+
+    matriz = calcular_matriz_distancias(gdf)
+    try:
+        caminho_matriz.parent.mkdir(parents=True, exist_ok=True)
+        # Nome temporário único: processos concorrentes não escrevem no mesmo arquivo
+        with tempfile.NamedTemporaryFile(dir=caminho_matriz.parent, suffix='.npy', delete=False) as temporario:
+            np.save(temporario, matriz)
+        Path(temporario.name).replace(caminho_matriz)
+        caminho_impressao.write_text(impressao, encoding='utf-8')
+    except OSError:
+        pass  # Ambiente somente leitura: mantém a matriz apenas em memória
+
+    return matriz
+
+def carregar_dados_reais_ibge(gdf):
+    """
+    Carrega dados econômicos reais do IBGE pré-processados para as regiões imediatas.
+    A origem dos dados fica em `df.attrs['fonte_dados']` ('ibge', 'ibge_municipal' ou 'sintetico').
+    Levanta ValueError se os setores dos dados não forem os da matriz de coeficientes.
+    """
+    df, fonte_dados = None, 'sintetico'
+    try:
+        # First try to load embedded processed data (for deployment)
+        embedded_file = DIRETORIO_BASE / "dados_ibge_processados_2021.csv"
+        if embedded_file.exists():
+            df_embedded = pd.read_csv(embedded_file)
+            # Apply region name corrections to fix encoding issues
+            df_embedded = aplicar_correcao_nomes(df_embedded)
+            # Ensure all São Paulo regions have data
+            df_embedded = garantir_regioes_sao_paulo(df_embedded)
+            logger.info("Dados reais do IBGE carregados e corrigidos: %d regiões, %d entradas setoriais",
+                        df_embedded['regiao'].nunique(), len(df_embedded))
+            df, fonte_dados = df_embedded, 'ibge'
+
+        # Fallback: Try to process raw IBGE data (for local development)
+        if df is None:
+            try:
+                from ibge_data_parser import parse_ibge_municipal_data, aggregate_by_immediate_region, create_compatible_economic_data
+
+                ibge_file = DIRETORIO_BASE / "PIB dos Municípios - base de dados 2010-2021.txt"
+                if ibge_file.exists():
+                    df_municipal = parse_ibge_municipal_data(str(ibge_file), 2021)
+                    df_regional = aggregate_by_immediate_region(df_municipal)
+                    df_compatible = create_compatible_economic_data(df_regional, gdf)
+                    # Apply region name corrections
+                    df_compatible = aplicar_correcao_nomes(df_compatible)
+                    # Ensure all São Paulo regions have data
+                    df_compatible = garantir_regioes_sao_paulo(df_compatible)
+
+                    logger.info("Dados reais do IBGE processados e corrigidos: %d regiões, %d entradas setoriais",
+                                len(df_regional), len(df_compatible))
+                    df, fonte_dados = df_compatible, 'ibge_municipal'
+
+            except Exception as e:
+                logger.warning("Não foi possível processar dados do IBGE: %s", e)
+
+    except Exception as e:
+        logger.error("Erro ao carregar dados: %s", e)
+
+    if df is None:
+        # Final fallback: synthetic data
+        logger.info("Usando dados sintéticos como fallback...")
+        df = gerar_dados_sinteticos_fallback(gdf)
+
+    # Fora do try: setores incompatíveis com a matriz são erro de configuração, não motivo de fallback
+    df = anexar_codigos_economia(df, gdf)
+    df.attrs['fonte_dados'] = fonte_dados
+    return df
+
+def gerar_dados_sinteticos_fallback(gdf):
+    """Gera dados sintéticos como fallback se os dados reais do IBGE não estiverem disponíveis."""
+    np.random.seed(42)  # Resultados consistentes
+    regioes = [normalizar_string(nome) for nome in gdf['NM_RGINT'].tolist()]
+
+    dados = []
+    for regiao in regioes:
+        # VAB base por setor com variação regional realística
+        vab_base = {
+            'Agropecuária': np.random.lognormal(10, 0.8),  # Mais variável
+            'Indústria': np.random.lognormal(10.5, 1.0),
+            'Construção': np.random.lognormal(9.5, 0.6),
+            'Serviços': np.random.lognormal(11, 0.7)  # Maior VAB médio
+        }
+        # Setores de uma matriz carregada de arquivo (SIMULADOR_MATRIZ_A) sem perfil próprio
+        for setor in setores:
+            if setor not in vab_base:
+                vab_base[setor] = np.random.lognormal(10, 0.8)
+
+        for setor in setores:
+            # Garantir que setor e região estão normalizados
+            dados.append({
+                'regiao': normalizar_string(regiao),
+                'setor': normalizar_string(setor),
+                'vab': vab_base[setor],
+                'empregos': vab_base[setor] * np.random.uniform(15, 25),  # Empregos por R$ milhão
+                'empresas': int(vab_base[setor] * np.random.uniform(0.5, 2.0))  # Número de empresas
+            })
+
+    df = pd.DataFrame(dados)
+
+    # Aplicar correções de nomes e normalizar strings
+    df = aplicar_correcao_nomes(df)
+
+    # Ensure all São Paulo regions have data (should already exist in synthetic)
+    df = garantir_regioes_sao_paulo(df)
+
+    # Calcular shares (participação de cada região no VAB setorial nacional)
+    df['share_nacional'] = df.groupby('setor')['vab'].transform(lambda x: x / x.sum())
+
+    return df
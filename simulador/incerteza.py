@@ -0,0 +1,170 @@
+"""
+Bandas de incerteza (Monte Carlo) para multiplicadores e impactos regionais.
+
+Os coeficientes do modelo são estimativas pontuais. Aqui cada amostra perturba a matriz A,
+os coeficientes de VAB, emprego e impostos e o fator de atrito com ruído lognormal
+(mediana = valor pontual). Os sistemas (I - A) de todas as amostras são resolvidos de uma
+vez com `np.linalg.solve` em 3-D - só a coluna do setor do choque e os multiplicadores, sem
+formar as inversas - e a distribuição gravitacional é propagada em bloco,
+sem laços de simulações completas. O resultado são percentis (P5/P50/P95).
+"""
+
+import numpy as np
+import pandas as pd
+
+from .modelo import (
+    coef_emprego_por_setor,
+    coef_impostos_sobre_vab,
+    coef_vab_por_setor,
+    fator_atrito,
+    matriz_a,
+    setores,
+)
+from .regioes import localizar_regiao
+
+# Coeficiente de variação (desvio relativo) de cada grupo de parâmetros
+DISPERSAO_PADRAO = {
+    'matriz_a': 0.10,
+    'coef_vab': 0.05,
+    'coef_emprego': 0.10,
+    'coef_impostos': 0.10,
+    'fator_atrito': 0.20,
+}
+
+PERCENTIS = (5, 50, 95)
+INDICADORES = ['impacto_producao', 'impacto_vab', 'impacto_impostos', 'impacto_empregos']
+
+def _ruido_lognormal(gerador, dispersao, shape):
+    """Fatores multiplicativos com mediana 1 e coeficiente de variação ≈ `dispersao`."""
+    sigma = np.sqrt(np.log1p(dispersao ** 2))
+    return np.exp(gerador.normal(0.0, sigma, size=shape))
+
+def amostrar_parametros(num_amostras, dispersao=None, semente=42):
+    """
+    Sorteia `num_amostras` conjuntos de parâmetros perturbados.
+    Retorna um dict de arrays com a amostra na primeira dimensão.
+    """
+    dispersao = dict(DISPERSAO_PADRAO, **(dispersao or {}))
+    gerador = np.random.default_rng(semente)
+    num_setores = len(setores)
+
+    amostras_a = matriz_a.to_numpy() * _ruido_lognormal(gerador, dispersao['matriz_a'], (num_amostras, num_setores, num_setores))
+    # Condição de Hawkins-Simon: cada coluna de A precisa somar menos que 1 para (I - A) ser invertível e produtiva
+    soma_colunas = amostras_a.sum(axis=1, keepdims=True)
+    amostras_a = np.where(soma_colunas >= 0.95, amostras_a * 0.95 / soma_colunas, amostras_a)
+
+    return {
+        'matriz_a': amostras_a,
+        'coef_vab': coef_vab_por_setor.reindex(setores).to_numpy() * _ruido_lognormal(gerador, dispersao['coef_vab'], (num_amostras, num_setores)),
+        'coef_emprego': coef_emprego_por_setor.reindex(setores).to_numpy() * _ruido_lognormal(gerador, dispersao['coef_emprego'], (num_amostras, num_setores)),
+        'coef_impostos': coef_impostos_sobre_vab * _ruido_lognormal(gerador, dispersao['coef_impostos'], num_amostras),
+        'fator_atrito': fator_atrito * _ruido_lognormal(gerador, dispersao['fator_atrito'], num_amostras),
+    }
+
+def resolver_amostras_leontief(amostras_a, setor_idx):
+    """
+    Para todas as amostras de uma vez (array S × n × n), resolve (I - A) x = e_setor (a coluna
+    de L do setor do choque) e (I - A)ᵀ m = 1 (os multiplicadores). Retorna (colunas, multiplicadores),
+    ambos S × n.
+    """
+    num_amostras, num_setores = amostras_a.shape[0], amostras_a.shape[-1]
+    sistemas = np.identity(num_setores) - amostras_a
+    unitario = np.zeros((num_amostras, num_setores, 1))
+    unitario[:, setor_idx] = 1.0
+    colunas = np.linalg.solve(sistemas, unitario)[..., 0]
+    multiplicadores = np.linalg.solve(np.swapaxes(sistemas, 1, 2), np.ones((num_amostras, num_setores, 1)))[..., 0]
+    return colunas, multiplicadores
+
+def _bandas(amostras, percentis=PERCENTIS):
+    """Percentis ao longo da dimensão das amostras (eixo 0)."""
+    return np.percentile(amostras, percentis, axis=0)
+
+def simular_incerteza(df_economia, gdf, valor_choque, setor_choque, regiao_origem, matriz_distancias,
+                      num_amostras=2000, dispersao=None, semente=42, tamanho_bloco=500):
+    """
+    Monte Carlo vetorizado de um choque (região de origem, setor, valor).
+
+    Retorna um dict com:
+    - 'multiplicadores': bandas do multiplicador de produção de cada setor (soma das colunas de L);
+    - 'totais': bandas do impacto nacional de cada indicador;
+    - 'regioes': bandas por região imediata e indicador (formato longo);
+    - 'num_amostras'.
+    """
+    amostras = amostrar_parametros(num_amostras, dispersao, semente)
+    setor_idx = setores.index(setor_choque)
+    colunas_L, amostras_multiplicadores = resolver_amostras_leontief(amostras['matriz_a'], setor_idx)
+    posicao_origem = localizar_regiao(gdf, regiao_origem)
+
+    # Impacto nacional por setor em cada amostra e a parte que se espalha (sem o choque direto)
+    impactos_nacionais = colunas_L * valor_choque  # (S, setores)
+    ripple = impactos_nacionais.copy()
+    ripple[:, setor_idx] -= valor_choque
+    ripple = np.where(ripple > 0, ripple, 0.0)
+
+    # Chaves das linhas de df_economia
+    idx_regiao = df_economia['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+    setor_linha = np.maximum(codigos_setor, 0)
+    share = df_economia['share_nacional'].to_numpy()
+    indicador_setor = (codigos_setor[:, np.newaxis] == np.arange(len(setores))).astype(np.float64)
+    linha_direta = (idx_regiao == posicao_origem) & (codigos_setor == setor_idx) if posicao_origem is not None else np.zeros(len(df_economia), bool)
+
+    # Agregação linha -> região (linhas sem geometria ficam de fora das bandas regionais)
+    num_regioes = len(gdf)
+    agregacao = np.zeros((len(df_economia), num_regioes))
+    com_regiao = np.flatnonzero(idx_regiao >= 0)
+    agregacao[com_regiao, idx_regiao[com_regiao]] = 1.0
+
+    distancias_origem = matriz_distancias[posicao_origem] if posicao_origem is not None else np.zeros(num_regioes)
+
+    por_regiao = {indicador: np.empty((num_amostras, num_regioes), dtype=np.float32) for indicador in INDICADORES}
+    totais = {indicador: np.empty(num_amostras) for indicador in INDICADORES}
+    for inicio in range(0, num_amostras, tamanho_bloco):
+        bloco = slice(inicio, min(inicio + tamanho_bloco, num_amostras))
+
+        # Pesos gravitacionais com o fator de atrito de cada amostra, normalizados por setor
+        proximidade = np.exp(-amostras['fator_atrito'][bloco, np.newaxis] * distancias_origem)  # (B, regiões)
+        pesos = np.where(idx_regiao >= 0, proximidade[:, np.maximum(idx_regiao, 0)], 1.0) * share
+        soma_pesos_linha = (pesos @ indicador_setor)[:, setor_linha]
+        soma_pesos_linha[:, codigos_setor < 0] = 0.0
+        pesos = np.divide(pesos, soma_pesos_linha, out=np.zeros_like(pesos), where=soma_pesos_linha > 0)
+
+        producao = pesos * ripple[bloco][:, setor_linha] + linha_direta * valor_choque
+        vab = producao * amostras['coef_vab'][bloco][:, setor_linha]
+        indicadores = {
+            'impacto_producao': producao,
+            'impacto_vab': vab,
+            'impacto_impostos': vab * amostras['coef_impostos'][bloco, np.newaxis],
+            'impacto_empregos': producao * amostras['coef_emprego'][bloco][:, setor_linha],
+        }
+        for indicador, valores in indicadores.items():
+            por_regiao[indicador][bloco] = valores @ agregacao
+            totais[indicador][bloco] = valores.sum(axis=1)
+
+    nomes_percentis = [f'p{p}' for p in PERCENTIS]
+    bandas_multiplicadores = _bandas(amostras_multiplicadores)
+    multiplicadores = pd.DataFrame(bandas_multiplicadores.T, columns=nomes_percentis)
+    multiplicadores.insert(0, 'setor', setores)
+
+    df_totais = pd.DataFrame(
+        [[indicador, *_bandas(totais[indicador])] for indicador in INDICADORES],
+        columns=['indicador', *nomes_percentis],
+    )
+
+    codigos_regiao = gdf['codigo_regiao'].to_numpy() if 'codigo_regiao' in gdf.columns else np.arange(num_regioes)
+    partes = []
+    for indicador in INDICADORES:
+        bandas = _bandas(por_regiao[indicador])
+        partes.append(pd.DataFrame({
+            'codigo_regiao': codigos_regiao,
+            'regiao': gdf['NM_RGINT'].to_numpy(),
+            'indicador': indicador,
+            **dict(zip(nomes_percentis, bandas)),
+        }))
+
+    return {
+        'multiplicadores': multiplicadores,
+        'totais': df_totais,
+        'regioes': pd.concat(partes, ignore_index=True),
+        'num_amostras': num_amostras,
+    }
@@ -0,0 +1,241 @@
+"""
+Execução em lote de livros de cenários (CSV ou JSONL) com saída em Parquet particionado.
+
+Cada cenário é uma linha com `regiao` (código ou nome), `setor` e `valor` (R$ Mi), e
+opcionalmente `cenario_id` e ajustes de parâmetros (`fator_atrito`, `coef_impostos_sobre_vab`).
+Os cenários são lidos e processados em blocos: cada bloco vira arquivos Parquet em
+`<saida>/setor_choque=<setor>/`, com uma linha por (cenário, região, setor). Os arquivos
+são gravados de forma atômica, então um cenário está completo no disco ou ausente, e o
+modo de retomada pula os `cenario_id` já gravados. Cenários com região de origem desconhecida
+são rejeitados (não gravados) e contados no resumo.
+"""
+
+import logging
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .modelo import coef_impostos_sobre_vab, fator_atrito
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_OBRIGATORIAS = ['regiao', 'setor', 'valor']
+PARAMETROS_AJUSTAVEIS = {
+    'fator_atrito': fator_atrito,
+    'coef_impostos_sobre_vab': coef_impostos_sobre_vab,
+}
+COLUNA_PARTICAO = 'setor_choque'
+
+# Dados compartilhados pelos blocos de um mesmo processo (carregados uma vez por worker)
+_contexto = None
+
+def _importar_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("A saída em Parquet requer o pacote 'pyarrow' (pip install pyarrow)") from e
+    return pa, pq
+
+def ler_cenarios(caminho_cenarios, tamanho_bloco=256):
+    """
+    Lê o arquivo de cenários em blocos de `tamanho_bloco` linhas (CSV ou JSONL, pela extensão).
+    Sem coluna `cenario_id`, o identificador é o número da linha (a partir de 0).
+    """
+    caminho_cenarios = Path(caminho_cenarios)
+    if caminho_cenarios.suffix.lower() in ('.jsonl', '.ndjson', '.json'):
+        leitor = pd.read_json(caminho_cenarios, lines=True, chunksize=tamanho_bloco)
+    else:
+        leitor = pd.read_csv(caminho_cenarios, chunksize=tamanho_bloco)
+
+    inicio = 0
+    for bloco in leitor:
+        faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in bloco.columns]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes em {caminho_cenarios}: {', '.join(faltando)}")
+        if 'cenario_id' not in bloco.columns:
+            bloco['cenario_id'] = np.arange(inicio, inicio + len(bloco))
+        bloco['cenario_id'] = bloco['cenario_id'].astype(str)
+        inicio += len(bloco)
+        yield bloco.reset_index(drop=True)
+
+def cenarios_concluidos(diretorio_saida):
+    """Retorna o conjunto de `cenario_id` já gravados no dataset de saída."""
+    _, pq = _importar_pyarrow()
+    concluidos = set()
+    for arquivo in Path(diretorio_saida).glob(f'{COLUNA_PARTICAO}=*/*.parquet'):
+        ids = pq.read_table(arquivo, columns=['cenario_id']).column('cenario_id').unique()
+        concluidos.update(ids.to_pylist())
+    return concluidos
+
+def carregar_contexto():
+    """Carrega geometrias, dados econômicos, distâncias e kernel (uma vez por processo)."""
+    global _contexto
+    if _contexto is None:
+        from .dados import DIRETORIO_CACHE, carregar_dados_geograficos, carregar_dados_reais_ibge, carregar_matriz_distancias
+        from .simulacao import obter_kernel_resposta
+
+        gdf = carregar_dados_geograficos()
+        if gdf is None:
+            raise RuntimeError("Não foi possível carregar as geometrias das regiões")
+        df_economia = carregar_dados_reais_ibge(gdf)
+        matriz_distancias = carregar_matriz_distancias(gdf)
+        _contexto = {
+            'gdf': gdf,
+            'df_economia': df_economia,
+            'matriz_distancias': matriz_distancias,
+            # Memory-map em .cache/: os workers compartilham as mesmas páginas do kernel
+            'kernel_resposta': obter_kernel_resposta(df_economia, matriz_distancias, DIRETORIO_CACHE),
+        }
+    return _contexto
+
+def _repetir_categorico(coluna, repeticoes):
+    """Repete uma coluna categórica de df_economia mantendo os códigos (dicionário no Parquet)."""
+    coluna = coluna.astype('category')
+    return pd.Categorical.from_codes(np.tile(coluna.cat.codes.to_numpy(), repeticoes), coluna.cat.categories)
+
+def simular_bloco(cenarios, parametros_padrao=None):
+    """
+    Simula um bloco de cenários e retorna a tabela longa de resultados
+    (uma linha por cenário × linha de df_economia) e os `cenario_id` rejeitados por região
+    de origem desconhecida, que ficam fora da tabela.
+    """
+    from .simulacao import executar_simulacoes_em_lote
+
+    contexto = carregar_contexto()
+    df_economia = contexto['df_economia']
+    parametros = dict(PARAMETROS_AJUSTAVEIS, **(parametros_padrao or {}))
+    for nome, valor_padrao in parametros.items():
+        if nome in cenarios.columns:
+            cenarios[nome] = cenarios[nome].fillna(valor_padrao).astype(float)
+        else:
+            cenarios[nome] = float(valor_padrao)
+
+    num_linhas = len(df_economia)
+    partes = []
+    rejeitados = []
+    # Cenários com o mesmo fator de atrito compartilham o mesmo cálculo vetorizado
+    for atrito, grupo in cenarios.groupby('fator_atrito', sort=False):
+        resultado = executar_simulacoes_em_lote(
+            df_economia, contexto['gdf'], grupo[COLUNAS_OBRIGATORIAS],
+            matriz_distancias=contexto['matriz_distancias'],
+            kernel_resposta=contexto['kernel_resposta'],
+            atrito=atrito,
+            ignorar_desconhecidas=True,
+        )
+        if len(resultado['posicoes_rejeitadas']) > 0:
+            rejeitadas = np.zeros(len(grupo), dtype=bool)
+            rejeitadas[resultado['posicoes_rejeitadas']] = True
+            rejeitados.extend(grupo['cenario_id'].to_numpy()[rejeitadas].tolist())
+            grupo = grupo[~rejeitadas]
+            if len(grupo) == 0:
+                continue
+
+        num_cenarios = len(grupo)
+        coef_impostos = grupo['coef_impostos_sobre_vab'].to_numpy(dtype=np.float32)[:, np.newaxis]
+        vab_baseline = df_economia['vab'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentual_producao = np.nan_to_num(resultado['impacto_producao'] / vab_baseline * 100).astype(np.float32)
+
+        partes.append(pd.DataFrame({
+            'cenario_id': np.repeat(grupo['cenario_id'].to_numpy(), num_linhas),
+            'regiao_origem': np.repeat(grupo['regiao'].astype(str).to_numpy(), num_linhas),
+            COLUNA_PARTICAO: np.repeat(grupo['setor'].to_numpy(), num_linhas),
+            'valor_choque': np.repeat(grupo['valor'].to_numpy(dtype=np.float64), num_linhas),
+            'fator_atrito': np.float32(atrito),
+            'codigo_regiao': np.tile(resultado['codigo_regiao'].astype(np.int32), num_cenarios),
+            'regiao': _repetir_categorico(df_economia['regiao'], num_cenarios),
+            'setor': _repetir_categorico(df_economia['setor'], num_cenarios),
+            'impacto_producao': resultado['impacto_producao'].ravel(),
+            'impacto_vab': resultado['impacto_vab'].ravel(),
+            'impacto_impostos': (resultado['impacto_vab'] * coef_impostos).ravel(),
+            'impacto_empregos': resultado['impacto_empregos'].ravel(),
+            'percentual_aumento_producao': percentual_producao.ravel(),
+        }))
+
+    return (pd.concat(partes, ignore_index=True) if partes else None), rejeitados
+
+def gravar_bloco(df_resultados, diretorio_saida):
+    """Grava a tabela de um bloco como um arquivo Parquet por partição (escrita atômica)."""
+    pa, pq = _importar_pyarrow()
+    nome_arquivo = f"parte-{uuid.uuid4().hex}.parquet"
+    for setor_choque, df_particao in df_resultados.groupby(COLUNA_PARTICAO, sort=False):
+        diretorio_particao = Path(diretorio_saida) / f"{COLUNA_PARTICAO}={setor_choque}"
+        diretorio_particao.mkdir(parents=True, exist_ok=True)
+
+        tabela = pa.Table.from_pandas(df_particao.drop(columns=COLUNA_PARTICAO), preserve_index=False)
+        caminho_temporario = diretorio_particao / f".{nome_arquivo}.tmp"
+        pq.write_table(tabela, caminho_temporario, compression='zstd')
+        caminho_temporario.replace(diretorio_particao / nome_arquivo)
+
+def processar_bloco(cenarios, diretorio_saida, parametros_padrao=None):
+    """
+    Simula e grava os cenários válidos de um bloco; retorna o número de cenários gravados
+    e os `cenario_id` rejeitados por região de origem desconhecida.
+    """
+    df_resultados, rejeitados = simular_bloco(cenarios, parametros_padrao)
+    if df_resultados is not None:
+        gravar_bloco(df_resultados, diretorio_saida)
+    return len(cenarios) - len(rejeitados), rejeitados
+
+def executar_lote(caminho_cenarios, diretorio_saida, workers=1, retomar=False, tamanho_bloco=256,
+                  parametros_padrao=None):
+    """
+    Processa o arquivo de cenários bloco a bloco, gravando no dataset Parquet de saída.
+
+    Com `workers` > 1 os blocos são distribuídos entre processos, com no máximo dois blocos
+    pendentes por worker, de modo que a memória não cresce com o tamanho do arquivo.
+    Com `retomar`, cenários cujo `cenario_id` já está no dataset são ignorados.
+    Retorna um resumo com o número de cenários lidos, pulados, gravados e rejeitados
+    (região de origem desconhecida; os ids ficam em `ids_rejeitados`).
+    """
+    _importar_pyarrow()
+    parametros_padrao = {nome: valor for nome, valor in (parametros_padrao or {}).items() if valor is not None}
+    desconhecidos = set(parametros_padrao) - set(PARAMETROS_AJUSTAVEIS)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros não ajustáveis: {', '.join(sorted(desconhecidos))}")
+    Path(diretorio_saida).mkdir(parents=True, exist_ok=True)
+
+    concluidos = cenarios_concluidos(diretorio_saida) if retomar else set()
+    resumo = {'lidos': 0, 'pulados': 0, 'gravados': 0, 'rejeitados': 0, 'ids_rejeitados': []}
+
+    def contabilizar(gravados, rejeitados):
+        resumo['gravados'] += gravados
+        resumo['rejeitados'] += len(rejeitados)
+        resumo['ids_rejeitados'].extend(rejeitados)
+
+    def blocos_pendentes():
+        for bloco in ler_cenarios(caminho_cenarios, tamanho_bloco):
+            resumo['lidos'] += len(bloco)
+            if concluidos:
+                ja_gravados = bloco['cenario_id'].isin(concluidos)
+                resumo['pulados'] += int(ja_gravados.sum())
+                bloco = bloco[~ja_gravados].reset_index(drop=True)
+            if len(bloco) > 0:
+                yield bloco
+
+    if workers <= 1:
+        for bloco in blocos_pendentes():
+            contabilizar(*processar_bloco(bloco, diretorio_saida, parametros_padrao))
+            logger.info("%d cenários gravados", resumo['gravados'])
+        return resumo
+
+    # O kernel é calculado (e gravado em .cache/) uma vez aqui, antes do pool: com o cache frio,
+    # os workers não o calculam em paralelo, e cada um só reabre o arquivo via memory-map
+    carregar_contexto()
+    with ProcessPoolExecutor(max_workers=workers, initializer=carregar_contexto) as executor:
+        pendentes = set()
+        for bloco in blocos_pendentes():
+            if len(pendentes) >= 2 * workers:
+                concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for tarefa in concluidas:
+                    contabilizar(*tarefa.result())
+                logger.info("%d cenários gravados", resumo['gravados'])
+            pendentes.add(executor.submit(processar_bloco, bloco, diretorio_saida, parametros_padrao))
+        for tarefa in pendentes:
+            contabilizar(*tarefa.result())
+
+    return resumo
@@ -0,0 +1,132 @@
+"""
+Memo LRU de resultados de simulação compartilhado por todo o processo.
+
+Muitas sessões simulam as mesmas origens (São Paulo, Campinas, Ribeirão Preto...). O memo fica
+na frente de `executar_simulacao_avancada` e guarda só a resposta a um choque unitário por
+(código da origem, setor, hash dos parâmetros do modelo): o modelo é linear no valor, então
+outros valores são obtidos reescalando essa resposta. Tem limite de entradas e de bytes e
+contadores de acertos/falhas. É seguro entre threads (sessões do Streamlit, workers do serviço).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .modelo import coef_emprego_por_setor, coef_impostos_sobre_vab, coef_vab_por_setor, fator_atrito, matriz_a, setores
+from .regioes import localizar_regiao
+from .simulacao import executar_simulacao_avancada, reescalar_simulacao
+
+MAX_ENTRADAS_PADRAO = int(os.environ.get('SIMULADOR_MEMO_ENTRADAS', 256))
+MAX_BYTES_PADRAO = int(os.environ.get('SIMULADOR_MEMO_MB', 512)) * 1024 ** 2
+
+def _tamanho_resultado(resultado):
+    """Bytes aproximados de uma tupla (resultados, impactos nacionais, bins)."""
+    df_resultados, impactos_nacionais, all_bins = resultado
+    return (
+        int(df_resultados.memory_usage(deep=True).sum())
+        + np.asarray(impactos_nacionais).nbytes
+        + sum(np.asarray(bins).nbytes for bins in all_bins.values())
+    )
+
+def assinatura_parametros(df_economia, atrito=None):
+    """Hash dos parâmetros do modelo e dos dados econômicos que afetam o resultado."""
+    assinatura = hashlib.sha1()
+    for parte in (matriz_a.to_numpy(), coef_vab_por_setor.reindex(setores).to_numpy(),
+                  coef_emprego_por_setor.reindex(setores).to_numpy(),
+                  np.array([coef_impostos_sobre_vab, fator_atrito if atrito is None else atrito]),
+                  df_economia['share_nacional'].to_numpy(), df_economia['vab'].to_numpy(),
+                  df_economia['idx_regiao'].to_numpy()):
+        assinatura.update(np.ascontiguousarray(parte, dtype=np.float64).tobytes())
+    return assinatura.hexdigest()[:16]
+
+class MemoSimulacoes:
+    """Cache LRU limitado por número de entradas e por bytes, com contadores de uso."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_PADRAO, max_bytes=MAX_BYTES_PADRAO):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # chave -> (resultado, bytes)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """Resultado guardado para a chave (marcado como o mais recente) ou None."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[0]
+
+    def guardar(self, chave, resultado):
+        """Guarda o resultado e descarta os menos usados até caber nos limites."""
+        tamanho = _tamanho_resultado(resultado)
+        if tamanho > self.max_bytes:
+            return  # Maior que o memo inteiro: não vale a pena guardar
+        with self._trava:
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[1]
+            self._entradas[chave] = (resultado, tamanho)
+            self._bytes += tamanho
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamanho_descartado) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_descartado
+
+    def limpar(self):
+        """Esvazia o memo e zera os contadores."""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+            self.acertos = self.falhas = 0
+
+    def estatisticas(self):
+        """Contadores de uso e ocupação atual."""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+            }
+
+# Memo padrão do processo (limites configuráveis por SIMULADOR_MEMO_ENTRADAS / SIMULADOR_MEMO_MB)
+memo_simulacoes = MemoSimulacoes()
+
+def executar_simulacao_memoizada(df_economia, gdf, valor_choque, setor_choque, regiao_origem, matriz_distancias=None,
+                                 kernel_resposta=None, atrito=None, memo=None):
+    """
+    `executar_simulacao_avancada` com memo LRU: a resposta unitária de cada (origem, setor,
+    parâmetros) é calculada uma vez e guardada; um `valor_choque` diferente de 1 é obtido com
+    `reescalar_simulacao` sobre ela. Com valor 1 o DataFrame devolvido é uma cópia rasa da
+    entrada do memo - quem chama pode acrescentar colunas, mas não deve alterar valores no lugar.
+    """
+    memo = memo_simulacoes if memo is None else memo
+    posicao_origem = localizar_regiao(gdf, regiao_origem)
+    if posicao_origem is not None and 'codigo_regiao' in gdf.columns:
+        origem = int(gdf['codigo_regiao'].iat[posicao_origem])
+    else:
+        origem = regiao_origem
+    chave = (origem, setor_choque, assinatura_parametros(df_economia, atrito))
+
+    resultado = memo.obter(chave)
+    if resultado is None:
+        resultado = executar_simulacao_avancada(df_economia, gdf, 1.0, setor_choque, regiao_origem,
+                                                matriz_distancias=matriz_distancias, kernel_resposta=kernel_resposta,
+                                                atrito=atrito)
+        memo.guardar(chave, resultado)
+
+    if valor_choque != 1.0:
+        return reescalar_simulacao(resultado, gdf, valor_choque)
+    df_resultados, impactos_nacionais, all_bins = resultado
+    return df_resultados.copy(deep=False), impactos_nacionais.copy(), dict(all_bins)
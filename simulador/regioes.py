@@ -0,0 +1,161 @@
+"""
+Identificação das regiões imediatas (nomes, códigos IBGE) e distâncias entre elas.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Função para normalizar strings e evitar problemas de codificação
+def normalizar_string(s):
+    """Normaliza strings para evitar problemas de codificação."""
+    if isinstance(s, str):
+        return s.strip()
+    return s
+
+def corrigir_nomes_regioes():
+    """Cria mapeamento para corrigir nomes de regiões com problemas de encoding."""
+    # Mapeamento das regiões imediatas de São Paulo com nomes corretos do IBGE 2017
+    mapeamento_sp = {
+        '3501': 'São Paulo',
+        '3502': 'Sorocaba',
+        '3503': 'Bauru',
+        '3504': 'Marília',
+        '3505': 'Presidente Prudente',
+        '3506': 'Araçatuba',
+        '3507': 'São José do Rio Preto',
+        '3508': 'Ribeirão Preto',
+        '3509': 'Araraquara',
+        '3510': 'Campinas',
+        '3511': 'São José dos Campos'
+    }
+
+    # Mapeamento completo de nomes corrompidos para nomes corretos do IBGE 2017
+    # Baseado na comparação entre dados processados e IBGE oficial
+    correções = {
+        # São Paulo regions - correcting encoding issues (todas as 11 regiões)
+        'SAo Paulo': 'São Paulo',
+        'SAo JosA do Rio Preto': 'São José do Rio Preto',
+        'SAo JosA dos Campos': 'São José dos Campos',
+        'RibeirAo Preto': 'Ribeirão Preto',
+        'MarAlia': 'Marília',
+        'AraAatuba': 'Araçatuba',
+        'PresA Prudente': 'Presidente Prudente',
+        'Presidente Prudente': 'Presidente Prudente',  # Already correct
+        'Araraquara': 'Araraquara',  # Already correct
+        'Bauru': 'Bauru',  # Already correct
+        'Campinas': 'Campinas',  # Already correct
+        'Sorocaba': 'Sorocaba',  # Already correct
+
+        # Check for missing regions and add fallbacks
+        'SAo Paulo do Potengi': 'São Paulo do Potengi',  # Different state
+        'Paulo Afonso': 'Paulo Afonso',  # Different state
+
+        # Common encoding fixes for other states
+        'SAo Gabriel da Cachoeira': 'São Gabriel da Cachoeira',
+        'SAo LuAs': 'São Luís',
+        'BrasilAia': 'Brasileia',
+        'TarauacA': 'Tarauacá',
+        'TefA': 'Tefé',
+        'EirunepA': 'Eirunepé',
+        'LAbrea': 'Lábrea',
+        'Ji-ParanA': 'Ji-Paraná'
+    }
+
+    return correções
+
+def aplicar_correcao_nomes(df):
+    """Aplica correções de nomes nas regiões do DataFrame."""
+    correções = corrigir_nomes_regioes()
+
+    # Aplica as correções de nome
+    df['regiao'] = df['regiao'].replace(correções)
+
+    # Normaliza todas as strings
+    df['regiao'] = df['regiao'].apply(normalizar_string)
+    df['setor'] = df['setor'].apply(normalizar_string)
+
+    return df
+
+def calcular_centroides(gdf):
+    """Coordenadas (x, y) dos centroides das regiões, na ordem do GeoDataFrame."""
+    return np.array([(centroide.x, centroide.y) for centroide in (geom.centroid for geom in gdf['geometry'])])
+
+def calcular_matriz_distancias(gdf):
+    """Calcula a matriz N×N de distâncias entre os centroides de todas as regiões."""
+    coordenadas = calcular_centroides(gdf)
+
+    # Distância euclidiana entre todos os pares de centroides (mesma métrica do shapely)
+    diferencas = coordenadas[:, np.newaxis, :] - coordenadas[np.newaxis, :, :]
+    return np.sqrt((diferencas ** 2).sum(axis=-1))
+
+def localizar_regiao(gdf, regiao):
+    """
+    Retorna a posição (0..N-1) da região no GeoDataFrame, ou None se não encontrada.
+    Aceita o código IBGE da região (int ou string numérica) ou o nome; nomes duplicados
+    (ex.: Itabaiana, Valença) só são resolvidos sem ambiguidade pelo código.
+    """
+    if isinstance(regiao, (int, np.integer)) or (isinstance(regiao, str) and regiao.strip().isdigit()):
+        if 'codigo_regiao' in gdf.columns:
+            posicoes = np.flatnonzero(gdf['codigo_regiao'].to_numpy() == int(regiao))
+            if len(posicoes) > 0:
+                return int(posicoes[0])
+        return None
+
+    nome = normalizar_string(regiao)
+    posicoes = np.flatnonzero((gdf['NM_RGINT'] == nome).to_numpy())
+    if len(posicoes) == 0:
+        # Nomes corrigidos nos dados econômicos (ex.: 'São Paulo') vs. nomes ASCII do shapefile
+        nomes_corrigidos = gdf['NM_RGINT'].replace(corrigir_nomes_regioes())
+        posicoes = np.flatnonzero((nomes_corrigidos == nome).to_numpy())
+    return int(posicoes[0]) if len(posicoes) > 0 else None
+
+def calcular_distancias(gdf, regiao_origem, matriz_distancias=None):
+    """Calcula a distância da região de origem (nome ou código IBGE) para todas as outras."""
+    try:
+        # Posição da região de origem no GeoDataFrame
+        posicao_origem = localizar_regiao(gdf, regiao_origem)
+        if posicao_origem is None:
+            raise IndexError(regiao_origem)
+
+        # Com a matriz pré-calculada basta ler a linha da origem
+        if matriz_distancias is not None:
+            return pd.Series(matriz_distancias[posicao_origem], index=gdf.index)
+
+        # Pega a geometria (polígono) da região de origem
+        origem_geom = gdf['geometry'].iloc[posicao_origem]
+        # Calcula o ponto central (centroide)
+        origem_centroid = origem_geom.centroid
+        
+        # Calcula a distância do centroide de origem para o centroide de todas as outras regiões
+        distancias = gdf['geometry'].apply(lambda geom: origem_centroid.distance(geom.centroid))
+        return distancias
+    except (IndexError, AttributeError):
+        # Se a região não for encontrada ou houver problema, retorna distâncias nulas
+        return pd.Series(0.0, index=gdf.index)
+
+def calcular_limites_regioes(gdf):
+    """
+    Caixas envolventes (oeste, sul, leste, norte) de cada região, na ordem do GeoDataFrame.
+    Calculadas uma vez, servem de índice espacial para recortar o mapa pela área visível.
+    """
+    return gdf['geometry'].bounds[['minx', 'miny', 'maxx', 'maxy']].to_numpy()
+
+def regioes_no_recorte(limites_regioes, oeste, sul, leste, norte):
+    """Posições das regiões cuja caixa envolvente intersecta o retângulo (oeste, sul, leste, norte)."""
+    return np.flatnonzero(
+        (limites_regioes[:, 0] <= leste) & (limites_regioes[:, 2] >= oeste)
+        & (limites_regioes[:, 1] <= norte) & (limites_regioes[:, 3] >= sul)
+    )
+
+def localizar_regiao_no_ponto(gdf, limites_regioes, latitude, longitude):
+    """
+    Posição da região que contém o ponto (ex.: um clique no mapa), ou None. As caixas envolventes
+    filtram as candidatas antes do teste exato com a geometria.
+    """
+    from shapely.geometry import Point
+
+    ponto = Point(longitude, latitude)
+    for posicao in regioes_no_recorte(limites_regioes, longitude, latitude, longitude, latitude):
+        if gdf['geometry'].iloc[posicao].covers(ponto):
+            return int(posicao)
+    return None
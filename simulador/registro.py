@@ -0,0 +1,280 @@
+"""
+Armazenamento compacto de simulações (ex.: em `st.session_state`).
+
+Cada simulação guarda apenas arrays float32 dos impactos e as classes do mapa (int8), alinhados
+a um índice compartilhado de linhas região × setor (`IndiceResultados`, um por processo). O
+DataFrame completo de resultados só é montado quando pedido, para exibição ou exportação.
+Os agregados por região e por setor (com as métricas derivadas) são calculados uma única vez,
+na criação, em `ResumoSimulacao`, e lidos por todos os painéis. As tabelas por região são
+indexadas pelo código IBGE (`codigo_regiao`), uma linha por região do GeoDataFrame: nomes
+se repetem (Itabaiana, Valença) e os do shapefile são ASCII, então o nome é só um rótulo. As faixas do mapa por métrica
+ficam num pequeno cache LRU de cada registro, e a tabela de percentuais do tooltip é montada
+uma vez por registro.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .classificacao import calculate_enhanced_bins, classificar_valores
+from .modelo import coef_emprego_por_setor, coef_vab_por_setor, setores
+from .simulacao import resumir_distribuicao_impactos
+
+# Indicadores guardados por simulação (os demais são derivados deles)
+INDICADORES_ARMAZENADOS = ['impacto_producao', 'impacto_vab', 'impacto_impostos', 'impacto_empregos']
+
+# Classificações (métrica, número de classes) guardadas por simulação
+MAX_CLASSIFICACOES_POR_SIMULACAO = 16
+
+class IndiceResultados:
+    """Colunas fixas das linhas de resultado (df_economia + coeficientes), compartilhadas entre simulações."""
+
+    __slots__ = ('base', 'grupos_regiao', 'regioes', 'codigos_setor', 'categorias_setor')
+
+    def __init__(self, df_economia):
+        codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+        base = df_economia.copy()
+        base['coef_vab'] = coef_vab_por_setor.reindex(setores).to_numpy()[codigos_setor]
+        base['coef_emprego'] = coef_emprego_por_setor.reindex(setores).to_numpy()[codigos_setor]
+        base['vab_baseline'] = df_economia['vab'].to_numpy()
+        self.base = base
+
+        # Uma região por posição no GeoDataFrame (ordem do gdf); as sem geometria vêm depois,
+        # separadas pelo nome e com códigos negativos (-1, -2, ...)
+        idx_regiao = base['idx_regiao'].to_numpy()
+        sem_geometria = idx_regiao < 0
+        chaves = idx_regiao.astype(np.int64)
+        codigos_linha = base['codigo_regiao'].to_numpy().astype(np.int64)
+        if sem_geometria.any():
+            extras = pd.factorize(base['regiao'].astype(str).to_numpy()[sem_geometria])[0]
+            chaves[sem_geometria] = idx_regiao.max() + 1 + extras
+            codigos_linha[sem_geometria] = -1 - extras
+        chaves_unicas, primeiras, grupos = np.unique(chaves, return_index=True, return_inverse=True)
+
+        # Chaves inteiras dos agregados por região (código do grupo de cada linha)
+        self.grupos_regiao = grupos
+        self.regioes = pd.DataFrame({
+            'regiao': base['regiao'].astype(str).to_numpy()[primeiras],
+            'idx_regiao': np.where(chaves_unicas <= idx_regiao.max(), chaves_unicas, -1),
+        }, index=pd.Index(codigos_linha[primeiras], name='codigo_regiao'))
+        self.codigos_setor = codigos_setor
+        self.categorias_setor = pd.Index(setores)
+
+    def __len__(self):
+        return len(self.base)
+
+def _somar_por_grupo(codigos, num_grupos, colunas):
+    """Soma cada coluna por código de grupo (códigos negativos ficam de fora)."""
+    validos = codigos >= 0
+    return {
+        nome: np.bincount(codigos[validos], weights=valores[validos], minlength=num_grupos)
+        for nome, valores in colunas.items()
+    }
+
+def _rotular_percentuais(percentuais):
+    """Rótulos do tooltip ("+0.12%", "+0.004%" ou "-" abaixo de 0,001% e sem dados) para um array."""
+    rotulos = np.full(percentuais.shape, '-', dtype=object)
+    with np.errstate(invalid='ignore'):
+        duas_casas = percentuais >= 0.01
+        tres_casas = (percentuais >= 0.001) & ~duas_casas
+    rotulos[duas_casas] = np.char.mod('+%.2f%%', percentuais[duas_casas])
+    rotulos[tres_casas] = np.char.mod('+%.3f%%', percentuais[tres_casas])
+    return rotulos
+
+class ResumoSimulacao:
+    """
+    Agregados de uma simulação calculados uma única vez: totais nacionais, tabela por região
+    (indexada por `codigo_regiao`, com o nome em `regiao`, multiplicador efetivo, densidade de
+    impacto e spillover), tabela por setor e a distribuição dos percentuais de aumento
+    (`resumir_distribuicao_impactos`).
+    """
+
+    __slots__ = ('totais', 'por_regiao', 'por_setor', 'distribuicao')
+
+    def __init__(self, indice, impactos, valor, regiao_origem, codigo_origem=None):
+        vab_baseline = indice.base['vab_baseline'].to_numpy()
+        colunas = {indicador: valores.astype(np.float64) for indicador, valores in impactos.items()}
+        self.totais = {indicador: float(valores.sum()) for indicador, valores in colunas.items()}
+
+        # Por região (uma linha por região de df_economia, na ordem do GeoDataFrame)
+        percentual_linha = np.divide(colunas['impacto_producao'] * 100, vab_baseline,
+                                     out=np.zeros(len(vab_baseline)), where=vab_baseline != 0)
+        somas = _somar_por_grupo(indice.grupos_regiao, len(indice.regioes), dict(
+            colunas, vab_baseline=vab_baseline, percentual_aumento_producao=percentual_linha
+        ))
+        por_regiao = pd.DataFrame({'regiao': indice.regioes['regiao'].to_numpy(), **somas}, index=indice.regioes.index)
+        por_regiao['multiplicador_efetivo'] = por_regiao['impacto_producao'] / valor if valor else 0.0
+        por_regiao['densidade_impacto'] = por_regiao['impacto_vab'] / por_regiao['vab_baseline'] * 100
+        # Spillover relativo: impacto fora da região de origem (pelo código; pelo nome só sem código)
+        if codigo_origem is not None:
+            origem = por_regiao.index == codigo_origem
+        else:
+            origem = por_regiao['regiao'].to_numpy() == regiao_origem
+        por_regiao['spillover_relativo'] = np.where(origem, 0.0, por_regiao['impacto_producao'])
+        self.por_regiao = por_regiao
+
+        # Por setor de destino
+        somas_setor = _somar_por_grupo(indice.codigos_setor, len(indice.categorias_setor), colunas)
+        self.por_setor = pd.DataFrame(somas_setor, index=pd.Index(indice.categorias_setor, name='setor'))
+
+        # Distribuição rotulada pelo nome (para listagens); os totais não dependem do rótulo
+        self.distribuicao = resumir_distribuicao_impactos(
+            por_regiao.set_index('regiao')['percentual_aumento_producao']
+        )
+
+class RegistroSimulacao:
+    """
+    Uma simulação guardada de forma compacta. Aceita acesso no estilo de dict
+    (`sim['valor']`, `sim['ativa'] = False`, `sim.get(...)`) para os campos e para
+    `resultados`/`parametros`, que são montados sob demanda.
+    """
+
+    __slots__ = ('id', 'nome', 'regiao', 'codigo_regiao', 'setor', 'valor', 'modelo_espacial', 'timestamp',
+                 'cor', 'ativa', 'all_bins', 'indice', 'impactos', 'classes', 'resumo', '_classificacoes',
+                 '_tabela_tooltip')
+
+    def __init__(self, indice, resultados, all_bins, **campos):
+        if len(resultados) != len(indice):
+            raise ValueError("Resultados não estão alinhados ao índice compartilhado de regiões × setores")
+        impactos = {
+            indicador: resultados[indicador].to_numpy(dtype=np.float32) for indicador in INDICADORES_ARMAZENADOS
+        }
+        classes = {
+            indicador: resultados[f'classe_{indicador}'].to_numpy().astype(np.int8)
+            for indicador in INDICADORES_ARMAZENADOS if f'classe_{indicador}' in resultados.columns
+        }
+        self._inicializar(indice, impactos, classes, all_bins, campos)
+
+    @classmethod
+    def de_arrays(cls, indice, impactos, classes, all_bins, **campos):
+        """Registro a partir dos arrays já compactos (impactos float32 e classes int8 por indicador)."""
+        registro = cls.__new__(cls)
+        registro._inicializar(indice, impactos, classes, all_bins, campos)
+        return registro
+
+    def _inicializar(self, indice, impactos, classes, all_bins, campos):
+        self.indice = indice
+        self.all_bins = all_bins
+        self.impactos = impactos
+        self.classes = classes
+        self.codigo_regiao = None
+        self.modelo_espacial = 'gravitacional'
+        self.ativa = True
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        self.resumo = ResumoSimulacao(indice, self.impactos, campos.get('valor', 0), campos.get('regiao'),
+                                      campos.get('codigo_regiao'))
+        self._classificacoes = OrderedDict()
+        self._tabela_tooltip = None
+
+    def reescalado(self, valor, **campos):
+        """
+        Registro de um choque de `valor` (> 0) com a mesma origem e setor, a partir deste
+        registro (tipicamente a resposta unitária). O modelo é linear no valor: os arrays de
+        impacto são multiplicados, as faixas escalam junto e as classes (que dependem só da
+        posição relativa dos valores) são reaproveitadas. Só o resumo é recalculado.
+        """
+        if valor <= 0:
+            raise ValueError("O valor do choque precisa ser positivo para reescalar a simulação")
+        fator = valor / self.valor
+        impactos = {indicador: valores * np.float32(fator) for indicador, valores in self.impactos.items()}
+        all_bins = {metrica: [limite * fator for limite in bins] for metrica, bins in self.all_bins.items()}
+        return RegistroSimulacao.de_arrays(self.indice, impactos, self.classes, all_bins, valor=valor, **campos)
+
+    @property
+    def resultados(self):
+        """DataFrame completo no formato de `executar_simulacao_avancada` (montado a cada acesso)."""
+        df_resultados = self.indice.base.copy()
+        for indicador, valores in self.impactos.items():
+            df_resultados[indicador] = valores.astype(np.float64)
+        df_resultados['impacto_empresas'] = df_resultados['impacto_producao'] * 0.01
+        for indicador, classes in self.classes.items():
+            df_resultados[f'classe_{indicador}'] = classes
+        df_resultados['percentual_aumento_producao'] = (
+            df_resultados['impacto_producao'] / df_resultados['vab_baseline'] * 100
+        ).fillna(0)
+        df_resultados['percentual_aumento_vab'] = (
+            df_resultados['impacto_vab'] / df_resultados['vab_baseline'] * 100
+        ).fillna(0)
+        return df_resultados
+
+    @property
+    def parametros(self):
+        return {
+            'regiao_origem': self.regiao,
+            'setor_investimento': self.setor,
+            'valor_investimento': self.valor,
+            'timestamp': self.timestamp,
+        }
+
+    def total(self, indicador):
+        """Soma nacional de um indicador, sem montar o DataFrame."""
+        return self.resumo.totais[indicador]
+
+    def classificar(self, metrica, num_classes=7):
+        """
+        Faixas e classes por região (na ordem de `resumo.por_regiao`) de uma métrica do resumo.
+        Calculadas uma vez por (métrica, número de classes) e guardadas num LRU limitado.
+        """
+        chave = (metrica, num_classes)
+        classificacao = self._classificacoes.get(chave)
+        if classificacao is None:
+            valores = self.resumo.por_regiao[metrica].to_numpy()
+            bins = calculate_enhanced_bins(valores, num_classes)
+            classificacao = (bins, classificar_valores(valores, bins))
+            self._classificacoes[chave] = classificacao
+            while len(self._classificacoes) > MAX_CLASSIFICACOES_POR_SIMULACAO:
+                self._classificacoes.popitem(last=False)
+        else:
+            self._classificacoes.move_to_end(chave)
+        return classificacao
+
+    def percentuais_por_setor(self):
+        """
+        Tabela região × setor do aumento percentual da produção (primeira linha de cada par,
+        NaN onde não há dados), indexada por `codigo_regiao`, sem montar o DataFrame de resultados.
+        """
+        indice = self.indice
+        vab_baseline = indice.base['vab_baseline'].to_numpy()
+        percentual = np.divide(self.impactos['impacto_producao'].astype(np.float64) * 100, vab_baseline,
+                               out=np.zeros(len(vab_baseline)), where=vab_baseline != 0)
+
+        num_setores = len(indice.categorias_setor)
+        validas = indice.codigos_setor >= 0
+        posicoes = indice.grupos_regiao[validas].astype(np.int64) * num_setores + indice.codigos_setor[validas]
+        posicoes_unicas, primeiras = np.unique(posicoes, return_index=True)
+
+        tabela = np.full((len(indice.regioes), num_setores), np.nan)
+        tabela.flat[posicoes_unicas] = percentual[validas][primeiras]
+        return pd.DataFrame(tabela, index=indice.regioes.index, columns=indice.categorias_setor)
+
+    def tabela_tooltip(self):
+        """Rótulos `pct_<setor>` por código de região para o tooltip do mapa (calculados uma vez por simulação)."""
+        if self._tabela_tooltip is None:
+            percentuais = self.percentuais_por_setor()
+            rotulos = _rotular_percentuais(percentuais.to_numpy())
+            self._tabela_tooltip = pd.DataFrame(
+                rotulos, index=percentuais.index, columns=[f'pct_{setor}' for setor in percentuais.columns]
+            )
+        return self._tabela_tooltip
+
+    def __getitem__(self, campo):
+        if campo not in self:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in self.__slots__:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in ('resultados', 'parametros') or (campo in self.__slots__ and hasattr(self, campo))
+
+    def get(self, campo, padrao=None):
+        return self[campo] if campo in self else padrao
+
+    def nbytes(self):
+        """Bytes ocupados pelos arrays próprios da simulação (o índice é compartilhado)."""
+        return sum(valores.nbytes for valores in self.impactos.values()) + sum(classes.nbytes for classes in self.classes.values())
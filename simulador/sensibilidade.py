@@ -0,0 +1,106 @@
+"""
+Sensibilidade da distribuição espacial ao fator de atrito (decaimento exp(-β·d)).
+
+Para um choque, avalia uma grade de valores de β numa única passada vetorizada: o tensor
+de proximidade β × regiões gera os pesos gravitacionais de todas as variantes de uma vez.
+O efeito nacional (Leontief) não depende de β, só a sua distribuição entre as regiões.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .modelo import fator_atrito, resolver_leontief, setores
+from .regioes import localizar_regiao
+
+VALORES_ATRITO_PADRAO = np.round(np.linspace(0.05, 2.0, 40), 3)
+
+def varrer_fator_atrito(df_economia, gdf, valor_choque, setor_choque, regiao_origem, matriz_distancias,
+                        valores_atrito=None, num_principais=10):
+    """
+    Produção por região para cada β da grade e indicadores de como o padrão espacial muda.
+
+    Retorna um dict com:
+    - 'resumo': uma linha por β com a participação do transbordamento (produção fora da
+      região de origem), a participação das `num_principais` maiores receptoras, a distância
+      média ponderada pelo impacto, a principal região receptora (fora a origem) e a
+      sobreposição das principais receptoras com as do β padrão do modelo;
+    - 'principais_regioes': as `num_principais` maiores receptoras de cada β (formato longo);
+    - 'impacto_por_regiao': matriz β × regiões com a produção total de cada região.
+    """
+    valores_atrito = np.asarray(VALORES_ATRITO_PADRAO if valores_atrito is None else valores_atrito, dtype=np.float64)
+    # Garante o β padrão na grade para servir de referência
+    if not np.isclose(valores_atrito, fator_atrito).any():
+        valores_atrito = np.sort(np.append(valores_atrito, fator_atrito))
+
+    setor_idx = setores.index(setor_choque)
+    posicao_origem = localizar_regiao(gdf, regiao_origem)
+    num_regioes = len(gdf)
+
+    # Efeito cascata nacional por setor (independente de β)
+    vetor_choque = np.zeros(len(setores))
+    vetor_choque[setor_idx] = valor_choque
+    ripple = resolver_leontief(vetor_choque)
+    ripple[setor_idx] -= valor_choque
+    ripple = np.where(ripple > 0, ripple, 0.0)
+
+    idx_regiao = df_economia['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+    setor_linha = np.maximum(codigos_setor, 0)
+    indicador_setor = (codigos_setor[:, np.newaxis] == np.arange(len(setores))).astype(np.float64)
+    distancias = matriz_distancias[posicao_origem] if posicao_origem is not None else np.zeros(num_regioes)
+
+    # Tensor de proximidade β × regiões e pesos normalizados por setor para todos os β
+    proximidade = np.exp(-valores_atrito[:, np.newaxis] * distancias[np.newaxis, :])
+    pesos = np.where(idx_regiao >= 0, proximidade[:, np.maximum(idx_regiao, 0)], 1.0) * df_economia['share_nacional'].to_numpy()
+    soma_pesos_linha = (pesos @ indicador_setor)[:, setor_linha]
+    soma_pesos_linha[:, codigos_setor < 0] = 0.0
+    pesos = np.divide(pesos, soma_pesos_linha, out=np.zeros_like(pesos), where=soma_pesos_linha > 0)
+
+    producao = pesos * np.where(codigos_setor >= 0, ripple[setor_linha], 0.0)
+    if posicao_origem is not None:
+        producao[:, (idx_regiao == posicao_origem) & (codigos_setor == setor_idx)] += valor_choque
+
+    # Produção por região (β × regiões)
+    com_regiao = idx_regiao >= 0
+    impacto_por_regiao = np.zeros((len(valores_atrito), num_regioes))
+    np.add.at(impacto_por_regiao.T, idx_regiao[com_regiao], producao[:, com_regiao].T)
+
+    total = impacto_por_regiao.sum(axis=1)
+    impacto_fora_origem = impacto_por_regiao.copy()
+    if posicao_origem is not None:
+        impacto_fora_origem[:, posicao_origem] = 0.0
+
+    ordem = np.argsort(-impacto_por_regiao, axis=1)[:, :num_principais]
+    principais = np.take_along_axis(impacto_por_regiao, ordem, axis=1)
+    ordem_fora_origem = np.argsort(-impacto_fora_origem, axis=1)
+
+    idx_padrao = int(np.argmin(np.abs(valores_atrito - fator_atrito)))
+    conjunto_padrao = set(ordem[idx_padrao].tolist())
+    nomes = gdf['NM_RGINT'].to_numpy()
+    codigos = gdf['codigo_regiao'].to_numpy() if 'codigo_regiao' in gdf.columns else np.arange(num_regioes)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        resumo = pd.DataFrame({
+            'fator_atrito': valores_atrito,
+            'participacao_transbordamento': np.nan_to_num(impacto_fora_origem.sum(axis=1) / total),
+            'participacao_principais': np.nan_to_num(principais.sum(axis=1) / total),
+            'distancia_media': np.nan_to_num((impacto_fora_origem * distancias).sum(axis=1) / impacto_fora_origem.sum(axis=1)),
+            'principal_receptora': nomes[ordem_fora_origem[:, 0]],
+            'sobreposicao_principais_padrao': [len(conjunto_padrao & set(linha.tolist())) / num_principais for linha in ordem],
+        })
+
+    principais_regioes = pd.DataFrame({
+        'fator_atrito': np.repeat(valores_atrito, ordem.shape[1]),
+        'posicao': np.tile(np.arange(1, ordem.shape[1] + 1), len(valores_atrito)),
+        'codigo_regiao': codigos[ordem].ravel(),
+        'regiao': nomes[ordem].ravel(),
+        'impacto_producao': principais.ravel(),
+        'participacao': (principais / total[:, np.newaxis]).ravel(),
+    })
+
+    return {
+        'resumo': resumo,
+        'principais_regioes': principais_regioes,
+        'impacto_por_regiao': impacto_por_regiao,
+        'valores_atrito': valores_atrito,
+    }
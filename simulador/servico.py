@@ -0,0 +1,246 @@
+"""
+Serviço HTTP local do simulador (somente biblioteca padrão + o núcleo do simulador).
+
+O modelo, a matriz de distâncias, df_economia e o kernel de resposta são carregados uma
+única vez na inicialização; as simulações rodam num pool de workers (threads - o numpy
+libera o GIL nas operações matriciais) compartilhando esses dados.
+
+    POST /simular       {"regiao": 320007, "setor": "Indústria", "valor": 100}
+                        -> JSON com os impactos por região/setor
+    POST /simular/lote  {"choques": [{...}, ...]} ou NDJSON (um choque por linha)
+                        -> NDJSON transmitido em partes, um cenário por linha, na ordem de entrada
+    GET  /saude         -> estado do serviço e contadores
+
+Cada choque aceita opcionalmente `cenario_id`, `fator_atrito` e `coef_impostos_sobre_vab`.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from .lote import COLUNAS_OBRIGATORIAS, PARAMETROS_AJUSTAVEIS, carregar_contexto
+from .modelo import setores
+from .regioes import localizar_regiao
+from .simulacao import executar_simulacoes_em_lote
+
+logger = logging.getLogger(__name__)
+
+METRICAS = ['impacto_producao', 'impacto_vab', 'impacto_impostos', 'impacto_empregos']
+
+def validar_choques(choques, gdf):
+    """
+    Confere campos obrigatórios, setor, valor e região de origem de cada choque (dict)
+    antes de simular; levanta ValueError descrevendo o primeiro problema encontrado.
+    """
+    regioes_encontradas = {}
+    for choque in choques:
+        faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in choque]
+        if faltando:
+            raise ValueError(f"Campos obrigatórios ausentes: {', '.join(faltando)}")
+        if choque['setor'] not in setores:
+            raise ValueError(f"Setor desconhecido: {choque['setor']}")
+        float(choque['valor'])
+        regiao = choque['regiao']
+        if regiao not in regioes_encontradas:
+            regioes_encontradas[regiao] = localizar_regiao(gdf, regiao) is not None
+    desconhecidas = sorted(str(regiao) for regiao, encontrada in regioes_encontradas.items() if not encontrada)
+    if desconhecidas:
+        raise ValueError(f"Regiões de origem não encontradas: {', '.join(desconhecidas)}")
+
+def simular_choques(choques, contexto=None):
+    """
+    Simula uma lista de choques (dicts) e retorna um dict por choque, na mesma ordem,
+    com os totais nacionais e os impactos por linha (região × setor) em formato colunar.
+    Uma região de origem desconhecida levanta ValueError (ver `validar_choques`).
+    """
+    contexto = contexto or carregar_contexto()
+    df_economia = contexto['df_economia']
+    choques = list(choques)
+    cenarios = pd.DataFrame(choques)
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cenarios.columns]
+    if faltando:
+        raise ValueError(f"Campos obrigatórios ausentes: {', '.join(faltando)}")
+    for nome, valor_padrao in PARAMETROS_AJUSTAVEIS.items():
+        cenarios[nome] = cenarios[nome].fillna(valor_padrao).astype(float) if nome in cenarios.columns else valor_padrao
+    cenarios['valor'] = pd.to_numeric(cenarios['valor'])
+
+    respostas = [None] * len(cenarios)
+    codigos = df_economia['codigo_regiao'].tolist()
+    setores_linha = df_economia['setor'].tolist()
+    for atrito, grupo in cenarios.groupby('fator_atrito', sort=False):
+        resultado = executar_simulacoes_em_lote(
+            df_economia, contexto['gdf'], grupo[COLUNAS_OBRIGATORIAS],
+            matriz_distancias=contexto['matriz_distancias'],
+            kernel_resposta=contexto['kernel_resposta'],
+            atrito=atrito,
+        )
+        coef_impostos = grupo['coef_impostos_sobre_vab'].to_numpy(dtype=np.float32)
+        for i, posicao in enumerate(grupo.index):
+            choque = choques[posicao]
+            impactos = {metrica: resultado[metrica][i] for metrica in METRICAS}
+            impactos['impacto_impostos'] = impactos['impacto_vab'] * coef_impostos[i]
+            respostas[posicao] = {
+                'cenario_id': choque.get('cenario_id'),
+                'regiao': choque['regiao'],
+                'setor': choque['setor'],
+                'valor': float(choque['valor']),
+                'impactos_setoriais_nacionais': dict(zip(setores, resultado['impactos_setoriais_nacionais'][i].tolist())),
+                'totais': {metrica: float(valores.sum(dtype=np.float64)) for metrica, valores in impactos.items()},
+                'codigo_regiao': codigos,
+                'setor_destino': setores_linha,
+                **{metrica: valores.astype(np.float64).tolist() for metrica, valores in impactos.items()},
+            }
+    return respostas
+
+class ServicoSimulador(ThreadingHTTPServer):
+    """Servidor HTTP com os dados do modelo carregados e um pool de workers de simulação."""
+
+    daemon_threads = True
+
+    def __init__(self, endereco, workers=4, tamanho_bloco=32):
+        self.contexto = carregar_contexto()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='simulador')
+        self.workers = workers
+        self.tamanho_bloco = tamanho_bloco
+        self.contadores = {'requisicoes': 0, 'cenarios': 0, 'erros': 0}
+        self._trava_contadores = threading.Lock()
+        super().__init__(endereco, ManipuladorSimulador)
+
+    def contar(self, **incrementos):
+        with self._trava_contadores:
+            for nome, valor in incrementos.items():
+                self.contadores[nome] += valor
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class ManipuladorSimulador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+    def _responder_json(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_corpo(self):
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(tamanho).decode('utf-8') if tamanho else ''
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/saude':
+            self._responder_json(404, {'erro': f'Rota não encontrada: {self.path}'})
+            return
+        self._responder_json(200, {
+            'status': 'ok',
+            'regioes': len(self.server.contexto['gdf']),
+            'setores': setores,
+            'workers': self.server.workers,
+            **self.server.contadores,
+        })
+
+    def do_POST(self):
+        rota = self.path.rstrip('/')
+        if rota not in ('/simular', '/simular/lote'):
+            self._responder_json(404, {'erro': f'Rota não encontrada: {self.path}'})
+            return
+        self.server.contar(requisicoes=1)
+        try:
+            corpo = self._ler_corpo()
+            if rota == '/simular':
+                choque = json.loads(corpo)
+                validar_choques([choque], self.server.contexto['gdf'])
+                resposta = self.server.executor.submit(simular_choques, [choque], self.server.contexto).result()[0]
+                self.server.contar(cenarios=1)
+                self._responder_json(200, resposta)
+            else:
+                self._transmitir_lote(self._interpretar_lote(corpo))
+        except (ValueError, KeyError, TypeError) as e:
+            # json.JSONDecodeError também é ValueError
+            self.server.contar(erros=1)
+            self._responder_json(400, {'erro': str(e)})
+        except Exception as e:
+            logger.exception("Falha ao atender %s", rota)
+            self.server.contar(erros=1)
+            self._responder_json(500, {'erro': str(e)})
+
+    def _interpretar_lote(self, corpo):
+        """Aceita {"choques": [...]}, uma lista JSON ou NDJSON (um choque por linha)."""
+        if 'ndjson' in (self.headers.get('Content-Type') or ''):
+            return [json.loads(linha) for linha in corpo.splitlines() if linha.strip()]
+        conteudo = json.loads(corpo)
+        choques = conteudo.get('choques') if isinstance(conteudo, dict) else conteudo
+        if not isinstance(choques, list):
+            raise ValueError("O lote deve ser uma lista de choques ou {\"choques\": [...]}")
+        return choques
+
+    def _transmitir_lote(self, choques):
+        """Simula o lote em blocos no pool e envia cada bloco assim que fica pronto (em ordem)."""
+        # Valida o lote inteiro antes de começar a responder (erros viram 400, não stream truncado)
+        validar_choques(choques, self.server.contexto['gdf'])
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        tamanho_bloco = self.server.tamanho_bloco
+        blocos = (choques[inicio:inicio + tamanho_bloco] for inicio in range(0, len(choques), tamanho_bloco))
+        pendentes = deque()
+        try:
+            # Mantém o pool ocupado sem acumular o lote inteiro em memória
+            for bloco in blocos:
+                pendentes.append(self.server.executor.submit(simular_choques, bloco, self.server.contexto))
+                if len(pendentes) > self.server.workers:
+                    self._enviar_parte(pendentes.popleft().result())
+            while pendentes:
+                self._enviar_parte(pendentes.popleft().result())
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desconectou: descarta o restante do lote
+            for tarefa in pendentes:
+                tarefa.cancel()
+            self.close_connection = True
+            return
+        except Exception as e:
+            # Os cabeçalhos já foram enviados: o erro vai como última linha do NDJSON
+            logger.exception("Falha ao simular lote")
+            for tarefa in pendentes:
+                tarefa.cancel()
+            self.server.contar(erros=1)
+            self._enviar_parte([{'erro': str(e)}], contar=False)
+            self.close_connection = True
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _enviar_parte(self, respostas, contar=True):
+        """Envia um bloco de respostas como uma parte (chunk) do NDJSON."""
+        dados = ''.join(json.dumps(resposta, ensure_ascii=False) + '\n' for resposta in respostas).encode('utf-8')
+        self.wfile.write(f'{len(dados):X}\r\n'.encode('ascii') + dados + b'\r\n')
+        self.wfile.flush()
+        if contar:
+            self.server.contar(cenarios=len(respostas))
+
+def servir(host='127.0.0.1', porta=8765, workers=4, tamanho_bloco=32):
+    """Inicia o serviço e atende requisições até ser interrompido (Ctrl+C)."""
+    inicio = time.perf_counter()
+    servidor = ServicoSimulador((host, porta), workers=workers, tamanho_bloco=tamanho_bloco)
+    print(f"🚀 Simulador em http://{host}:{servidor.server_address[1]} "
+          f"({workers} workers, dados carregados em {time.perf_counter() - inicio:.1f}s)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,188 @@
+"""
+Servidor local de tiles vetoriais (somente biblioteca padrão), para o mapa funcionar offline.
+
+    GET /tiles/{z}/{x}/{y}.pbf  -> tile MVT (gzip); 204 onde não há regiões
+    GET /metadata.json          -> TileJSON com a URL dos tiles, a faixa de zoom, as camadas e
+                                   os estáticos disponíveis (`estaticos`)
+    GET /static/<arquivo>       -> arquivos da pasta de estáticos (plugin Leaflet.VectorGrid e,
+                                   opcionalmente, leaflet.js/leaflet.css)
+    GET /saude                  -> estado do servidor
+
+Os tiles vêm de um MBTiles ou de uma pasta gerados por `python -m simulador tiles`. As respostas
+levam `Access-Control-Allow-Origin: *`, pois o mapa roda na página do Streamlit, em outra porta.
+O mapa só usa os tiles quando o TileJSON informa que o plugin VectorGrid está na pasta de
+estáticos; com o Leaflet também ali, o mapa não depende de CDN.
+"""
+
+import json
+import logging
+import mimetypes
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .dados import DIRETORIO_BASE
+from .tiles import AcervoTiles
+
+logger = logging.getLogger(__name__)
+
+# Pasta padrão dos estáticos do mapa offline (ex.: Leaflet.VectorGrid.bundled.min.js)
+PASTA_ESTATICOS = DIRETORIO_BASE / 'static'
+
+# Arquivos de cada biblioteca do mapa na pasta de estáticos
+ARQUIVOS_ESTATICOS = {
+    'vectorgrid': ('Leaflet.VectorGrid.bundled.min.js',),
+    'leaflet': ('leaflet.js', 'leaflet.css'),
+}
+
+# Tiles não mudam entre execuções do gerador: o navegador pode guardá-los por uma hora
+CACHE_TILES_SEGUNDOS = 3600
+
+_ROTA_TILE = re.compile(r'^/tiles/(\d+)/(\d+)/(\d+)\.pbf$')
+
+class ServidorTiles(ThreadingHTTPServer):
+    """Servidor HTTP com o acervo de tiles aberto uma vez e compartilhado pelas threads."""
+
+    daemon_threads = True
+
+    def __init__(self, endereco, acervo, pasta_estaticos=PASTA_ESTATICOS):
+        self.acervo = acervo
+        self.pasta_estaticos = Path(pasta_estaticos).resolve()
+        self.contadores = {'tiles': 0, 'vazios': 0, 'erros': 0}
+        self._trava_contadores = threading.Lock()
+        super().__init__(endereco, ManipuladorTiles)
+
+    def contar(self, **incrementos):
+        with self._trava_contadores:
+            for nome, valor in incrementos.items():
+                self.contadores[nome] += valor
+
+    def estaticos_disponiveis(self):
+        """Bibliotecas do mapa com todos os arquivos na pasta de estáticos (conferido a cada consulta)."""
+        return {
+            biblioteca: all((self.pasta_estaticos / arquivo).is_file() for arquivo in arquivos)
+            for biblioteca, arquivos in ARQUIVOS_ESTATICOS.items()
+        }
+
+    def server_close(self):
+        super().server_close()
+        self.acervo.fechar()
+
+class ManipuladorTiles(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+    def _responder(self, status, corpo=b'', tipo=None, cabecalhos=None):
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if tipo:
+            self.send_header('Content-Type', tipo)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if corpo and self.command != 'HEAD':
+            self.wfile.write(corpo)
+
+    def _responder_json(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode('utf-8')
+        self._responder(status, corpo, 'application/json; charset=utf-8')
+
+    def do_GET(self):
+        rota = self.path.split('?', 1)[0]
+        encontrada = _ROTA_TILE.match(rota)
+        if encontrada:
+            self._enviar_tile(*(int(parte) for parte in encontrada.groups()))
+        elif rota == '/metadata.json':
+            self._responder_json(200, self._tilejson())
+        elif rota.startswith('/static/'):
+            self._enviar_estatico(rota[len('/static/'):])
+        elif rota.rstrip('/') == '/saude':
+            self._responder_json(200, {
+                'status': 'ok',
+                'acervo': str(self.server.acervo.caminho),
+                'zoom_minimo': self.server.acervo.zoom_minimo,
+                'zoom_maximo': self.server.acervo.zoom_maximo,
+                'estaticos': self.server.estaticos_disponiveis(),
+                **self.server.contadores,
+            })
+        else:
+            self._responder_json(404, {'erro': f'Rota não encontrada: {self.path}'})
+
+    do_HEAD = do_GET
+
+    def do_OPTIONS(self):
+        # Pré-verificação de CORS (o VectorGrid usa fetch)
+        self._responder(204, cabecalhos={'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+                                         'Access-Control-Allow-Headers': '*'})
+
+    def _enviar_tile(self, zoom, x, y):
+        if x >= (1 << zoom) or y >= (1 << zoom):
+            self._responder_json(400, {'erro': f'Tile fora da grade do zoom {zoom}: {x}/{y}'})
+            return
+        try:
+            dados = self.server.acervo.tile(zoom, x, y)
+        except Exception as e:
+            logger.exception("Falha ao ler o tile %d/%d/%d", zoom, x, y)
+            self.server.contar(erros=1)
+            self._responder_json(500, {'erro': str(e)})
+            return
+
+        cache = {'Cache-Control': f'public, max-age={CACHE_TILES_SEGUNDOS}'}
+        if dados is None:
+            # Sem regiões neste tile: resposta vazia, que o mapa trata como tile sem feições
+            self.server.contar(vazios=1)
+            self._responder(204, cabecalhos=cache)
+            return
+        self.server.contar(tiles=1)
+        self._responder(200, dados, 'application/vnd.mapbox-vector-tile',
+                        dict(cache, **{'Content-Encoding': 'gzip'}))
+
+    def _tilejson(self):
+        acervo = self.server.acervo
+        host = self.headers.get('Host') or f'{self.server.server_address[0]}:{self.server.server_address[1]}'
+        return {
+            'tilejson': '3.0.0',
+            'name': acervo.metadados.get('name', ''),
+            'tiles': [f'http://{host}/tiles/{{z}}/{{x}}/{{y}}.pbf'],
+            'minzoom': acervo.zoom_minimo,
+            'maxzoom': acervo.zoom_maximo,
+            'bounds': acervo.limites,
+            'vector_layers': acervo.camadas,
+            'estaticos': self.server.estaticos_disponiveis(),
+        }
+
+    def _enviar_estatico(self, nome):
+        pasta = self.server.pasta_estaticos
+        caminho = (pasta / nome).resolve()
+        # Nada fora da pasta de estáticos (ex.: /static/../app.py)
+        if pasta not in caminho.parents or not caminho.is_file():
+            self._responder_json(404, {'erro': f'Arquivo não encontrado: {nome}'})
+            return
+        tipo = mimetypes.guess_type(caminho.name)[0] or 'application/octet-stream'
+        self._responder(200, caminho.read_bytes(), tipo)
+
+def servir_tiles(acervo, host='127.0.0.1', porta=8766, pasta_estaticos=PASTA_ESTATICOS):
+    """Abre o acervo de tiles (MBTiles ou pasta) e atende requisições até ser interrompido (Ctrl+C)."""
+    inicio = time.perf_counter()
+    servidor = ServidorTiles((host, porta), AcervoTiles(acervo), pasta_estaticos)
+    print(f"🗺️ Tiles em http://{host}:{servidor.server_address[1]}/tiles/{{z}}/{{x}}/{{y}}.pbf "
+          f"(zoom {servidor.acervo.zoom_minimo}-{servidor.acervo.zoom_maximo}, "
+          f"aberto em {time.perf_counter() - inicio:.1f}s)")
+    estaticos = servidor.estaticos_disponiveis()
+    if not estaticos['vectorgrid']:
+        logger.warning("%s não está em %s: o mapa continuará com a geometria embutida (TopoJSON)",
+                       ARQUIVOS_ESTATICOS['vectorgrid'][0], servidor.pasta_estaticos)
+    if not estaticos['leaflet']:
+        logger.warning("leaflet.js/leaflet.css não estão em %s: o mapa carregará o Leaflet da CDN",
+                       servidor.pasta_estaticos)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
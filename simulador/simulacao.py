@@ -0,0 +1,484 @@
+"""
+Motor de simulação: impacto nacional via Leontief, distribuição espacial gravitacional
+e indicadores finais (VAB, impostos, empregos) por região e setor.
+"""
+
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .classificacao import calculate_log_bins
+from .dados import anexar_codigos_economia
+from .modelo import (
+    coef_emprego_por_setor,
+    coef_impostos_sobre_vab,
+    coef_vab_por_setor,
+    fator_atrito,
+    matriz_a,
+    resolver_leontief,
+    setores,
+)
+from .regioes import calcular_distancias, calcular_matriz_distancias, localizar_regiao
+
+logger = logging.getLogger(__name__)
+
+# Colunas proporcionais ao valor do choque (o restante dos resultados não depende dele)
+COLUNAS_LINEARES = ['impacto_producao', 'impacto_vab', 'impacto_impostos', 'impacto_empregos', 'impacto_empresas']
+
+def calcular_percentuais_impacto(df_economia, df_resultados):
+    """
+    Calcula percentuais de aumento em cada região/setor baseado no VAB original.
+    """
+    if df_resultados.index.equals(df_economia.index):
+        # Resultados alinhados linha a linha com df_economia: baseline direto, sem merge
+        df_com_baseline = df_resultados.copy(deep=False)
+        df_com_baseline['vab_baseline'] = df_economia['vab'].to_numpy()
+    else:
+        # Merge para ter baseline VAB junto com impactos (código IBGE evita nomes duplicados)
+        chaves = ['codigo_regiao', 'setor'] if 'codigo_regiao' in df_resultados.columns else ['regiao', 'setor']
+        df_com_baseline = df_resultados.merge(
+            df_economia[chaves + ['vab']],
+            on=chaves,
+            suffixes=('', '_baseline')
+        )
+
+    # Calcular percentuais de aumento
+    df_com_baseline['percentual_aumento_producao'] = (
+        df_com_baseline['impacto_producao'] / df_com_baseline['vab_baseline'] * 100
+    ).fillna(0)
+
+    df_com_baseline['percentual_aumento_vab'] = (
+        df_com_baseline['impacto_vab'] / df_com_baseline['vab_baseline'] * 100
+    ).fillna(0)
+
+    return df_com_baseline
+
+def analisar_distribuicao_impactos(df_resultados):
+    """
+    Analisa a distribuição de impactos para debug e validação.
+    """
+    # Agregar por região (pelo código: nomes se repetem entre estados), rotulando pelo nome
+    chave = 'codigo_regiao' if 'codigo_regiao' in df_resultados.columns else 'regiao'
+    agrupado = df_resultados.groupby(chave, observed=True, sort=False)
+    impactos_por_regiao = agrupado['percentual_aumento_producao'].sum()
+    impactos_por_regiao.index = agrupado['regiao'].first().astype(str).to_numpy()
+    return resumir_distribuicao_impactos(impactos_por_regiao)
+
+def resumir_distribuicao_impactos(impactos_por_regiao):
+    """
+    Estatísticas e faixas da distribuição a partir do percentual de aumento já agregado por região.
+    """
+    impactos_por_regiao = impactos_por_regiao.sort_values(ascending=False)
+
+    # Estatísticas básicas
+    total_regioes = len(impactos_por_regiao)
+    regioes_com_impacto = len(impactos_por_regiao[impactos_por_regiao > 0])
+    regioes_acima_001 = len(impactos_por_regiao[impactos_por_regiao >= 0.001])
+    regioes_acima_01 = len(impactos_por_regiao[impactos_por_regiao >= 0.01])
+
+    # Distribuição por faixas
+    faixas = {
+        '>= 1.0%': len(impactos_por_regiao[impactos_por_regiao >= 1.0]),
+        '0.1% - 1.0%': len(impactos_por_regiao[(impactos_por_regiao >= 0.1) & (impactos_por_regiao < 1.0)]),
+        '0.01% - 0.1%': len(impactos_por_regiao[(impactos_por_regiao >= 0.01) & (impactos_por_regiao < 0.1)]),
+        '0.001% - 0.01%': len(impactos_por_regiao[(impactos_por_regiao >= 0.001) & (impactos_por_regiao < 0.01)]),
+        '< 0.001%': len(impactos_por_regiao[impactos_por_regiao < 0.001])
+    }
+
+    return {
+        'total_regioes': total_regioes,
+        'regioes_com_impacto': regioes_com_impacto,
+        'regioes_acima_001': regioes_acima_001,
+        'regioes_acima_01': regioes_acima_01,
+        'distribuicao_faixas': faixas,
+        'impactos_por_regiao': impactos_por_regiao
+    }
+
+def calcular_pesos_gravitacionais(df_economia, matriz_distancias, posicoes_origem, atrito=None):
+    """
+    Pesos da distribuição gravitacional (share_nacional × exp(-atrito·d)) normalizados dentro
+    de cada setor, para várias origens de uma vez. Retorna um array (len(posicoes_origem),
+    len(df_economia)); posições negativas (origem desconhecida) usam proximidade 1.0.
+    `atrito` substitui o `fator_atrito` padrão do modelo.
+    """
+    if atrito is None:
+        atrito = fator_atrito
+    idx_regiao = df_economia['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+    posicoes_origem = np.asarray(posicoes_origem)
+
+    proximidade = np.exp(-atrito * matriz_distancias[np.maximum(posicoes_origem, 0)])
+    proximidade[posicoes_origem < 0] = 1.0
+    proximidade_linhas = np.where(idx_regiao >= 0, proximidade[:, np.maximum(idx_regiao, 0)], 1.0)
+    pesos = proximidade_linhas * df_economia['share_nacional'].to_numpy()
+
+    # Normalização dentro de cada setor (linhas sem setor conhecido ficam com peso zero)
+    indicador_setor = (codigos_setor[:, np.newaxis] == np.arange(len(setores))).astype(np.float64)
+    soma_pesos_linha = (pesos @ indicador_setor)[:, np.maximum(codigos_setor, 0)]
+    soma_pesos_linha[:, codigos_setor < 0] = 0.0
+    return np.divide(pesos, soma_pesos_linha, out=np.zeros_like(pesos), where=soma_pesos_linha > 0)
+
+def calcular_kernel_resposta(df_economia, matriz_distancias, tamanho_bloco=64):
+    """
+    Pré-calcula a resposta unitária do modelo (choque de R$ 1 Mi) para todas as origens.
+
+    O modelo é linear no valor do choque para uma (região de origem, setor) fixa:
+    Leontief (L - I) seguido dos pesos gravitacionais normalizados por setor, mais o
+    impacto direto na própria origem. Retorna um array float32 com shape
+    (num_regioes, num_setores, len(df_economia)) - a produção de cada linha de
+    df_economia para cada origem (≈16 MB para 510 regiões × 4 setores).
+    """
+    idx_regiao = df_economia['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+    num_regioes = matriz_distancias.shape[0]
+    num_setores = len(setores)
+
+    # Efeito cascata por unidade de choque em cada setor: colunas de (L - I), só a parte positiva
+    # (o kernel cobre todos os setores de choque, então aqui as n colunas de L são necessárias)
+    ripple_unitario = resolver_leontief(np.identity(num_setores)) - np.identity(num_setores)
+    ripple_unitario = np.where(ripple_unitario > 0, ripple_unitario, 0.0)
+    ripple_por_linha = np.where(codigos_setor[:, np.newaxis] >= 0, ripple_unitario[codigos_setor], 0.0)  # (N, setores)
+
+    kernel = np.empty((num_regioes, num_setores, len(df_economia)), dtype=np.float32)
+    for inicio in range(0, num_regioes, tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, num_regioes)
+        pesos_normalizados = calcular_pesos_gravitacionais(df_economia, matriz_distancias, np.arange(inicio, fim))
+        kernel[inicio:fim] = pesos_normalizados[:, np.newaxis, :] * ripple_por_linha.T[np.newaxis, :, :]
+
+    # Impacto direto: R$ 1 na própria linha (região de origem, setor do choque)
+    linhas = np.flatnonzero((idx_regiao >= 0) & (codigos_setor >= 0))
+    kernel[idx_regiao[linhas], codigos_setor[linhas], linhas] += 1.0
+
+    return kernel
+
+def obter_kernel_resposta(df_economia, matriz_distancias, diretorio_cache=None):
+    """
+    Retorna o kernel de resposta unitária. Com `diretorio_cache`, o kernel é salvo em disco
+    (identificado por um hash dos dados e parâmetros do modelo) e reaberto via memory-map.
+    """
+    if diretorio_cache is None:
+        return calcular_kernel_resposta(df_economia, matriz_distancias)
+
+    assinatura = hashlib.sha1()
+    for parte in (matriz_a.to_numpy(), np.array([fator_atrito]), matriz_distancias,
+                  df_economia['share_nacional'].to_numpy(), df_economia['idx_regiao'].to_numpy(),
+                  pd.Categorical(df_economia['setor'], categories=setores).codes):
+        assinatura.update(np.ascontiguousarray(parte).tobytes())
+    caminho_kernel = Path(diretorio_cache) / f"kernel_resposta_{assinatura.hexdigest()[:16]}.npy"
+
+    if caminho_kernel.exists():
+        try:
+            return np.load(caminho_kernel, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+
+    kernel = calcular_kernel_resposta(df_economia, matriz_distancias)
+    try:
+        caminho_kernel.parent.mkdir(parents=True, exist_ok=True)
+        # Nome temporário único: processos que calculam o kernel ao mesmo tempo não escrevem
+        # no mesmo arquivo, e o replace atômico deixa no lugar um kernel completo
+        with tempfile.NamedTemporaryFile(dir=caminho_kernel.parent, prefix=f'.{caminho_kernel.stem}-',
+                                         suffix='.npy', delete=False) as temporario:
+            np.save(temporario, kernel)
+        Path(temporario.name).replace(caminho_kernel)
+        return np.load(caminho_kernel, mmap_mode='r')
+    except OSError:
+        return kernel  # Ambiente somente leitura: mantém o kernel apenas em memória
+
+def classificar_resultados(gdf, df_resultados):
+    """
+    Calcula as faixas (bins) de cada indicador agregado por região e grava a classe de cada
+    linha em `classe_<indicador>`. Retorna o dict de bins por indicador.
+    """
+    idx_regiao = df_resultados['idx_regiao'].to_numpy()
+
+    # Agregação por região via chave inteira (linhas sem geometria ganham chave própria pelo nome)
+    chaves_regiao = idx_regiao.copy()
+    sem_geometria = chaves_regiao < 0
+    if sem_geometria.any():
+        chaves_regiao[sem_geometria] = len(gdf) + pd.factorize(df_resultados['regiao'].to_numpy()[sem_geometria])[0]
+    _, grupo_linha = np.unique(chaves_regiao, return_inverse=True)
+
+    impacto_agregado = pd.DataFrame({
+        metrica: np.bincount(grupo_linha, weights=df_resultados[metrica].to_numpy())
+        for metrica in ['impacto_producao', 'impacto_vab', 'impacto_empregos', 'impacto_impostos']
+    })
+    
+    all_bins = {
+        'impacto_producao': calculate_log_bins(impacto_agregado['impacto_producao']),
+        'impacto_vab': calculate_log_bins(impacto_agregado['impacto_vab']),
+        'impacto_empregos': calculate_log_bins(impacto_agregado['impacto_empregos']),
+        'impacto_impostos': calculate_log_bins(impacto_agregado['impacto_impostos'])
+    }
+
+    for metrica, bins in all_bins.items():
+        # Ensure bins is properly formatted and has at least 2 values
+        if len(bins) < 2:
+            bins = [impacto_agregado[metrica].min(), impacto_agregado[metrica].max()]
+
+        # Create labels after confirming bin count
+        num_labels = max(1, len(bins) - 1)
+        labels = [i for i in range(num_labels)]
+
+        try:
+            classes = pd.cut(impacto_agregado[metrica], bins=bins, labels=labels, include_lowest=True, duplicates='drop')
+        except ValueError:
+            # Fallback: use simple quartile-based binning
+            classes = pd.qcut(impacto_agregado[metrica], q=min(4, len(impacto_agregado[metrica].unique())),
+                            labels=False, duplicates='drop')
+        # Classe de cada linha lida diretamente pelo grupo da sua região
+        classes_regiao = pd.to_numeric(pd.Series(classes), errors='coerce').fillna(0).to_numpy()
+        df_resultados[f'classe_{metrica}'] = classes_regiao[grupo_linha]
+
+    return all_bins
+
+def finalizar_resultados(df_economia, gdf, df_resultados):
+    """
+    Completa os resultados de uma simulação a partir de `impacto_producao` por linha:
+    indicadores (VAB, impostos, empregos), classes do mapa e percentuais sobre o VAB.
+    `df_resultados` precisa estar alinhado às linhas de df_economia (com `idx_regiao`).
+    Retorna (df_resultados_com_percentuais, all_bins).
+    """
+    codigos_setor = pd.Categorical(df_resultados['setor'], categories=setores).codes
+
+    # --- PARTE 3: CÁLCULO DOS INDICADORES FINAIS (VAB, Impostos, Empregos) ---
+    # (Usando os aprimoramentos que definimos anteriormente)
+    df_resultados['coef_vab'] = coef_vab_por_setor.reindex(setores).to_numpy()[codigos_setor]
+    df_resultados['impacto_vab'] = df_resultados['impacto_producao'] * df_resultados['coef_vab']
+    df_resultados['impacto_impostos'] = df_resultados['impacto_vab'] * coef_impostos_sobre_vab
+    
+    # --- CORREÇÃO NO CÁLCULO DE EMPREGOS ---
+    df_resultados['coef_emprego'] = coef_emprego_por_setor.reindex(setores).to_numpy()[codigos_setor]
+    df_resultados['impacto_empregos'] = df_resultados['impacto_producao'] * df_resultados['coef_emprego']
+    
+    df_resultados['impacto_empresas'] = df_resultados['impacto_producao'] * 0.01
+
+    # --- PARTE 4: CLASSIFICAÇÃO MULTIVARIADA PARA O MAPA ---
+    all_bins = classificar_resultados(gdf, df_resultados)
+
+    # --- PARTE 5: CÁLCULO DOS PERCENTUAIS DE AUMENTO ---
+    df_resultados_com_percentuais = calcular_percentuais_impacto(df_economia, df_resultados)
+
+    return df_resultados_com_percentuais, all_bins
+
+def executar_simulacao_avancada(df_economia, gdf, valor_choque, setor_choque, regiao_origem, matriz_distancias=None,
+                                kernel_resposta=None, atrito=None):
+    """
+    Executa simulação completa com modelo Leontief e distribuição gravitacional.
+    `regiao_origem` pode ser o código IBGE da região (preferível) ou o nome.
+    Se `matriz_distancias` for informada, as distâncias são lidas dela em vez de recalculadas.
+    Se `kernel_resposta` for informado, a produção é a coluna da origem × valor do choque
+    (float32, mesma resposta do laço até a precisão do float32). O kernel é pré-calculado com o
+    `fator_atrito` padrão, então só é usado quando `atrito` é omitido ou igual a ele, a origem
+    existe no gdf, o valor é positivo e o kernel tem uma coluna por linha de df_economia;
+    fora disso a distribuição é calculada pelo laço por setor.
+    """
+    # --- PARTE 1: CÁLCULO DO IMPACTO NACIONAL (lógica de Leontief, inalterada) ---
+    setor_idx = setores.index(setor_choque)
+    vetor_choque = np.zeros(len(setores))
+    vetor_choque[setor_idx] = valor_choque
+    impactos_setoriais_nacionais = resolver_leontief(vetor_choque)
+
+    # --- PARTE 2: DISTRIBUIÇÃO ESPACIAL GRAVITACIONAL (Lógica Nova e Corrigida) ---
+
+    # Inicializa um DataFrame de resultados com as colunas que vamos precisar
+    df_resultados = df_economia.copy()
+    if 'idx_regiao' not in df_resultados.columns:
+        df_resultados = anexar_codigos_economia(df_resultados, gdf)
+
+    # Chaves inteiras alinhadas às linhas: posição da região no gdf e índice do setor
+    idx_regiao = df_resultados['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_resultados['setor'], categories=setores).codes
+    posicao_origem = localizar_regiao(gdf, regiao_origem)
+    impacto_producao = np.zeros(len(df_resultados))
+
+    # --- Passo 2a: Atribuir o impacto DIRETO 100% à região de origem ---
+    mask_origem = (idx_regiao == posicao_origem) & (codigos_setor == setor_idx)
+    impacto_producao[mask_origem] = valor_choque
+    
+    # --- Passo 2b: Preparar pesos para distribuir o "efeito cascata" (LÓGICA SUAVIZADA) ---
+    # Calcular distâncias geográficas a partir da origem
+    distancias = calcular_distancias(gdf, regiao_origem, matriz_distancias).to_numpy()
+    
+    # --- FATOR DE ATRITO (padrão definido junto aos parâmetros do modelo) ---
+    if atrito is None:
+        atrito = fator_atrito
+    fator_proximidade = np.exp(-atrito * distancias)
+    
+    # Proximidade de cada linha lida pela posição da região (1.0 para linhas sem geometria)
+    proximidade = np.where(idx_regiao >= 0, fator_proximidade[np.maximum(idx_regiao, 0)], 1.0)
+    
+    # Criar um peso final combinando tamanho econômico (`share_nacional`) e proximidade
+    peso_final = df_resultados['share_nacional'].to_numpy() * proximidade
+    
+    # --- Passo 2c: Distribuir o "efeito cascata" usando os novos pesos ---
+    # Atalho: o modelo é linear no valor do choque, então basta escalar a resposta unitária
+    usar_kernel = (
+        kernel_resposta is not None and posicao_origem is not None and valor_choque > 0
+        and kernel_resposta.shape[2] == len(df_resultados) and atrito == fator_atrito
+    )
+    if usar_kernel:
+        impacto_producao = kernel_resposta[posicao_origem, setor_idx].astype(np.float64) * valor_choque
+    else:
+        for setor_idx_atual in range(len(setores)):
+            # O efeito cascata de cada setor
+            ripple_setor = impactos_setoriais_nacionais[setor_idx_atual]
+            if setor_idx_atual == setor_idx:
+                ripple_setor -= valor_choque # Subtrai o choque direto que já alocamos
+        
+            if ripple_setor > 0:
+                # Filtra para o setor atual
+                mask_setor = codigos_setor == setor_idx_atual
+            
+                # Normaliza os pesos para que a soma seja 1 (dentro do setor)
+                soma_pesos_setor = peso_final[mask_setor].sum()
+                if soma_pesos_setor > 0:
+                    # Distribui o ripple do setor e SOMA ao impacto já existente (o direto)
+                    impacto_producao[mask_setor] += peso_final[mask_setor] / soma_pesos_setor * ripple_setor
+
+    df_resultados['impacto_producao'] = impacto_producao
+    df_resultados['proximidade'] = proximidade
+    df_resultados['peso_final'] = peso_final
+
+    df_resultados_com_percentuais, all_bins = finalizar_resultados(df_economia, gdf, df_resultados)
+
+    return df_resultados_com_percentuais, impactos_setoriais_nacionais, all_bins
+
+def reescalar_simulacao(resposta_unitaria, gdf, valor_choque):
+    """
+    Resultado de um choque de `valor_choque` a partir da resposta a um choque unitário
+    (a tupla retornada por `executar_simulacao_avancada` com valor 1) da mesma origem e setor.
+
+    O modelo é linear no valor do choque: os impactos são escalados, e as faixas, classes
+    e percentuais são recalculados a partir dos arrays escalados, sem refazer distâncias,
+    pesos e distribuição. Retorna a mesma tupla de `executar_simulacao_avancada`.
+    """
+    resultados_unitarios, impactos_unitarios, _ = resposta_unitaria
+
+    df_resultados = resultados_unitarios.copy()
+    colunas = [coluna for coluna in COLUNAS_LINEARES if coluna in df_resultados.columns]
+    df_resultados[colunas] = resultados_unitarios[colunas].to_numpy() * valor_choque
+
+    all_bins = classificar_resultados(gdf, df_resultados)
+    df_resultados['percentual_aumento_producao'] = (
+        df_resultados['impacto_producao'] / df_resultados['vab_baseline'] * 100
+    ).fillna(0)
+    df_resultados['percentual_aumento_vab'] = (
+        df_resultados['impacto_vab'] / df_resultados['vab_baseline'] * 100
+    ).fillna(0)
+
+    return df_resultados, impactos_unitarios * valor_choque, all_bins
+
+def executar_simulacoes_em_lote(df_economia, gdf, choques, matriz_distancias=None, kernel_resposta=None,
+                                tamanho_bloco=256, atrito=None, ignorar_desconhecidas=False):
+    """
+    Executa vários choques (região, setor, valor) de uma só vez, sem tocar no session_state.
+
+    `choques` é um DataFrame com colunas 'regiao', 'setor' e 'valor' ou uma sequência de
+    tuplas nessa ordem; a região pode ser o código IBGE ou o nome. A matriz de choques Y
+    (setores × choques) é resolvida de uma vez com a fatoração LU de (I - A) e a distribuição gravitacional é feita por
+    blocos de choques com operações matriciais (ou fatias do `kernel_resposta`, se informado).
+    `atrito` substitui o `fator_atrito` padrão (o kernel só é usado com o fator padrão).
+
+    Uma região de origem desconhecida levanta ValueError com a lista dessas regiões. Com
+    `ignorar_desconhecidas=True` esses choques são descartados e suas posições em `choques`
+    ficam em 'posicoes_rejeitadas' (as matrizes trazem só os choques aceitos).
+
+    Retorna um dicionário colunar: metadados dos choques, as chaves das linhas de destino
+    e uma matriz float32 (choques × linhas de df_economia) por indicador.
+    """
+    if not isinstance(choques, pd.DataFrame):
+        choques = pd.DataFrame(list(choques), columns=['regiao', 'setor', 'valor'])
+    if 'idx_regiao' not in df_economia.columns:
+        df_economia = anexar_codigos_economia(df_economia, gdf)
+    if matriz_distancias is None:
+        matriz_distancias = calcular_matriz_distancias(gdf)
+
+    # Resolve cada região distinta uma única vez (posição no gdf, -1 se desconhecida)
+    posicoes_por_regiao = {}
+    for regiao in pd.unique(choques['regiao']):
+        posicao = localizar_regiao(gdf, regiao)
+        posicoes_por_regiao[regiao] = -1 if posicao is None else posicao
+    posicoes_origem = choques['regiao'].map(posicoes_por_regiao).to_numpy(dtype=np.int64)
+
+    desconhecidas = posicoes_origem < 0
+    posicoes_rejeitadas = np.flatnonzero(desconhecidas)
+    if desconhecidas.any():
+        regioes_desconhecidas = sorted(set(choques['regiao'].astype(str).to_numpy()[desconhecidas]))
+        if not ignorar_desconhecidas:
+            raise ValueError(f"Regiões de origem não encontradas: {', '.join(regioes_desconhecidas)}")
+        logger.warning("Choques descartados por região de origem não encontrada: %s", regioes_desconhecidas)
+        choques = choques[~desconhecidas].reset_index(drop=True)
+        posicoes_origem = posicoes_origem[~desconhecidas]
+
+    setores_choque = pd.Categorical(choques['setor'], categories=setores).codes
+    if (setores_choque < 0).any():
+        desconhecidos = sorted(set(choques['setor'][setores_choque < 0].astype(str)))
+        raise ValueError(f"Setores desconhecidos: {', '.join(desconhecidos)}")
+    valores = choques['valor'].to_numpy(dtype=np.float64)
+
+    # --- PARTE 1: Leontief para todos os choques (Y: setores × choques) ---
+    matriz_choques = np.zeros((len(setores), len(choques)))
+    matriz_choques[setores_choque, np.arange(len(choques))] = valores
+    impactos_nacionais = resolver_leontief(matriz_choques).T  # (choques, setores)
+
+    # Efeito cascata por setor de destino, sem o choque direto; só a parte positiva é distribuída
+    ripple = impactos_nacionais - matriz_choques.T
+    ripple = np.where(ripple > 0, ripple, 0.0)
+
+    # --- PARTE 2: Distribuição espacial por blocos de choques ---
+    idx_regiao = df_economia['idx_regiao'].to_numpy()
+    codigos_setor = pd.Categorical(df_economia['setor'], categories=setores).codes
+    setor_linha = np.maximum(codigos_setor, 0)
+    usar_kernel = (
+        kernel_resposta is not None and kernel_resposta.shape[2] == len(df_economia)
+        and (atrito is None or atrito == fator_atrito)
+    )
+
+    impacto_producao = np.zeros((len(choques), len(df_economia)), dtype=np.float32)
+    for inicio in range(0, len(choques), tamanho_bloco):
+        bloco = slice(inicio, min(inicio + tamanho_bloco, len(choques)))
+        posicoes_bloco = posicoes_origem[bloco]
+        positivos = valores[bloco] > 0
+
+        if usar_kernel and positivos.all():
+            producao = kernel_resposta[posicoes_bloco, setores_choque[bloco]] * valores[bloco, np.newaxis]
+        else:
+            # Pesos por origem distinta do bloco, reaproveitados entre setores e valores
+            origens_unicas, origem_choque = np.unique(posicoes_bloco, return_inverse=True)
+            pesos = calcular_pesos_gravitacionais(df_economia, matriz_distancias, origens_unicas, atrito)
+            producao = pesos[origem_choque] * ripple[bloco][:, setor_linha]
+            producao[:, codigos_setor < 0] = 0.0
+
+            # Impacto direto: 100% na linha (região de origem, setor do choque)
+            linha_direta = (idx_regiao[np.newaxis, :] == posicoes_bloco[:, np.newaxis]) & \
+                           (codigos_setor[np.newaxis, :] == setores_choque[bloco, np.newaxis])
+            producao = producao + linha_direta * valores[bloco, np.newaxis]
+        impacto_producao[bloco] = producao
+
+    # --- PARTE 3: Indicadores finais (coeficientes por linha de destino) ---
+    coef_vab = coef_vab_por_setor.reindex(setores).to_numpy()[setor_linha]
+    coef_emprego = coef_emprego_por_setor.reindex(setores).to_numpy()[setor_linha]
+    impacto_vab = impacto_producao * coef_vab.astype(np.float32)
+
+    return {
+        'choques': pd.DataFrame({
+            'regiao': choques['regiao'].to_numpy(),
+            'setor': choques['setor'].to_numpy(),
+            'valor': valores,
+            'posicao_origem': posicoes_origem,
+        }),
+        'posicoes_rejeitadas': posicoes_rejeitadas,
+        'impactos_setoriais_nacionais': impactos_nacionais,
+        'regiao': df_economia['regiao'].to_numpy(),
+        'codigo_regiao': df_economia['codigo_regiao'].to_numpy(),
+        'setor': df_economia['setor'].to_numpy(),
+        'impacto_producao': impacto_producao,
+        'impacto_vab': impacto_vab,
+        'impacto_impostos': impacto_vab * np.float32(coef_impostos_sobre_vab),
+        'impacto_empregos': impacto_producao * coef_emprego.astype(np.float32),
+    }
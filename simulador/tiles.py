@@ -0,0 +1,385 @@
+"""
+Tiles vetoriais (Mapbox Vector Tiles) das geometrias das regiões, gerados offline.
+
+As geometrias são simplificadas uma vez por zoom pelos arcos compartilhados (`topologia.py`),
+cortadas na grade de tiles do Web Mercator (com uma pequena borda, para o contorno do corte não
+aparecer no encontro dos tiles) e codificadas em protobuf sem dependências externas. Cada região
+leva apenas o código e o nome: os valores da simulação são juntados no navegador pelo código,
+então os mesmos tiles servem para qualquer simulação. Os tiles são gravados comprimidos (gzip)
+num arquivo MBTiles (SQLite) ou numa pasta `{z}/{x}/{y}.pbf`, e servidos por `servico_tiles.py`.
+"""
+
+import gzip
+import json
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .topologia import OBJETO_TOPOJSON, extrair_topologia, simplificar_com_topologia
+
+# Resolução de cada tile (unidades por lado) e borda do corte, nas mesmas unidades
+EXTENSAO_TILE = 4096
+BORDA_TILE = 64
+
+# Faixa padrão de zoom; acima do máximo o mapa amplia os tiles do último zoom
+ZOOM_MINIMO_TILES = 3
+ZOOM_MAXIMO_TILES = 10
+
+# Limite de latitude do Web Mercator
+LATITUDE_MAXIMA = 85.0511287798
+
+# Geometria de polígono e comandos de desenho do formato MVT (especificação 2.1)
+_TIPO_POLIGONO = 3
+_MOVER_PARA, _LINHA_PARA, _FECHAR_CAMINHO = 1, 2, 7
+
+# ==============================================================================
+# GRADE DE TILES (WEB MERCATOR)
+# ==============================================================================
+
+def _lon_para_x(longitude, zoom):
+    """Coordenada x na grade de tiles do zoom (a parte inteira é a coluna do tile)."""
+    return (np.asarray(longitude, dtype=np.float64) + 180.0) / 360.0 * (1 << zoom)
+
+def _lat_para_y(latitude, zoom):
+    """Coordenada y na grade de tiles do zoom (cresce para o sul, como nas telas)."""
+    latitude = np.radians(np.clip(np.asarray(latitude, dtype=np.float64), -LATITUDE_MAXIMA, LATITUDE_MAXIMA))
+    return (1.0 - np.log(np.tan(latitude) + 1.0 / np.cos(latitude)) / np.pi) / 2.0 * (1 << zoom)
+
+def _x_para_lon(x, zoom):
+    return x / (1 << zoom) * 360.0 - 180.0
+
+def _y_para_lat(y, zoom):
+    return float(np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y / (1 << zoom))))))
+
+def tolerancia_no_zoom(zoom):
+    """Tolerância da simplificação (graus) no zoom: cerca de um pixel de um tile de 256 px."""
+    return 360.0 / (256 * (1 << zoom))
+
+def _tiles_das_geometrias(limites, zoom):
+    """Dict (x, y) -> posições das geometrias cuja caixa envolvente (com a borda) toca o tile."""
+    ultimo = (1 << zoom) - 1
+    margem = BORDA_TILE / EXTENSAO_TILE
+    validas = np.flatnonzero(np.isfinite(limites).all(axis=1))
+    oeste = np.clip(np.floor(_lon_para_x(limites[validas, 0], zoom) - margem), 0, ultimo).astype(int)
+    leste = np.clip(np.floor(_lon_para_x(limites[validas, 2], zoom) + margem), 0, ultimo).astype(int)
+    norte = np.clip(np.floor(_lat_para_y(limites[validas, 3], zoom) - margem), 0, ultimo).astype(int)
+    sul = np.clip(np.floor(_lat_para_y(limites[validas, 1], zoom) + margem), 0, ultimo).astype(int)
+
+    tiles = {}
+    for posicao, x0, x1, y0, y1 in zip(validas, oeste, leste, norte, sul):
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                tiles.setdefault((x, y), []).append(int(posicao))
+    return tiles
+
+# ==============================================================================
+# CODIFICAÇÃO PROTOBUF
+# ==============================================================================
+
+def _varint(valor):
+    """Um inteiro não negativo em varint do protobuf."""
+    saida = bytearray()
+    while valor > 0x7F:
+        saida.append((valor & 0x7F) | 0x80)
+        valor >>= 7
+    saida.append(valor)
+    return bytes(saida)
+
+def _varints(valores):
+    """Vários inteiros não negativos em varint, de uma vez (campos `packed`)."""
+    valores = np.asarray(valores, dtype=np.uint64)
+    deslocamentos = np.arange(10, dtype=np.uint64) * np.uint64(7)
+    grupos = (valores[:, np.newaxis] >> deslocamentos) & np.uint64(0x7F)
+    # Octetos até o último grupo de 7 bits não nulo (ao menos um)
+    nao_nulos = grupos != 0
+    tamanhos = np.where(nao_nulos.any(axis=1), 10 - np.argmax(nao_nulos[:, ::-1], axis=1), 1)
+    posicoes = np.arange(10)[np.newaxis, :]
+    continua = posicoes < (tamanhos[:, np.newaxis] - 1)
+    octetos = (grupos | (continua.astype(np.uint64) << np.uint64(7))).astype(np.uint8)
+    return octetos[posicoes < tamanhos[:, np.newaxis]].tobytes()
+
+def _campo_varint(numero, valor):
+    return _varint(numero << 3) + _varint(valor)
+
+def _campo_bytes(numero, dados):
+    return _varint((numero << 3) | 2) + _varint(len(dados)) + dados
+
+def _zigzag(valores):
+    valores = np.asarray(valores, dtype=np.int64)
+    return (valores << 1) ^ (valores >> 63)
+
+def _codificar_valor(valor):
+    """Mensagem `Value` do MVT: texto, inteiro (uint/sint) ou double."""
+    if isinstance(valor, str):
+        return _campo_bytes(1, valor.encode('utf-8'))
+    if isinstance(valor, (bool, np.bool_)):
+        return _campo_varint(7, int(valor))
+    if isinstance(valor, (int, np.integer)):
+        valor = int(valor)
+        return _campo_varint(5, valor) if valor >= 0 else _campo_varint(6, (-valor << 1) - 1)
+    return _varint((3 << 3) | 1) + struct.pack('<d', float(valor))
+
+def _comando(identificador, quantidade):
+    return (identificador & 0x7) | (quantidade << 3)
+
+def _poligonos(geometria):
+    """Polígonos de uma geometria recortada (o corte pode devolver coleções)."""
+    if geometria.is_empty:
+        return []
+    if geometria.geom_type == 'Polygon':
+        return [geometria]
+    return [poligono for parte in getattr(geometria, 'geoms', []) for poligono in _poligonos(parte)]
+
+def _comandos_geometria(poligonos):
+    """
+    Inteiros de desenho MVT dos polígonos (coordenadas já no espaço do tile). Vértices repetidos
+    pelo arredondamento são removidos, anéis que degeneram são descartados (um exterior descartado
+    leva os furos junto) e a orientação segue a especificação: exterior com área positiva.
+    """
+    comandos = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for poligono in poligonos:
+        for indice, anel in enumerate([poligono.exterior, *poligono.interiors]):
+            pontos = np.rint(np.asarray(anel.coords)[:-1]).astype(np.int64)
+            if len(pontos) > 0:
+                pontos = pontos[np.any(pontos != np.roll(pontos, 1, axis=0), axis=1)]
+            area = 0
+            if len(pontos) >= 3:
+                proximos = np.roll(pontos, -1, axis=0)
+                area = int(np.sum(pontos[:, 0] * proximos[:, 1] - proximos[:, 0] * pontos[:, 1]))
+            if area == 0:
+                if indice == 0:
+                    break
+                continue
+
+            if (area > 0) != (indice == 0):
+                pontos = pontos[::-1]
+            parametros = _zigzag(np.diff(np.vstack([cursor, pontos]), axis=0)).ravel()
+            cursor = pontos[-1]
+            comandos.append(_comando(_MOVER_PARA, 1))
+            comandos.extend(parametros[:2].tolist())
+            comandos.append(_comando(_LINHA_PARA, len(pontos) - 1))
+            comandos.extend(parametros[2:].tolist())
+            comandos.append(_comando(_FECHAR_CAMINHO, 1))
+    return comandos
+
+def codificar_camada(feicoes, nome_camada=OBJETO_TOPOJSON, extensao=EXTENSAO_TILE):
+    """
+    Tile MVT (bytes, sem compressão) com uma camada. `feicoes` é uma sequência de
+    (id, propriedades, comandos de geometria), como montadas por `codificar_tile`.
+    """
+    chaves, indice_chaves = [], {}
+    valores, indice_valores = [], {}
+    mensagens = []
+    for identificador, propriedades, comandos in feicoes:
+        tags = []
+        for chave, valor in propriedades.items():
+            if chave not in indice_chaves:
+                indice_chaves[chave] = len(chaves)
+                chaves.append(chave)
+            valor_codificado = _codificar_valor(valor)
+            if valor_codificado not in indice_valores:
+                indice_valores[valor_codificado] = len(valores)
+                valores.append(valor_codificado)
+            tags.extend((indice_chaves[chave], indice_valores[valor_codificado]))
+
+        feicao = b''
+        if identificador is not None:
+            feicao += _campo_varint(1, int(identificador))
+        feicao += _campo_bytes(2, _varints(tags)) + _campo_varint(3, _TIPO_POLIGONO) + _campo_bytes(4, _varints(comandos))
+        mensagens.append(_campo_bytes(2, feicao))
+
+    camada = (
+        _campo_varint(15, 2)
+        + _campo_bytes(1, nome_camada.encode('utf-8'))
+        + b''.join(mensagens)
+        + b''.join(_campo_bytes(3, chave.encode('utf-8')) for chave in chaves)
+        + b''.join(_campo_bytes(4, valor) for valor in valores)
+        + _campo_varint(5, extensao)
+    )
+    return _campo_bytes(3, camada)
+
+def codificar_tile(geometrias, posicoes, propriedades, zoom, x, y, ids=None, nome_camada=OBJETO_TOPOJSON):
+    """
+    Recorta as geometrias (lon/lat) das posições dadas no tile (zoom, x, y), com a borda, e
+    codifica o tile MVT. `propriedades` é uma lista de dicts alinhada às geometrias. Retorna
+    None quando nenhuma região sobra no tile.
+    """
+    import shapely
+
+    margem = BORDA_TILE / EXTENSAO_TILE
+    recortes = shapely.clip_by_rect(
+        geometrias[posicoes],
+        _x_para_lon(x - margem, zoom), _y_para_lat(y + 1 + margem, zoom),
+        _x_para_lon(x + 1 + margem, zoom), _y_para_lat(y - margem, zoom),
+    )
+
+    def para_tile(coordenadas):
+        return np.column_stack([
+            (_lon_para_x(coordenadas[:, 0], zoom) - x) * EXTENSAO_TILE,
+            (_lat_para_y(coordenadas[:, 1], zoom) - y) * EXTENSAO_TILE,
+        ])
+
+    feicoes = []
+    for posicao, recorte in zip(posicoes, recortes):
+        comandos = _comandos_geometria(_poligonos(shapely.transform(recorte, para_tile)))
+        if comandos:
+            feicoes.append((None if ids is None else ids[posicao], propriedades[posicao], comandos))
+    return codificar_camada(feicoes, nome_camada) if feicoes else None
+
+def gerar_tiles(geometrias, propriedades, ids=None, zoom_minimo=ZOOM_MINIMO_TILES, zoom_maximo=ZOOM_MAXIMO_TILES,
+                nome_camada=OBJETO_TOPOJSON):
+    """
+    Gera (zoom, x, y, tile MVT sem compressão) para a faixa de zoom. A topologia de arcos
+    compartilhados é extraída uma vez e simplificada por zoom, então regiões vizinhas continuam
+    encaixadas em todos os níveis. Só os tiles com alguma região são gerados.
+    """
+    import shapely
+
+    geometrias = list(geometrias)
+    topologia = extrair_topologia(geometrias)
+    for zoom in range(zoom_minimo, zoom_maximo + 1):
+        simplificadas = np.empty(len(geometrias), dtype=object)
+        simplificadas[:] = simplificar_com_topologia(geometrias, tolerancia_no_zoom(zoom), topologia)
+        limites = shapely.bounds(simplificadas)
+        for (x, y), posicoes in sorted(_tiles_das_geometrias(limites, zoom).items()):
+            tile = codificar_tile(simplificadas, posicoes, propriedades, zoom, x, y, ids, nome_camada)
+            if tile is not None:
+                yield zoom, x, y, tile
+
+# ==============================================================================
+# GRAVAÇÃO E LEITURA (MBTILES OU PASTA)
+# ==============================================================================
+
+def montar_metadados(limites, propriedades, zoom_minimo, zoom_maximo, nome_camada=OBJETO_TOPOJSON,
+                     nome='Regiões imediatas'):
+    """Metadados no formato da especificação MBTiles 1.3 (valores como texto, `json` com as camadas)."""
+    oeste, sul = np.nanmin(limites[:, 0]), np.nanmin(limites[:, 1])
+    leste, norte = np.nanmax(limites[:, 2]), np.nanmax(limites[:, 3])
+    campos = {
+        chave: 'String' if isinstance(valor, str) else 'Number'
+        for chave, valor in (propriedades[0].items() if propriedades else [])
+    }
+    return {
+        'name': nome,
+        'format': 'pbf',
+        'type': 'overlay',
+        'version': '1',
+        'minzoom': str(zoom_minimo),
+        'maxzoom': str(zoom_maximo),
+        'bounds': f'{oeste:.6f},{sul:.6f},{leste:.6f},{norte:.6f}',
+        'center': f'{(oeste + leste) / 2:.6f},{(sul + norte) / 2:.6f},{zoom_minimo}',
+        'json': json.dumps({'vector_layers': [
+            {'id': nome_camada, 'fields': campos, 'minzoom': zoom_minimo, 'maxzoom': zoom_maximo}
+        ]}),
+    }
+
+def gravar_mbtiles(tiles, caminho, metadados):
+    """Grava os tiles (comprimidos em gzip) num MBTiles; linhas do tile no esquema TMS da especificação."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    temporario.unlink(missing_ok=True)
+
+    total, tamanho = 0, 0
+    conexao = sqlite3.connect(temporario)
+    try:
+        conexao.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        """)
+        conexao.executemany('INSERT INTO metadata VALUES (?, ?)', metadados.items())
+        for zoom, x, y, tile in tiles:
+            dados = gzip.compress(tile)
+            conexao.execute('INSERT INTO tiles VALUES (?, ?, ?, ?)', (zoom, x, (1 << zoom) - 1 - y, dados))
+            total += 1
+            tamanho += len(dados)
+        conexao.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+        conexao.commit()
+    finally:
+        conexao.close()
+    # Só substitui o arquivo anterior quando a gravação termina
+    temporario.replace(caminho)
+    return {'tiles': total, 'bytes': tamanho}
+
+def gravar_pasta_tiles(tiles, pasta, metadados):
+    """Grava os tiles (comprimidos em gzip) em `<pasta>/{z}/{x}/{y}.pbf`, com `metadata.json` ao lado."""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    total, tamanho = 0, 0
+    for zoom, x, y, tile in tiles:
+        destino = pasta / str(zoom) / str(x) / f'{y}.pbf'
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        dados = gzip.compress(tile)
+        destino.write_bytes(dados)
+        total += 1
+        tamanho += len(dados)
+    (pasta / 'metadata.json').write_text(json.dumps(metadados, ensure_ascii=False, indent=2), encoding='utf-8')
+    return {'tiles': total, 'bytes': tamanho}
+
+def gravar_tiles(gdf, destino, coluna_codigo='codigo_regiao', coluna_nome='NM_RGINT',
+                 zoom_minimo=ZOOM_MINIMO_TILES, zoom_maximo=ZOOM_MAXIMO_TILES, nome_camada=OBJETO_TOPOJSON):
+    """
+    Gera os tiles vetoriais das geometrias do GeoDataFrame (WGS84) e grava em `destino`: um
+    MBTiles se o nome terminar em `.mbtiles`, senão uma pasta `{z}/{x}/{y}.pbf`. Cada região
+    leva `codigo` (também o id da feição) e `nome`. Retorna {'tiles', 'bytes', 'destino'}.
+    """
+    if zoom_minimo > zoom_maximo:
+        raise ValueError(f"Zoom mínimo ({zoom_minimo}) maior que o máximo ({zoom_maximo})")
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+
+    ids = gdf[coluna_codigo].astype(np.int64).tolist()
+    propriedades = [
+        {'codigo': codigo, 'nome': str(nome)} for codigo, nome in zip(ids, gdf[coluna_nome].tolist())
+    ] if coluna_nome else [{'codigo': codigo} for codigo in ids]
+    metadados = montar_metadados(gdf.geometry.bounds.to_numpy(), propriedades, zoom_minimo, zoom_maximo, nome_camada)
+
+    tiles = gerar_tiles(gdf.geometry, propriedades, ids, zoom_minimo, zoom_maximo, nome_camada)
+    destino = Path(destino)
+    if destino.suffix == '.mbtiles':
+        resumo = gravar_mbtiles(tiles, destino, metadados)
+    else:
+        resumo = gravar_pasta_tiles(tiles, destino, metadados)
+    return dict(resumo, destino=str(destino))
+
+class AcervoTiles:
+    """Leitura dos tiles gravados (MBTiles ou pasta), compartilhável entre threads."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._conexao = None
+        self._trava = threading.Lock()
+        if self.caminho.is_dir():
+            metadados = json.loads((self.caminho / 'metadata.json').read_text(encoding='utf-8'))
+        elif self.caminho.is_file():
+            self._conexao = sqlite3.connect(f'file:{self.caminho}?mode=ro', uri=True, check_same_thread=False)
+            metadados = dict(self._conexao.execute('SELECT name, value FROM metadata').fetchall())
+        else:
+            raise FileNotFoundError(f"Tiles não encontrados: {self.caminho} (gere com `python -m simulador tiles`)")
+
+        self.metadados = metadados
+        self.zoom_minimo = int(metadados.get('minzoom', 0))
+        self.zoom_maximo = int(metadados.get('maxzoom', 22))
+        self.limites = [float(valor) for valor in metadados.get('bounds', '-180,-85,180,85').split(',')]
+        self.camadas = json.loads(metadados['json'])['vector_layers'] if 'json' in metadados else []
+
+    def tile(self, zoom, x, y):
+        """Bytes do tile (comprimido em gzip) ou None se não houver regiões nele."""
+        if self._conexao is None:
+            caminho = self.caminho / str(zoom) / str(x) / f'{y}.pbf'
+            return caminho.read_bytes() if caminho.is_file() else None
+        with self._trava:
+            linha = self._conexao.execute(
+                'SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                (zoom, x, (1 << zoom) - 1 - y),
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
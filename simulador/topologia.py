@@ -0,0 +1,293 @@
+"""
+Topologia de arcos compartilhados das geometrias das regiões e pirâmide de níveis de detalhe.
+
+Cada fronteira entre duas regiões vira um único arco (cortado nos vértices de junção, onde três
+ou mais fronteiras se encontram), referenciado pelas duas regiões - com `~i` quando percorrido no
+sentido inverso, como no TopoJSON. Simplificar os arcos, e não cada polígono, faz as duas regiões
+vizinhas receberem exatamente a mesma fronteira simplificada: sem frestas nem sobreposições.
+
+A pirâmide guarda uma versão das geometrias por tolerância, e o mapa escolhe o nível pelo zoom.
+A mesma topologia é exportada como TopoJSON (arcos compartilhados, coordenadas quantizadas e
+codificadas em deltas), que o mapa consome diretamente. O shapely só é importado ao montar as
+geometrias.
+"""
+
+import numpy as np
+
+# Níveis da pirâmide: (tolerância em graus, zoom máximo do mapa em que o nível é usado).
+# A tolerância acompanha o tamanho de um pixel no zoom (~360 / (256 · 2^zoom) graus).
+NIVEIS_PIRAMIDE = (
+    (0.05, 4),     # Visão nacional
+    (0.02, 6),     # Macrorregiões e estados
+    (0.005, 8),    # Estados e regiões intermediárias
+    (0.001, None), # Visão regional (qualquer zoom acima)
+)
+
+# Passos da grade de quantização do TopoJSON em cada eixo da caixa envolvente
+# (Brasil: ~40° / 1e5 ≈ 0,0004°, abaixo de um pixel até o zoom 11)
+QUANTIZACAO_TOPOJSON = 100_000
+
+# Nome do objeto com as regiões dentro do TopoJSON
+OBJETO_TOPOJSON = 'regioes'
+
+def nivel_para_zoom(zoom, niveis=NIVEIS_PIRAMIDE):
+    """Índice do nível da pirâmide para um zoom do mapa (o mais detalhado se o zoom passar de todos)."""
+    for nivel, (_, zoom_maximo) in enumerate(niveis):
+        if zoom_maximo is None or zoom <= zoom_maximo:
+            return nivel
+    return len(niveis) - 1
+
+def _aneis_da_geometria(geometria):
+    """Polígonos da geometria como listas de anéis (exterior primeiro), sem o vértice de fechamento."""
+    poligonos = geometria.geoms if geometria.geom_type == 'MultiPolygon' else [geometria]
+    return [
+        [np.asarray(anel.coords)[:-1] for anel in [poligono.exterior, *poligono.interiors]]
+        for poligono in poligonos if not poligono.is_empty
+    ]
+
+def extrair_topologia(geometrias):
+    """
+    Topologia de arcos compartilhados de uma sequência de (Multi)Polygons.
+
+    Retorna {'arcos': lista de arrays (n, 2), 'geometrias': por geometria, lista de polígonos,
+    cada um uma lista de anéis, cada anel uma lista de referências a arcos (`i` ou `~i`)}.
+    Vértices são comparados por coordenada exata: fronteiras compartilhadas precisam ter os
+    mesmos vértices nas duas regiões (ver a quantização em `create_ultra_light_geometry.py`).
+    """
+    estrutura = [_aneis_da_geometria(geometria) for geometria in geometrias]
+    aneis = [anel for poligonos in estrutura for aneis_poligono in poligonos for anel in aneis_poligono]
+    if not aneis:
+        return {'arcos': [], 'geometrias': [[] for _ in estrutura]}
+
+    # Identificador inteiro por coordenada distinta
+    coordenadas = np.concatenate(aneis)
+    vertices, ids = np.unique(coordenadas, axis=0, return_inverse=True)
+    ids = ids.ravel()
+    inicios = np.cumsum([0] + [len(anel) for anel in aneis])
+
+    # Grau de cada vértice no grafo de arestas (sem repetição): junções têm três ou mais vizinhos
+    origem = ids
+    destino = np.concatenate([np.roll(ids[inicio:fim], -1) for inicio, fim in zip(inicios[:-1], inicios[1:])])
+    arestas = np.unique(np.sort(np.column_stack([origem, destino]), axis=1), axis=0)
+    arestas = arestas[arestas[:, 0] != arestas[:, 1]]
+    grau = np.bincount(arestas.ravel(), minlength=len(vertices))
+    juncao = grau >= 3
+
+    arcos, indice_arcos = [], {}
+
+    def referencia(ids_arco):
+        chave = tuple(ids_arco)
+        if chave in indice_arcos:
+            return indice_arcos[chave]
+        chave_inversa = chave[::-1]
+        if chave_inversa in indice_arcos:
+            return ~indice_arcos[chave_inversa]
+        indice_arcos[chave] = len(arcos)
+        arcos.append(vertices[list(chave)])
+        return indice_arcos[chave]
+
+    referencias_aneis = []
+    for inicio, fim in zip(inicios[:-1], inicios[1:]):
+        ids_anel = ids[inicio:fim]
+        posicoes_juncao = np.flatnonzero(juncao[ids_anel])
+        if len(posicoes_juncao) == 0:
+            # Anel sem junções (ilha, enclave): um único arco fechado com início canônico
+            deslocamento = int(np.argmin(ids_anel))
+            ids_anel = np.roll(ids_anel, -deslocamento)
+            referencias_aneis.append([referencia(np.append(ids_anel, ids_anel[0]))])
+            continue
+
+        ids_anel = np.roll(ids_anel, -posicoes_juncao[0])
+        posicoes_juncao = np.append(posicoes_juncao - posicoes_juncao[0], len(ids_anel))
+        ids_fechado = np.append(ids_anel, ids_anel[0])
+        referencias_aneis.append([
+            referencia(ids_fechado[de:ate + 1]) for de, ate in zip(posicoes_juncao[:-1], posicoes_juncao[1:])
+        ])
+
+    # Reagrupa os anéis por polígono e por geometria
+    geometrias_topologia, proximo = [], 0
+    for poligonos in estrutura:
+        geometria_topologia = []
+        for aneis_poligono in poligonos:
+            geometria_topologia.append(referencias_aneis[proximo:proximo + len(aneis_poligono)])
+            proximo += len(aneis_poligono)
+        geometrias_topologia.append(geometria_topologia)
+
+    return {'arcos': arcos, 'geometrias': geometrias_topologia}
+
+def simplificar_arcos(arcos, tolerancia):
+    """
+    Douglas-Peucker em cada arco, mantendo as extremidades (as junções). Arcos fechados (anéis
+    inteiros) são simplificados como anel válido.
+    """
+    from shapely.geometry import LinearRing, LineString
+
+    simplificados = []
+    for arco in arcos:
+        if len(arco) <= 2:
+            simplificados.append(arco)
+        elif len(arco) >= 4 and np.array_equal(arco[0], arco[-1]):
+            simplificados.append(np.asarray(LinearRing(arco).simplify(tolerancia, preserve_topology=True).coords))
+        else:
+            simplificados.append(np.asarray(LineString(arco).simplify(tolerancia, preserve_topology=False).coords))
+    return simplificados
+
+def montar_anel(arcos, referencias):
+    """Coordenadas do anel fechado formado pelos arcos referenciados (em ordem, invertidos se `~i`)."""
+    partes = []
+    for posicao, ref in enumerate(referencias):
+        arco = arcos[ref] if ref >= 0 else arcos[~ref][::-1]
+        partes.append(arco if posicao == 0 else arco[1:])
+    return np.concatenate(partes)
+
+def _apenas_poligonos(geometria):
+    """Parte poligonal de uma geometria (o make_valid pode devolver coleções com linhas)."""
+    from shapely.geometry import MultiPolygon
+
+    if geometria.geom_type in ('Polygon', 'MultiPolygon'):
+        return geometria
+    poligonos = []
+    for parte in getattr(geometria, 'geoms', []):
+        if parte.geom_type == 'Polygon':
+            poligonos.append(parte)
+        elif parte.geom_type == 'MultiPolygon':
+            poligonos.extend(parte.geoms)
+    return MultiPolygon(poligonos)
+
+def montar_geometrias(topologia, arcos=None):
+    """
+    (Multi)Polygons a partir da topologia, com os arcos dados (ex.: simplificados). Anéis que
+    degeneram (menos de 3 vértices distintos) são descartados - ou, no exterior, substituídos
+    pelo anel original - e geometrias inválidas são reparadas.
+    """
+    from shapely.geometry import MultiPolygon, Polygon
+    from shapely.validation import make_valid
+
+    originais = topologia['arcos']
+    arcos = originais if arcos is None else arcos
+
+    geometrias = []
+    for poligonos in topologia['geometrias']:
+        partes = []
+        for aneis in poligonos:
+            exterior = montar_anel(arcos, aneis[0])
+            if len(exterior) < 4:
+                exterior = montar_anel(originais, aneis[0])
+            furos = [furo for furo in (montar_anel(arcos, anel) for anel in aneis[1:]) if len(furo) >= 4]
+            partes.append(Polygon(exterior, furos))
+
+        if not partes:
+            geometrias.append(Polygon())
+            continue
+        geometria = partes[0] if len(partes) == 1 else MultiPolygon(partes)
+        if not geometria.is_valid:
+            geometria = _apenas_poligonos(make_valid(geometria))
+        geometrias.append(geometria)
+    return geometrias
+
+def simplificar_com_topologia(geometrias, tolerancia, topologia=None):
+    """Simplifica as geometrias pelos arcos compartilhados (vizinhas continuam encaixadas)."""
+    if topologia is None:
+        topologia = extrair_topologia(geometrias)
+    return montar_geometrias(topologia, simplificar_arcos(topologia['arcos'], tolerancia))
+
+def construir_piramide(geometrias, niveis=NIVEIS_PIRAMIDE):
+    """Uma lista de geometrias simplificadas por nível da pirâmide (a topologia é extraída uma vez)."""
+    topologia = extrair_topologia(geometrias)
+    return [simplificar_com_topologia(geometrias, tolerancia, topologia) for tolerancia, _ in niveis]
+
+def codificar_topojson(topologia, arcos=None, propriedades=None, ids=None, quantizacao=QUANTIZACAO_TOPOJSON,
+                       nome_objeto=OBJETO_TOPOJSON):
+    """
+    TopoJSON (dict) da topologia: arcos quantizados numa grade de `quantizacao` passos por eixo e
+    codificados em deltas, e uma GeometryCollection com as referências de cada região.
+    `propriedades` (lista de dicts) e `ids` seguem a ordem das geometrias.
+    """
+    arcos = topologia['arcos'] if arcos is None else arcos
+    todos = np.concatenate(arcos) if arcos else np.zeros((1, 2))
+    minimo, maximo = todos.min(axis=0), todos.max(axis=0)
+    escala = np.where(maximo > minimo, (maximo - minimo) / (quantizacao - 1), 1.0)
+
+    arcos_codificados = []
+    for arco in arcos:
+        quantizado = np.round((arco - minimo) / escala).astype(np.int64)
+        # Pontos que caem na mesma célula da grade viram um só (as extremidades ficam)
+        manter = np.ones(len(quantizado), dtype=bool)
+        manter[1:] = (np.diff(quantizado, axis=0) != 0).any(axis=1)
+        manter[-1] = True
+        quantizado = quantizado[manter]
+        arcos_codificados.append(np.vstack([quantizado[:1], np.diff(quantizado, axis=0)]).tolist())
+
+    geometrias = []
+    for posicao, poligonos in enumerate(topologia['geometrias']):
+        if not poligonos:
+            geometria = {'type': None}
+        elif len(poligonos) == 1:
+            geometria = {'type': 'Polygon', 'arcs': poligonos[0]}
+        else:
+            geometria = {'type': 'MultiPolygon', 'arcs': poligonos}
+        if ids is not None:
+            geometria['id'] = ids[posicao]
+        if propriedades is not None:
+            geometria['properties'] = propriedades[posicao]
+        geometrias.append(geometria)
+
+    return {
+        'type': 'Topology',
+        'bbox': [float(minimo[0]), float(minimo[1]), float(maximo[0]), float(maximo[1])],
+        'transform': {'scale': [float(escala[0]), float(escala[1])], 'translate': [float(minimo[0]), float(minimo[1])]},
+        'objects': {nome_objeto: {'type': 'GeometryCollection', 'geometries': geometrias}},
+        'arcs': arcos_codificados,
+    }
+
+def geometrias_para_topojson(geometrias, propriedades=None, ids=None, tolerancia=None, quantizacao=QUANTIZACAO_TOPOJSON):
+    """TopoJSON de uma sequência de (Multi)Polygons, opcionalmente simplificada pelos arcos."""
+    topologia = extrair_topologia(geometrias)
+    arcos = simplificar_arcos(topologia['arcos'], tolerancia) if tolerancia else None
+    return codificar_topojson(topologia, arcos, propriedades, ids, quantizacao)
+
+def _remapear_referencias(referencias, novo_indice):
+    """Reescreve referências aninhadas (anéis, polígonos) com os novos índices dos arcos."""
+    return [
+        _remapear_referencias(ref, novo_indice) if isinstance(ref, list)
+        else (novo_indice[ref] if ref >= 0 else ~novo_indice[~ref])
+        for ref in referencias
+    ]
+
+def _arcos_usados(referencias):
+    """Índices (sem o sentido) dos arcos em referências aninhadas de anéis e polígonos."""
+    for ref in referencias:
+        if isinstance(ref, list):
+            yield from _arcos_usados(ref)
+        else:
+            yield ref if ref >= 0 else ~ref
+
+def recortar_topojson(topojson, posicoes=None, propriedades=None, nome_objeto=OBJETO_TOPOJSON):
+    """
+    Novo TopoJSON só com as geometrias nas `posicoes` (todas, se None) e os arcos que elas usam,
+    com `propriedades` (uma por geometria escolhida) no lugar das originais. O original não é
+    alterado, então pode ficar em cache.
+    """
+    geometrias = topojson['objects'][nome_objeto]['geometries']
+    if posicoes is not None:
+        geometrias = [geometrias[posicao] for posicao in posicoes]
+
+    usados = sorted({arco for geometria in geometrias for arco in _arcos_usados(geometria.get('arcs', []))})
+    novo_indice = {arco: posicao for posicao, arco in enumerate(usados)}
+
+    recortadas = []
+    for posicao, geometria in enumerate(geometrias):
+        recortada = {chave: valor for chave, valor in geometria.items() if chave not in ('arcs', 'properties')}
+        if 'arcs' in geometria:
+            recortada['arcs'] = _remapear_referencias(geometria['arcs'], novo_indice)
+        if propriedades is not None:
+            recortada['properties'] = propriedades[posicao]
+        elif 'properties' in geometria:
+            recortada['properties'] = dict(geometria['properties'])
+        recortadas.append(recortada)
+
+    return {
+        **{chave: valor for chave, valor in topojson.items() if chave not in ('objects', 'arcs')},
+        'objects': {nome_objeto: {'type': 'GeometryCollection', 'geometries': recortadas}},
+        'arcs': [topojson['arcs'][arco] for arco in usados],
+    }
@@ -0,0 +1,26 @@
+"""Bandas de incerteza (Monte Carlo) contra o modelo determinístico."""
+
+import numpy as np
+import pytest
+
+from simulador import (calcular_multiplicadores, carregar_dados_geograficos, carregar_dados_reais_ibge,
+                       carregar_matriz_distancias, simular_incerteza)
+
+@pytest.fixture(scope='module')
+def incerteza():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    return simular_incerteza(df_economia, gdf, 100.0, 'Indústria', 320007, carregar_matriz_distancias(gdf),
+                             num_amostras=1000, semente=7)
+
+def test_mediana_dos_multiplicadores_proxima_do_modelo_deterministico(incerteza):
+    multiplicadores = incerteza['multiplicadores'].set_index('setor')
+    deterministicos = calcular_multiplicadores()
+    # Ruído lognormal com mediana 1: a mediana das amostras fica perto do valor pontual
+    np.testing.assert_allclose(multiplicadores['p50'], deterministicos.reindex(multiplicadores.index), rtol=0.02)
+
+def test_percentis_ordenados(incerteza):
+    for tabela in (incerteza['multiplicadores'], incerteza['totais'], incerteza['regioes']):
+        assert (tabela['p5'] <= tabela['p50']).all()
+        assert (tabela['p50'] <= tabela['p95']).all()
+    assert (incerteza['multiplicadores']['p5'] < incerteza['multiplicadores']['p95']).all()
@@ -0,0 +1,35 @@
+"""Modelo interregional (MRIO): armazenamentos e métodos de resolução equivalentes."""
+
+import numpy as np
+import pytest
+
+from simulador import (carregar_dados_geograficos, carregar_dados_reais_ibge, carregar_matriz_distancias,
+                       executar_simulacao_interregional, montar_modelo_interregional, resolver_leontief, setores)
+
+@pytest.fixture(scope='module')
+def contexto():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    matriz_distancias = carregar_matriz_distancias(gdf)
+    densa = montar_modelo_interregional(df_economia, matriz_distancias, armazenamento='densa')
+    resultado_denso = executar_simulacao_interregional(df_economia, gdf, 100.0, 'Indústria', 320007, densa)
+    return gdf, df_economia, matriz_distancias, resultado_denso
+
+def test_auto_escolhe_densa_com_os_dados_embarcados(contexto):
+    _, df_economia, matriz_distancias, _ = contexto
+    modelo = montar_modelo_interregional(df_economia, matriz_distancias)
+    assert modelo['armazenamento'] == 'densa'
+
+@pytest.mark.parametrize('metodo', ['lu', 'gmres'])
+def test_armazenamento_esparso_reproduz_o_denso(contexto, metodo):
+    gdf, df_economia, matriz_distancias, (resultados_densos, nacionais_densos, _) = contexto
+    modelo = montar_modelo_interregional(df_economia, matriz_distancias, metodo=metodo, armazenamento='esparsa')
+    assert modelo['armazenamento'] == 'esparsa'
+    resultados, nacionais, _ = executar_simulacao_interregional(df_economia, gdf, 100.0, 'Indústria', 320007, modelo)
+
+    np.testing.assert_allclose(nacionais, nacionais_densos, rtol=1e-8)
+    # Os totais nacionais por setor fecham com o Leontief nacional
+    np.testing.assert_allclose(nacionais, resolver_leontief(np.eye(len(setores))[setores.index('Indústria')] * 100.0),
+                               rtol=1e-8)
+    np.testing.assert_allclose(resultados['impacto_producao'].to_numpy(),
+                               resultados_densos['impacto_producao'].to_numpy(), rtol=1e-6, atol=1e-9)
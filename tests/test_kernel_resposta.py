@@ -0,0 +1,42 @@
+"""Kernel de resposta unitária contra a distribuição calculada pelo laço por setor."""
+
+import numpy as np
+import pytest
+
+from simulador import (carregar_dados_geograficos, carregar_dados_reais_ibge, carregar_matriz_distancias,
+                       executar_simulacao_avancada, fator_atrito, obter_kernel_resposta)
+from simulador.dados import DIRETORIO_CACHE
+
+@pytest.fixture(scope='module')
+def contexto():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    matriz_distancias = carregar_matriz_distancias(gdf)
+    kernel = obter_kernel_resposta(df_economia, matriz_distancias, DIRETORIO_CACHE)
+    return gdf, df_economia, matriz_distancias, kernel
+
+@pytest.mark.parametrize('setor, regiao, valor', [
+    ('Indústria', 320007, 100.0),
+    ('Agropecuária', 'Itabaiana', 2.5),
+    ('Serviços', 110001, 1e4),
+])
+def test_kernel_reproduz_o_laco_em_float32(contexto, setor, regiao, valor):
+    gdf, df_economia, matriz_distancias, kernel = contexto
+    por_laco, impactos, _ = executar_simulacao_avancada(df_economia, gdf, valor, setor, regiao, matriz_distancias)
+    por_kernel, impactos_kernel, _ = executar_simulacao_avancada(df_economia, gdf, valor, setor, regiao,
+                                                                 matriz_distancias, kernel_resposta=kernel)
+
+    np.testing.assert_array_equal(impactos_kernel, impactos)
+    esperado = por_laco['impacto_producao'].to_numpy()
+    obtido = por_kernel['impacto_producao'].to_numpy()
+    np.testing.assert_allclose(obtido, esperado, rtol=5e-7, atol=valor * 1e-12)
+    assert obtido.sum() == pytest.approx(esperado.sum(), rel=1e-6)
+
+def test_atrito_diferente_do_padrao_ignora_o_kernel(contexto):
+    gdf, df_economia, matriz_distancias, kernel = contexto
+    atrito = fator_atrito * 2
+    por_laco, _, _ = executar_simulacao_avancada(df_economia, gdf, 100.0, 'Indústria', 320007,
+                                                 matriz_distancias, atrito=atrito)
+    com_kernel, _, _ = executar_simulacao_avancada(df_economia, gdf, 100.0, 'Indústria', 320007,
+                                                   matriz_distancias, kernel_resposta=kernel, atrito=atrito)
+    np.testing.assert_array_equal(com_kernel['impacto_producao'].to_numpy(), por_laco['impacto_producao'].to_numpy())
@@ -0,0 +1,81 @@
+"""
+Matriz de coeficientes n×n (`SIMULADOR_MATRIZ_A`) contra os setores de df_economia.
+
+O modelo lê a matriz na importação, então cada caso roda num processo Python separado.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+SETORES_5 = ['Agropecuária', 'Indústria', 'Extrativa', 'Construção', 'Serviços']
+
+def _gravar_matriz_5x5(caminho):
+    matriz = pd.DataFrame({
+        'Agropecuária': [0.201, 0.155, 0.010, 0.002, 0.117],
+        'Indústria':    [0.085, 0.351, 0.060, 0.004, 0.160],
+        'Extrativa':    [0.002, 0.120, 0.080, 0.010, 0.140],
+        'Construção':   [0.003, 0.298, 0.050, 0.001, 0.145],
+        'Serviços':     [0.012, 0.105, 0.005, 0.008, 0.245],
+    }, index=SETORES_5)
+    matriz.to_csv(caminho)
+    return caminho
+
+def _executar(codigo, caminho_matriz):
+    ambiente = dict(os.environ, SIMULADOR_MATRIZ_A=str(caminho_matriz))
+    processo = subprocess.run(
+        [sys.executable, '-c', textwrap.dedent(codigo)],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, timeout=600,
+    )
+    return processo
+
+def test_setores_dos_dados_diferentes_da_matriz_levantam_erro(tmp_path):
+    processo = _executar("""
+        from simulador import carregar_dados_geograficos, carregar_dados_reais_ibge
+
+        carregar_dados_reais_ibge(carregar_dados_geograficos())
+    """, _gravar_matriz_5x5(tmp_path / 'matriz.csv'))
+
+    assert processo.returncode != 0
+    assert 'ValueError' in processo.stderr
+    assert 'setores da matriz sem dados econômicos: Extrativa' in processo.stderr
+
+def test_simulacao_avancada_com_matriz_5x5(tmp_path):
+    processo = _executar("""
+        import json
+
+        import numpy as np
+
+        from simulador import (anexar_codigos_economia, carregar_dados_geograficos,
+                               executar_simulacao_avancada, resolver_leontief, setores)
+        from simulador.dados import gerar_dados_sinteticos_fallback
+
+        gdf = carregar_dados_geograficos()
+        df_economia = anexar_codigos_economia(gerar_dados_sinteticos_fallback(gdf), gdf)
+        resultados, impactos, _ = executar_simulacao_avancada(df_economia, gdf, 100.0, 'Extrativa', 320007)
+
+        por_setor = resultados.groupby('setor', observed=False)['impacto_producao'].sum()
+        print(json.dumps({
+            'setores': list(setores),
+            'impactos_nacionais': impactos.tolist(),
+            'esperado': resolver_leontief(np.eye(len(setores))[setores.index('Extrativa')] * 100.0).tolist(),
+            'por_setor': {setor: float(valor) for setor, valor in por_setor.items()},
+        }))
+    """, _gravar_matriz_5x5(tmp_path / 'matriz.csv'))
+
+    assert processo.returncode == 0, processo.stderr
+    saida = json.loads(processo.stdout.strip().splitlines()[-1])
+    assert saida['setores'] == SETORES_5
+    assert saida['impactos_nacionais'] == pytest.approx(saida['esperado'])
+    # O efeito cascata chega a todos os setores, e a soma regional fecha com o total nacional
+    for setor, total in zip(SETORES_5, saida['esperado']):
+        assert saida['por_setor'][setor] > 0
+        assert saida['por_setor'][setor] == pytest.approx(total, rel=1e-9)
@@ -0,0 +1,56 @@
+"""Memo LRU de simulações: limites de entradas e de bytes e reaproveitamento da resposta unitária."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulador import (MemoSimulacoes, carregar_dados_geograficos, carregar_dados_reais_ibge,
+                       executar_simulacao_avancada, executar_simulacao_memoizada)
+from simulador.memo import _tamanho_resultado
+
+def _resultado(linhas):
+    return pd.DataFrame({'impacto_producao': np.ones(linhas)}), np.ones(4), {'impacto_producao': [0.0, 1.0]}
+
+def test_descarta_o_menos_usado_pelo_numero_de_entradas():
+    memo = MemoSimulacoes(max_entradas=2, max_bytes=10 ** 9)
+    memo.guardar('a', _resultado(10))
+    memo.guardar('b', _resultado(10))
+    assert memo.obter('a') is not None  # 'a' passa a ser a mais recente
+    memo.guardar('c', _resultado(10))
+
+    assert memo.obter('b') is None
+    assert memo.obter('a') is not None and memo.obter('c') is not None
+    estatisticas = memo.estatisticas()
+    assert estatisticas['entradas'] == 2
+    assert (estatisticas['acertos'], estatisticas['falhas']) == (3, 1)
+
+def test_descarta_o_menos_usado_pelo_limite_de_bytes():
+    tamanho = _tamanho_resultado(_resultado(1000))
+    memo = MemoSimulacoes(max_entradas=100, max_bytes=int(2.5 * tamanho))
+    for chave in 'abc':
+        memo.guardar(chave, _resultado(1000))
+
+    assert memo.obter('a') is None
+    assert memo.obter('b') is not None and memo.obter('c') is not None
+    assert memo.estatisticas()['bytes'] == 2 * tamanho
+
+    # Maior que o memo inteiro: não é guardado nem descarta as demais entradas
+    memo.guardar('grande', _resultado(10 ** 5))
+    assert memo.obter('grande') is None
+    assert memo.estatisticas()['entradas'] == 2
+
+def test_valores_diferentes_reaproveitam_a_resposta_unitaria():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    memo = MemoSimulacoes()
+
+    resultados, impactos, _ = executar_simulacao_memoizada(df_economia, gdf, 250.0, 'Serviços', 320007, memo=memo)
+    unitarios, _, _ = executar_simulacao_memoizada(df_economia, gdf, 1.0, 'Serviços', 'Campinas', memo=memo)
+    esperados, impactos_esperados, _ = executar_simulacao_avancada(df_economia, gdf, 250.0, 'Serviços', 320007)
+
+    assert memo.estatisticas()['entradas'] == 1
+    assert (memo.acertos, memo.falhas) == (1, 1)
+    np.testing.assert_allclose(impactos, impactos_esperados, rtol=1e-12)
+    np.testing.assert_allclose(resultados['impacto_producao'], esperados['impacto_producao'], rtol=1e-9)
+    np.testing.assert_allclose(resultados['impacto_producao'], unitarios['impacto_producao'] * 250.0, rtol=1e-12)
+    assert resultados['impacto_producao'].sum() == pytest.approx(impactos.sum(), rel=1e-9)
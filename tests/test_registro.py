@@ -0,0 +1,90 @@
+"""Registro compacto de simulações: junção das tabelas por região com as geometrias."""
+
+import numpy as np
+import pytest
+
+from simulador import (IndiceResultados, RegistroSimulacao, anexar_codigos_economia, carregar_dados_geograficos,
+                       carregar_dados_reais_ibge, executar_simulacao_avancada, setores)
+
+@pytest.fixture(scope='module')
+def contexto():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    resultados, _, all_bins = executar_simulacao_avancada(df_economia, gdf, 100.0, 'Indústria', 320007)
+    registro = RegistroSimulacao(IndiceResultados(df_economia), resultados, all_bins, valor=100.0,
+                                 regiao='Campinas', codigo_regiao=320007)
+    return gdf, df_economia, registro
+
+def test_toda_regiao_do_mapa_recebe_valores(contexto):
+    gdf, _, registro = contexto
+    codigos = gdf['codigo_regiao'].to_numpy()
+
+    por_regiao = registro.resumo.por_regiao
+    assert por_regiao.index.is_unique
+    posicoes = por_regiao.index.get_indexer(codigos)
+    assert (posicoes >= 0).all()
+    valores = por_regiao['impacto_producao'].to_numpy()[posicoes]
+    assert not np.isnan(valores).any()
+    assert (valores > 0).all()
+
+    rotulos = registro.tabela_tooltip().reindex(codigos)
+    assert not rotulos.isna().any().any()
+
+def test_regioes_com_nome_corrigido_sao_juntadas_pelo_codigo(contexto):
+    gdf, _, registro = contexto
+    por_regiao = registro.resumo.por_regiao
+    # Nomes ASCII no shapefile, corrigidos (com acento) nos dados econômicos
+    for nome in ['SAo Paulo', 'RibeirAo Preto', 'SAo JosA dos Campos', 'BrasilAia', 'SAo LuAs']:
+        codigo = gdf.loc[gdf['NM_RGINT'] == nome, 'codigo_regiao'].iat[0]
+        assert por_regiao.at[codigo, 'impacto_producao'] > 0
+        assert por_regiao.at[codigo, 'regiao'] != nome
+
+def test_spillover_zera_apenas_a_origem(contexto):
+    _, _, registro = contexto
+    por_regiao = registro.resumo.por_regiao
+    assert por_regiao.at[320007, 'spillover_relativo'] == 0
+    assert (por_regiao['spillover_relativo'].drop(320007) > 0).all()
+
+def test_nomes_repetidos_sao_regioes_distintas(contexto):
+    gdf, df_economia, registro = contexto
+    por_regiao = registro.resumo.por_regiao
+    itabaiana = por_regiao[por_regiao['regiao'] == 'Itabaiana']
+    assert len(itabaiana) == 2
+    assert set(itabaiana.index) == set(gdf.loc[gdf['NM_RGINT'] == 'Itabaiana', 'codigo_regiao'])
+    # Cada uma soma só as próprias linhas
+    for codigo, linha in itabaiana.iterrows():
+        assert linha['vab_baseline'] == pytest.approx(df_economia.loc[df_economia['codigo_regiao'] == codigo, 'vab'].sum())
+
+def test_casamento_por_nome_separa_nomes_repetidos(contexto):
+    gdf, df_economia, _ = contexto
+    # Blocos fora da ordem do GeoDataFrame: a junção cai no casamento por nome
+    colunas = ['regiao', 'setor', 'vab', 'empregos', 'empresas', 'share_nacional']
+    embaralhado = df_economia[colunas].iloc[::-1].reset_index(drop=True)
+    embaralhado['regiao'] = embaralhado['regiao'].astype(str)
+    embaralhado['setor'] = embaralhado['setor'].astype(str)
+    juntado = anexar_codigos_economia(embaralhado, gdf)
+
+    assert (juntado['idx_regiao'] >= 0).all()
+    assert juntado.groupby('idx_regiao').size().eq(len(setores)).all()
+    assert juntado.loc[juntado['regiao'] == 'Itabaiana', 'idx_regiao'].nunique() == 2
+
+def test_reescalado_equivale_a_simular_com_o_valor(contexto):
+    gdf, df_economia, registro = contexto
+    indice = registro.indice
+    resultados_unitarios, _, bins_unitarios = executar_simulacao_avancada(df_economia, gdf, 1.0, 'Indústria', 320007)
+    unitario = RegistroSimulacao(indice, resultados_unitarios, bins_unitarios, valor=1.0, regiao='Campinas')
+
+    reescalado = unitario.reescalado(100.0, regiao='Campinas', codigo_regiao=320007)
+    assert reescalado.valor == 100.0
+    assert reescalado.classes is unitario.classes
+    for indicador, valores in registro.impactos.items():
+        np.testing.assert_allclose(reescalado.impactos[indicador], valores, rtol=1e-6)
+        assert reescalado.total(indicador) == pytest.approx(registro.total(indicador), rel=1e-6)
+        # Faixas escalam com o valor; classes só divergem por arredondamento em valores sobre um limite
+        np.testing.assert_allclose(reescalado.all_bins[indicador], registro.all_bins[indicador], rtol=1e-6)
+        assert (reescalado.classes[indicador] == registro.classes[indicador]).mean() > 0.99
+    np.testing.assert_allclose(reescalado.resumo.por_regiao['spillover_relativo'],
+                               registro.resumo.por_regiao['spillover_relativo'], rtol=1e-6)
+
+    with pytest.raises(ValueError):
+        unitario.reescalado(0.0)
@@ -0,0 +1,35 @@
+"""Varredura do fator de atrito contra simulações completas com o mesmo β."""
+
+import numpy as np
+import pytest
+
+from simulador import (carregar_dados_geograficos, carregar_dados_reais_ibge, carregar_matriz_distancias,
+                       executar_simulacao_avancada, fator_atrito, varrer_fator_atrito)
+
+@pytest.fixture(scope='module')
+def contexto():
+    gdf = carregar_dados_geograficos()
+    df_economia = carregar_dados_reais_ibge(gdf)
+    matriz_distancias = carregar_matriz_distancias(gdf)
+    varredura = varrer_fator_atrito(df_economia, gdf, 100.0, 'Construção', 320007, matriz_distancias,
+                                    valores_atrito=[0.1, 1.2])
+    return gdf, df_economia, matriz_distancias, varredura
+
+def _producao_por_regiao(gdf, df_resultados):
+    producao = np.zeros(len(gdf))
+    np.add.at(producao, df_resultados['idx_regiao'].to_numpy(), df_resultados['impacto_producao'].to_numpy())
+    return producao
+
+def test_grade_inclui_o_fator_padrao(contexto):
+    *_, varredura = contexto
+    assert np.isclose(varredura['valores_atrito'], fator_atrito).any()
+    assert len(varredura['resumo']) == 3
+
+@pytest.mark.parametrize('atrito', [fator_atrito, 1.2])
+def test_varredura_coincide_com_a_simulacao_completa(contexto, atrito):
+    gdf, df_economia, matriz_distancias, varredura = contexto
+    linha = int(np.flatnonzero(np.isclose(varredura['valores_atrito'], atrito))[0])
+    resultados, _, _ = executar_simulacao_avancada(df_economia, gdf, 100.0, 'Construção', 320007,
+                                                   matriz_distancias, atrito=atrito)
+    np.testing.assert_allclose(varredura['impacto_por_regiao'][linha], _producao_por_regiao(gdf, resultados),
+                               rtol=1e-9, atol=1e-12)
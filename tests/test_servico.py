@@ -0,0 +1,56 @@
+"""Serviço HTTP local: /simular, lote em NDJSON e erros de validação."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from simulador.servico import ServicoSimulador
+
+@pytest.fixture(scope='module')
+def url_servico():
+    servidor = ServicoSimulador(('127.0.0.1', 0), workers=2, tamanho_bloco=2)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+def _post(url, corpo, tipo='application/json'):
+    requisicao = urllib.request.Request(url, data=corpo.encode('utf-8'), headers={'Content-Type': tipo})
+    with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+        return resposta.status, resposta.headers.get('Content-Type'), resposta.read().decode('utf-8')
+
+def test_simular_retorna_impactos(url_servico):
+    status, _, corpo = _post(f"{url_servico}/simular",
+                             json.dumps({'regiao': 320007, 'setor': 'Indústria', 'valor': 100}))
+    resposta = json.loads(corpo)
+    assert status == 200
+    assert len(resposta['impacto_producao']) == len(resposta['codigo_regiao'])
+    assert resposta['totais']['impacto_producao'] == pytest.approx(
+        sum(resposta['impactos_setoriais_nacionais'].values()), rel=1e-5)
+
+def test_lote_ndjson_transmite_um_cenario_por_linha_em_ordem(url_servico):
+    choques = [{'cenario_id': str(i), 'regiao': 320007, 'setor': 'Serviços', 'valor': 10 * (i + 1)} for i in range(5)]
+    status, tipo, corpo = _post(f"{url_servico}/simular/lote",
+                                '\n'.join(json.dumps(choque) for choque in choques), 'application/x-ndjson')
+    linhas = [json.loads(linha) for linha in corpo.splitlines()]
+    assert status == 200
+    assert tipo.startswith('application/x-ndjson')
+    assert [linha['cenario_id'] for linha in linhas] == ['0', '1', '2', '3', '4']
+    totais = [linha['totais']['impacto_producao'] for linha in linhas]
+    assert totais[4] == pytest.approx(5 * totais[0], rel=1e-5)
+
+@pytest.mark.parametrize('rota, corpo', [
+    ('/simular', {'regiao': 999999, 'setor': 'Indústria', 'valor': 100}),
+    ('/simular', {'regiao': 320007, 'setor': 'Mineração', 'valor': 100}),
+    ('/simular/lote', {'choques': [{'regiao': 320007, 'setor': 'Indústria', 'valor': 1},
+                                   {'regiao': 'Atlântida', 'setor': 'Indústria', 'valor': 1}]}),
+])
+def test_choque_invalido_retorna_400(url_servico, rota, corpo):
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        _post(f"{url_servico}{rota}", json.dumps(corpo))
+    assert erro.value.code == 400
+    assert 'erro' in json.loads(erro.value.read().decode('utf-8'))
@@ -0,0 +1,31 @@
+"""Simulações em lote: choques vetorizados e regiões de origem desconhecidas."""
+
+import numpy as np
+import pytest
+
+from simulador import carregar_dados_geograficos, carregar_dados_reais_ibge, executar_simulacoes_em_lote
+
+CHOQUES = [(320007, 'Indústria', 100.0), (999999, 'Indústria', 100.0), ('Campinas', 'Serviços', 50.0)]
+
+@pytest.fixture(scope='module')
+def contexto():
+    gdf = carregar_dados_geograficos()
+    return gdf, carregar_dados_reais_ibge(gdf)
+
+def test_origem_desconhecida_levanta_erro(contexto):
+    gdf, df_economia = contexto
+    with pytest.raises(ValueError, match='999999'):
+        executar_simulacoes_em_lote(df_economia, gdf, CHOQUES)
+
+def test_origem_desconhecida_ignorada_fica_fora_do_resultado(contexto):
+    gdf, df_economia = contexto
+    resultado = executar_simulacoes_em_lote(df_economia, gdf, CHOQUES, ignorar_desconhecidas=True)
+    validos = executar_simulacoes_em_lote(df_economia, gdf, [CHOQUES[0], CHOQUES[2]])
+
+    assert resultado['posicoes_rejeitadas'].tolist() == [1]
+    assert resultado['choques']['regiao'].tolist() == [320007, 'Campinas']
+    assert (resultado['choques']['posicao_origem'] >= 0).all()
+    np.testing.assert_array_equal(resultado['impacto_producao'], validos['impacto_producao'])
+    # A produção distribuída fecha com o total nacional de cada choque aceito
+    np.testing.assert_allclose(resultado['impacto_producao'].sum(axis=1),
+                               resultado['impactos_setoriais_nacionais'].sum(axis=1), rtol=1e-5)
@@ -0,0 +1,203 @@
+"""Tiles vetoriais: codificação MVT, linhas TMS do MBTiles e estáticos do servidor local."""
+
+import gzip
+import json
+import sqlite3
+import threading
+import urllib.request
+
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+from simulador.servico_tiles import ServidorTiles
+from simulador.tiles import (EXTENSAO_TILE, AcervoTiles, _lat_para_y, _lon_para_x, _varint, _varints,
+                             codificar_tile, gravar_mbtiles, montar_metadados)
+
+# ==============================================================================
+# LEITURA MÍNIMA DE PROTOBUF (só o que os tiles usam)
+# ==============================================================================
+
+def _ler_varint(dados, posicao):
+    valor, deslocamento = 0, 0
+    while True:
+        octeto = dados[posicao]
+        valor |= (octeto & 0x7F) << deslocamento
+        posicao += 1
+        if octeto < 0x80:
+            return valor, posicao
+        deslocamento += 7
+
+def _campos(dados):
+    """Lista de (número do campo, valor): varints como int, bytes delimitados como bytes."""
+    campos, posicao = [], 0
+    while posicao < len(dados):
+        chave, posicao = _ler_varint(dados, posicao)
+        numero, tipo = chave >> 3, chave & 0x7
+        if tipo == 0:
+            valor, posicao = _ler_varint(dados, posicao)
+        elif tipo == 2:
+            tamanho, posicao = _ler_varint(dados, posicao)
+            valor, posicao = dados[posicao:posicao + tamanho], posicao + tamanho
+        elif tipo == 1:
+            valor, posicao = dados[posicao:posicao + 8], posicao + 8
+        else:
+            raise ValueError(f"Tipo de campo inesperado: {tipo}")
+        campos.append((numero, valor))
+    return campos
+
+def _varints_empacotados(dados):
+    valores, posicao = [], 0
+    while posicao < len(dados):
+        valor, posicao = _ler_varint(dados, posicao)
+        valores.append(valor)
+    return valores
+
+def _anel_decodificado(comandos):
+    """Vértices (coordenadas do tile) do primeiro anel: MoveTo, LineTo e ClosePath com zigzag."""
+    decodificar = lambda valor: (valor >> 1) ^ -(valor & 1)
+    assert comandos[0] == (1 | (1 << 3))
+    cursor = np.array([decodificar(comandos[1]), decodificar(comandos[2])])
+    pontos = [cursor.copy()]
+    quantidade = comandos[3] >> 3
+    assert comandos[3] & 0x7 == 2
+    for i in range(quantidade):
+        cursor = cursor + [decodificar(comandos[4 + 2 * i]), decodificar(comandos[5 + 2 * i])]
+        pontos.append(cursor.copy())
+    assert comandos[4 + 2 * quantidade] == (7 | (1 << 3))
+    return np.array(pontos)
+
+def _decodificar_tile(dados):
+    (numero, camada), = _campos(dados)
+    assert numero == 3
+    campos = _campos(camada)
+    chaves = [valor.decode('utf-8') for numero, valor in campos if numero == 3]
+    valores = []
+    for numero, valor in campos:
+        if numero == 4:
+            (tipo, conteudo), = _campos(valor)
+            valores.append(conteudo.decode('utf-8') if tipo == 1 else conteudo)
+    feicoes = []
+    for numero, valor in campos:
+        if numero == 2:
+            feicao = dict(_campos(valor))
+            tags = _varints_empacotados(feicao[2])
+            feicoes.append({
+                'id': feicao.get(1),
+                'tipo': feicao[3],
+                'propriedades': {chaves[k]: valores[v] for k, v in zip(tags[::2], tags[1::2])},
+                'comandos': _varints_empacotados(feicao[4]),
+            })
+    return {
+        'versao': dict(campos)[15],
+        'nome': dict(campos)[1].decode('utf-8'),
+        'extensao': dict(campos)[5],
+        'feicoes': feicoes,
+    }
+
+# ==============================================================================
+# CODIFICAÇÃO
+# ==============================================================================
+
+def test_varints_empacotados_iguais_aos_individuais():
+    valores = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 31, 2 ** 63 - 1]
+    assert _varints(valores) == b''.join(_varint(valor) for valor in valores)
+
+def test_tile_mvt_decodifica_camada_propriedades_e_geometria():
+    zoom, x, y = 6, 22, 35
+    # Quadrado inteiro dentro do tile (lon/lat do centro do tile ± um oitavo da largura)
+    oeste, leste = x / 64 * 360 - 180, (x + 1) / 64 * 360 - 180
+    centro_lon, largura = (oeste + leste) / 2, (leste - oeste) / 8
+    norte = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / 64))))
+    sul = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 1) / 64))))
+    centro_lat = (norte + sul) / 2
+    quadrado = Polygon([(centro_lon - largura, centro_lat - largura), (centro_lon + largura, centro_lat - largura),
+                        (centro_lon + largura, centro_lat + largura), (centro_lon - largura, centro_lat + largura)])
+    geometrias = np.array([quadrado], dtype=object)
+
+    tile = codificar_tile(geometrias, [0], [{'codigo': 320007, 'nome': 'Campinas'}], zoom, x, y, ids=[320007])
+    decodificado = _decodificar_tile(tile)
+
+    assert decodificado['versao'] == 2
+    assert decodificado['nome'] == 'regioes'
+    assert decodificado['extensao'] == EXTENSAO_TILE
+    (feicao,) = decodificado['feicoes']
+    assert feicao['id'] == 320007
+    assert feicao['tipo'] == 3
+    assert feicao['propriedades'] == {'codigo': 320007, 'nome': 'Campinas'}
+
+    anel = _anel_decodificado(feicao['comandos'])
+    esperado = np.column_stack([
+        (_lon_para_x(np.asarray(quadrado.exterior.coords)[:-1, 0], zoom) - x) * EXTENSAO_TILE,
+        (_lat_para_y(np.asarray(quadrado.exterior.coords)[:-1, 1], zoom) - y) * EXTENSAO_TILE,
+    ])
+    assert len(anel) == 4
+    assert {tuple(ponto) for ponto in anel} == {tuple(ponto) for ponto in np.rint(esperado).astype(int)}
+    # Exterior com área positiva nas coordenadas do tile (y para baixo), como pede a especificação
+    proximos = np.roll(anel, -1, axis=0)
+    assert np.sum(anel[:, 0] * proximos[:, 1] - proximos[:, 0] * anel[:, 1]) > 0
+
+def test_tile_sem_regioes_e_none():
+    distante = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+    assert codificar_tile(np.array([distante], dtype=object), [0], [{'codigo': 1}], 6, 22, 35) is None
+
+# ==============================================================================
+# MBTILES (LINHAS NO ESQUEMA TMS)
+# ==============================================================================
+
+@pytest.fixture
+def mbtiles(tmp_path):
+    metadados = montar_metadados(np.array([[-50.0, -25.0, -45.0, -20.0]]), [{'codigo': 1}], 3, 5)
+    tiles = [(3, 2, 1, b'tile-3-2-1'), (5, 11, 17, b'tile-5-11-17')]
+    caminho = tmp_path / 'regioes.mbtiles'
+    resumo = gravar_mbtiles(iter(tiles), caminho, metadados)
+    assert resumo['tiles'] == 2
+    return caminho
+
+def test_mbtiles_grava_linhas_tms_e_le_em_xyz(mbtiles):
+    conexao = sqlite3.connect(mbtiles)
+    linhas = sorted(conexao.execute('SELECT zoom_level, tile_column, tile_row FROM tiles').fetchall())
+    conexao.close()
+    # TMS conta as linhas a partir do sul: y_tms = 2^z - 1 - y
+    assert linhas == [(3, 2, 6), (5, 11, 14)]
+
+    acervo = AcervoTiles(mbtiles)
+    try:
+        assert gzip.decompress(acervo.tile(3, 2, 1)) == b'tile-3-2-1'
+        assert gzip.decompress(acervo.tile(5, 11, 17)) == b'tile-5-11-17'
+        assert acervo.tile(3, 2, 6) is None
+        assert (acervo.zoom_minimo, acervo.zoom_maximo) == (3, 5)
+    finally:
+        acervo.fechar()
+
+# ==============================================================================
+# SERVIDOR LOCAL
+# ==============================================================================
+
+def _get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as resposta:
+        return json.loads(resposta.read().decode('utf-8'))
+
+def test_servidor_informa_os_estaticos_disponiveis(mbtiles, tmp_path):
+    estaticos = tmp_path / 'static'
+    estaticos.mkdir()
+    servidor = ServidorTiles(('127.0.0.1', 0), AcervoTiles(mbtiles), estaticos)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    try:
+        tilejson = _get_json(f"{url}/metadata.json")
+        assert tilejson['tiles'][0].endswith('/tiles/{z}/{x}/{y}.pbf')
+        assert tilejson['estaticos'] == {'vectorgrid': False, 'leaflet': False}
+
+        (estaticos / 'Leaflet.VectorGrid.bundled.min.js').write_text('// plugin', encoding='utf-8')
+        (estaticos / 'leaflet.js').write_text('// leaflet', encoding='utf-8')
+        assert _get_json(f"{url}/metadata.json")['estaticos'] == {'vectorgrid': True, 'leaflet': False}
+        (estaticos / 'leaflet.css').write_text('/* leaflet */', encoding='utf-8')
+        assert _get_json(f"{url}/saude")['estaticos'] == {'vectorgrid': True, 'leaflet': True}
+
+        with urllib.request.urlopen(f"{url}/tiles/3/2/1.pbf", timeout=10) as resposta:
+            assert resposta.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(resposta.read()) == b'tile-3-2-1'
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,96 @@
+"""Exportação TopoJSON do conversor de shapefiles: arcos compartilhados e ida e volta das coordenadas."""
+
+import importlib.util
+import json
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+def _carregar_conversor():
+    caminho = RAIZ / 'shapefiles' / 'shapefile_to_geoparquet_converter.py'
+    especificacao = importlib.util.spec_from_file_location('shapefile_to_geoparquet_converter', caminho)
+    modulo = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(modulo)
+    return modulo
+
+def _decodificar_arcos(topojson):
+    escala = np.array(topojson['transform']['scale'])
+    translacao = np.array(topojson['transform']['translate'])
+    return [np.cumsum(np.array(arco), axis=0) * escala + translacao for arco in topojson['arcs']]
+
+def _montar_anel(arcos, referencias):
+    pontos = []
+    for referencia in referencias:
+        arco = arcos[~referencia][::-1] if referencia < 0 else arcos[referencia]
+        pontos.extend(arco[1:] if pontos else arco)
+    return np.array(pontos)
+
+@pytest.fixture(scope='module')
+def quadrados():
+    # Três quadrados vizinhos: A|B lado a lado e C embaixo de ambos
+    return gpd.GeoDataFrame({
+        'codigo': [1, 2, 3],
+        'nome': ['A', 'B', 'C'],
+    }, geometry=[
+        Polygon([(0, 1), (1, 1), (1, 2), (0, 2)]),
+        Polygon([(1, 1), (2, 1), (2, 2), (1, 2)]),
+        Polygon([(0, 0), (2, 0), (2, 1), (1, 1), (0, 1)]),
+    ], crs='EPSG:4326')
+
+@pytest.fixture(scope='module')
+def topojson(quadrados, tmp_path_factory):
+    saida = tmp_path_factory.mktemp('topojson') / 'quadrados.topojson'
+    estatisticas = _carregar_conversor().export_topojson(quadrados, saida, id_column='codigo')
+    with open(saida, encoding='utf-8') as f:
+        topojson = json.load(f)
+    assert estatisticas['arcs_count'] == len(topojson['arcs'])
+    return topojson
+
+def _referencias_por_geometria(topojson):
+    referencias = []
+    for geometria in topojson['objects']['regioes']['geometries']:
+        poligonos = [geometria['arcs']] if geometria['type'] == 'Polygon' else geometria['arcs']
+        referencias.append([ref for poligono in poligonos for anel in poligono for ref in anel])
+    return referencias
+
+def test_fronteiras_compartilhadas_aparecem_uma_vez(topojson):
+    geometrias = topojson['objects']['regioes']['geometries']
+    assert [g['id'] for g in geometrias] == [1, 2, 3]
+    assert [g['properties']['nome'] for g in geometrias] == ['A', 'B', 'C']
+
+    usos = np.zeros(len(topojson['arcs']), dtype=int)
+    for referencias in _referencias_por_geometria(topojson):
+        for referencia in referencias:
+            usos[~referencia if referencia < 0 else referencia] += 1
+    # Cada arco é usado por no máximo duas regiões, e as três fronteiras internas
+    # (A|B, A|C e B|C) são arcos usados exatamente duas vezes
+    assert usos.max() == 2
+    assert (usos == 2).sum() == 3
+
+    # Nenhum segmento é gravado duas vezes, nem no sentido inverso
+    segmentos = set()
+    for arco in _decodificar_arcos(topojson):
+        for inicio, fim in zip(np.round(arco[:-1], 6), np.round(arco[1:], 6)):
+            segmento = frozenset([tuple(inicio), tuple(fim)])
+            assert segmento not in segmentos
+            segmentos.add(segmento)
+
+def test_coordenadas_decodificadas_batem_com_a_grade(quadrados, topojson):
+    arcos = _decodificar_arcos(topojson)
+    passo = np.array(topojson['transform']['scale'])
+    for referencias_aneis, geometria in zip(
+        [g['arcs'] for g in topojson['objects']['regioes']['geometries']], quadrados.geometry
+    ):
+        anel = _montar_anel(arcos, referencias_aneis[0])
+        original = np.asarray(geometria.exterior.coords)
+        # Mesmo anel fechado, talvez começando em outro vértice ou no outro sentido
+        assert np.allclose(anel[0], anel[-1], atol=passo.max())
+        assert len(anel) == len(original)
+        distancias = np.abs(anel[:, np.newaxis, :] - original[np.newaxis, :, :]).max(axis=2)
+        assert (distancias.min(axis=1) <= passo.max() / 2 + 1e-12).all()
+        assert (distancias.min(axis=0) <= passo.max() / 2 + 1e-12).all()